@@ -1 +1,17 @@
-from .session import Session
+from .session import (
+    Session, RetryPolicy, RateLimiter, PooledTransport, Hooks, Metrics,
+    Cassette, RecordingTransport, ReplayTransport, AccountCache, ServerClock,
+    TokenStore,
+)
+from . import exceptions
+from . import fleet
+
+
+def __getattr__(name):
+    # aiohttp is only imported by users of the asyncio session
+    if name == 'AsyncSession':
+        from .aio import AsyncSession
+        return AsyncSession
+
+    raise AttributeError(
+        "module {0!r} has no attribute {1!r}".format(__name__, name))
@@ -0,0 +1,392 @@
+import asyncio
+import ssl
+import uuid
+from .. import captcha, clients
+from ..session.session import BaseSession, WARM_SERVICES
+from ..session.retry import RetryPolicy
+from ..session import ratelimit
+from ..session.hooks import Hooks, debug_hook
+from ..session.clock import ServerClock
+from ..session import tokens
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def _retrieve(task):
+    # a failed warm-up is repeated by the first call of the client
+    if not task.cancelled():
+        task.exception()
+
+
+class Response:
+    """
+    A fully read HTTP response.
+
+    Exposes the subset of the ``requests.Response`` interface that is used by
+    the clients, so that response handling reads the same for both sessions.
+    """
+
+    def __init__(self, response, content):
+        self.status_code = response.status
+        self.url = str(response.url)
+        self.headers = response.headers
+        self.cookies = {k: m.value for k, m in response.cookies.items()}
+        self.history = [str(h.url) for h in response.history]
+        self.content = content
+        self.encoding = response.charset or 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+
+class AsyncSession(BaseSession):
+    """
+    The AsyncSession class represents a session with the AWS Management
+    Console, for use with :py:mod:`asyncio`.
+
+    Use the `client` method to obtain a client for one of the supported
+    services. All client methods are coroutines, and all clients of a session
+    share a single connection pool:
+
+    .. code-block:: python
+
+        import coto
+
+        async with coto.AsyncSession() as session:
+            await session.signin(boto3_session=boto3.Session())
+            iam = session.client('iam')
+            await iam.get_account_info()
+
+    Requires the ``aiohttp`` package, install with ``pip install coto[async]``.
+    """
+
+    def __init__(
+        self, debug=False, verify=True,
+        metadata1_generator=None,
+        captcha_solver=None,
+        connector=None, limit=100, retry_policy=None, rate_limiter=None,
+        hooks=None, metrics=None, account_cache=None, clock=None,
+        token_store=None,
+    ):
+        """
+        Args:
+            debug (bool): Print a line for every response.
+            verify (str | bool): SSL certificate checking. Path to CA
+                certificates file. ``False`` to ignore certificate errors.
+                ``True`` to use defaults (default).
+            captcha_solver (coto.captcha.Solver): Class implementing a way to solve captchas (e.g., send them to Slack for you to solve).
+            metadata1_generator (coto.metadata1.Generator): Class implementing a way to generate metadata1.
+            connector (aiohttp.BaseConnector): Connection pool to use. Pass
+                the same connector to multiple sessions to let them share
+                connections. The connector is not closed with the session.
+            limit (int): Maximum number of simultaneous connections of the
+                connection pool created when no ``connector`` is passed.
+            retry_policy (coto.RetryPolicy): Which failed requests to retry,
+                and when. Defaults to three attempts for idempotent requests.
+            rate_limiter (coto.RateLimiter): Limits the request rate.
+                Defaults to the limiter shared by all sessions in the
+                process, :py:data:`coto.session.ratelimit.default_limiter`.
+            hooks (coto.session.hooks.Hooks): Functions to call for every
+                request. By default the session has its own, available as
+                the ``hooks`` attribute.
+            metrics (coto.Metrics): Collects per operation request metrics,
+                available as the ``metrics`` attribute. ``None`` to not
+                collect them (default).
+            account_cache (coto.AccountCache): Remembers account types and
+                MFA requirements to skip their lookups on root user signin.
+            clock (coto.ServerClock): Estimates the server time from the
+                responses, to compute MFA codes. Pass the same clock to
+                multiple sessions to share the estimate. By default the
+                session has its own, available as the ``clock`` attribute.
+            token_store (coto.TokenStore): Keeps the tokens of the clients
+                per signed in identity. Pass the same store to multiple
+                sessions to share the tokens. By default the session has its
+                own, available as the ``token_store`` attribute.
+        """
+        self.debug = debug
+        self.hooks = hooks if hooks is not None else Hooks()
+        if debug and debug_hook not in self.hooks.on_response:
+            self.hooks.register('on_response', debug_hook)
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.register(self.hooks)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter if rate_limiter is not None \
+            else ratelimit.default_limiter
+        self._metadata1_generator = metadata1_generator
+        self._captcha_solver = captcha_solver
+        self.root = False
+        self.coupled = None
+        self.verify = verify
+        self.authenticated = False
+        self._clients = {}
+        self._signin_kwargs = None
+        self._reauthenticating = False
+        self.signin_timings = None
+        self.account_cache = account_cache
+        self.clock = clock if clock is not None else ServerClock()
+        self.token_store = token_store if token_store is not None \
+            else tokens.TokenStore()
+        self.identity = uuid.uuid4().hex
+        self._connector = connector
+        self._limit = limit
+        self._http_session = None
+
+        self.timeout = (3.1, 10)
+        self.user_agent = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_13_3) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/64.0.3282.186 Safari/537.36'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """
+        Close the session, and the connection pool if the session owns it.
+        """
+        if self._http_session is not None:
+            await self._http_session.close()
+            self._http_session = None
+
+    async def signin(self, **kwargs):
+        """
+        Signin to the AWS Management Console.
+
+        Accepts the same arguments as :py:meth:`coto.Session.signin`.
+        """
+        self._signin_kwargs = kwargs
+        self.identity = tokens.identity(kwargs) or self.identity
+
+        if 'boto3_session' in kwargs:
+            boto3_session = kwargs.get('boto3_session')
+            result = await self.client('federation').signin(boto3_session)
+
+        elif 'email' in kwargs and 'password' in kwargs:
+            args = {}
+            for key in ['email', 'password', 'mfa_secret']:
+                if key in kwargs:
+                    args[key] = kwargs.get(key)
+            result = await self.client('signin').signin(**args)
+
+        else:
+            return None
+
+        # the tokens of earlier console sessions are rejected
+        if self.authenticated:
+            self.identity = tokens.identity(
+                kwargs, self._console_session()) or self.identity
+        return result
+
+    def _console_session(self):
+        for cookie in self._http().cookie_jar:
+            if cookie.key == tokens.CONSOLE_SESSION_COOKIE:
+                return cookie.value
+        return None
+
+    async def _reauthenticate(self):
+        if self._signin_kwargs is None or self._reauthenticating:
+            return False
+
+        self._reauthenticating = True
+        try:
+            self.authenticated = False
+            self._http().cookie_jar.clear()
+            self.token_store.invalidate(self.identity)
+            for client in self._clients.values():
+                client._drop_tokens()
+
+            await self.signin(**self._signin_kwargs)
+        finally:
+            self._reauthenticating = False
+
+        return self.authenticated
+
+    # http requests
+    def _http(self):
+        if self._http_session is None:
+            if aiohttp is None:
+                raise Exception(
+                    "AsyncSession requires aiohttp, install coto[async]")
+
+            connector = self._connector
+            if connector is None:
+                connector = aiohttp.TCPConnector(limit=self._limit)
+
+            self._http_session = aiohttp.ClientSession(
+                connector=connector,
+                connector_owner=self._connector is None,
+                cookie_jar=aiohttp.CookieJar(quote_cookie=False),
+            )
+
+        return self._http_session
+
+    def _ssl(self):
+        if isinstance(self.verify, str):
+            return ssl.create_default_context(cafile=self.verify)
+        elif self.verify:
+            return True
+        else:
+            return False
+
+    def _set_defaults(self, kwargs):
+        timeout = kwargs.pop('timeout', self.timeout)
+        if isinstance(timeout, tuple):
+            kwargs['timeout'] = aiohttp.ClientTimeout(
+                sock_connect=timeout[0], sock_read=timeout[1])
+        else:
+            kwargs['timeout'] = aiohttp.ClientTimeout(total=timeout)
+
+        if not 'headers' in kwargs:
+            kwargs['headers'] = {}
+
+        kwargs['headers']['User-Agent'] = self.user_agent
+        kwargs['ssl'] = self._ssl()
+
+        # like requests, leave out fields without a value
+        for key in ['data', 'params']:
+            if isinstance(kwargs.get(key), dict):
+                kwargs[key] = {
+                    k: v for k, v in kwargs[key].items() if v is not None
+                }
+
+    def _transport_errors(self):
+        return (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+    async def _send(self, method, url, kwargs):
+        async with self._http().request(method, url, **kwargs) as r:
+            return Response(r, await r.read())
+
+    def _transferred(self, r, kwargs):
+        data = kwargs.get('data')
+        if isinstance(data, (str, bytes)):
+            return len(data), len(r.content)
+        return None, len(r.content)
+
+    async def _sleep(self, delay):
+        await asyncio.sleep(delay)
+
+    async def _request(
+        self, method, url, expect_json=False, operation=None,
+        idempotent=None, **kwargs
+    ):
+        return await self._run(self._request_steps(
+            method, url, expect_json, operation, idempotent, kwargs))
+
+    async def _mfa_codes(self, secret, count=1):
+        """
+        Returns:
+            list: The MFA codes of the last ``count`` periods at the server
+            time, after waiting for the next period when the current one
+            ends before the request would arrive.
+        """
+        delay = self.clock.wait()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        return self.clock.codes(secret, count)
+
+    async def _captcha_image(self, url):
+        r = await self._get(url, operation='captcha.image', idempotent=True)
+        if r.status_code != 200:
+            raise IOError("could not download captcha {0}".format(url))
+
+        return r.content
+
+    async def _solve_captcha(self, url=None, image=None):
+        """
+        Hand a captcha to the captcha solver. Its image is downloaded through
+        this session, unless the solver does not take images.
+
+        Returns:
+            concurrent.futures.Future: Future of the guess, with the id of
+            the job in its ``job_id`` attribute.
+        """
+        solver = self._captcha_solver
+        if image is None and getattr(solver, 'fetch_image', False):
+            image = await self._captcha_image(url)
+
+        return captcha.submit(solver, image=image, url=url)
+
+    async def _run(self, steps):
+        """
+        Run the steps of a client method, awaiting the requests, see
+        :py:mod:`coto.clients.steps`.
+
+        Returns:
+            The return value of the steps.
+        """
+        return await clients.steps.arun(self, steps)
+
+    def client(self, service):
+        """
+        Create a client for a service.
+
+        Supported services:
+          * ``account``
+          * ``billing``
+          * ``federation``
+          * ``iam``
+          * ``mfa``
+          * ``resetpassword``
+          * ``signin``
+          * ``signin_amazon``
+          * ``signin_aws``
+          * ``sso``
+          * ``support``
+
+        Args:
+            service: name of the service, eg., `billing`
+
+        Returns:
+            object: service client, whose methods return coroutines
+        """
+        service = service.lower()
+
+        if service not in self._clients:
+            module = clients.get(service)
+            if module is None:
+                raise Exception("service {0} unsupported".format(service))
+
+            klass = module.Client
+
+            if klass.REQUIRES_AUTHENTICATION and not self.authenticated:
+                raise Exception(
+                    "signin before creating {0} service client".format(
+                        service))
+
+            self._clients[service] = klass(self)
+
+            if klass.REQUIRES_AUTHENTICATION:
+                stored = self.token_store.get(self.identity, service)
+                if stored is not None:
+                    self._clients[service]._restore_tokens(stored)
+
+        return self._clients[service]
+
+    def warm(self, services=WARM_SERVICES):
+        """
+        Load the pages with the tokens of service clients in background
+        tasks, concurrently. Call from a coroutine, see
+        :py:meth:`coto.Session.warm`.
+
+        Args:
+            services (list): Names of the services, e.g., ``iam``. By
+                default ``iam``, ``billing`` and ``support``.
+
+        Returns:
+            dict: :py:class:`asyncio.Task` per service, done once its tokens
+            are loaded.
+        """
+        warming = {}
+        for service in services:
+            client = self.client(service)
+            client._warming = warming[service] = asyncio.ensure_future(
+                self._run(client._warm()))
+            client._warming.add_done_callback(_retrieve)
+
+        return warming
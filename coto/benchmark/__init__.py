@@ -0,0 +1,2 @@
+from .runner import Benchmark, Case, save, load, compare
+from .cases import add_default_cases
@@ -0,0 +1,66 @@
+import argparse
+import sys
+from . import Benchmark, add_default_cases, save, load, compare
+from ..testing import Account, FakeConsole
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m coto.benchmark',
+        description="Benchmark the clients against a local fake console.")
+    parser.add_argument(
+        '-n', '--iterations', type=int, default=20,
+        help="measured calls per case")
+    parser.add_argument(
+        '--latency', type=float, default=0,
+        help="seconds the fake console waits before every response")
+    parser.add_argument(
+        '-k', '--case', action='append', dest='cases',
+        help="run only this case, can be repeated")
+    parser.add_argument(
+        '-o', '--output', help="write the results to this JSON file")
+    parser.add_argument(
+        '--baseline', help="compare to the results in this JSON file")
+    parser.add_argument(
+        '--tolerance', type=float, default=0.1,
+        help="relative increase reported as regression")
+    args = parser.parse_args(argv)
+
+    account = Account('root@example.com', 'password')
+    with FakeConsole([account], latency=args.latency) as console:
+        benchmark = Benchmark(iterations=args.iterations)
+        add_default_cases(benchmark, console.transport())
+        results = benchmark.run(args.cases)
+
+    print("{0:<45} {1:>12} {2:>12} {3:>12}".format(
+        'case', 'median ms', 'overhead ms', 'peak KiB'))
+    for name, result in results['cases'].items():
+        print("{0:<45} {1:>12.3f} {2:>12.3f} {3:>12.1f}".format(
+            name,
+            result['wall']['median'] * 1000,
+            result['overhead']['median'] * 1000,
+            result['allocations']['peak_bytes'] / 1024,
+        ))
+        for phase, elapsed in result['phases'].items():
+            print("  {0:<43} {1:>12.3f}".format(phase, elapsed * 1000))
+
+    if args.output:
+        save(results, args.output)
+
+    if args.baseline:
+        regressions = [
+            c for c in compare(load(args.baseline), results, args.tolerance)
+            if c['regression']
+        ]
+        for c in regressions:
+            print("regression {0} {1}: {2:.4g} -> {3:.4g} ({4:+.0%})".format(
+                c['case'], c['metric'], c['baseline'], c['current'],
+                c['change']))
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
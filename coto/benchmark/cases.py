@@ -0,0 +1,99 @@
+from ..session import Session, RateLimiter
+from ..metadata1.static_generator import StaticGenerator
+from ..clients.signin_amazon import flow
+
+
+SIGNIN_FORM = """
+<html><body>
+<form id="ap_signin_form" method="post" action="https://www.amazon.com/ap/signin">
+  <input type="hidden" name="appActionToken" value="token">
+  <input type="hidden" name="appAction" value="SIGNIN">
+  <input type="hidden" name="openid.return_to" value="return">
+  <input type="hidden" name="prevRID" value="rid">
+  <input type="email" name="email">
+  <input type="password" name="password">
+  <input type="submit" id="signInSubmit">
+</form>
+</body></html>
+"""
+
+
+def add_default_cases(
+    benchmark, transport, email='root@example.com', password='password',
+    mfa_secret=None,
+):
+    """
+    Add cases for the signin flow and the token and API calls of the
+    clients.
+
+    The transport must serve the signin and console endpoints for the
+    account, e.g., :py:meth:`coto.testing.FakeConsole.transport`, or a
+    :py:class:`coto.ReplayTransport` with ``repeat=True`` and a cassette
+    recorded while running the cases once.
+
+    Args:
+        benchmark (coto.benchmark.Benchmark): The benchmark.
+        transport: Transport of the sessions.
+        email (str): Root user email address of the account.
+        password (str): Root user password of the account.
+        mfa_secret (str): Root user MFA secret of the account.
+    """
+    signin = {'email': email, 'password': password}
+    if mfa_secret is not None:
+        signin['mfa_secret'] = mfa_secret
+
+    def session():
+        return Session(
+            transport=transport,
+            hooks=benchmark.hooks,
+            # benchmark the client, not the limits of the process
+            rate_limiter=RateLimiter(),
+            metadata1_generator=StaticGenerator('metadata1'),
+        )
+
+    signed_in = session()
+    signed_in.signin(**signin)
+
+    benchmark.add(
+        'Session.signin', lambda s: s.signin(**signin), setup=session,
+        phases=lambda s: s.signin_timings)
+
+    benchmark.add(
+        'signin_aws.Client._get_tokens',
+        lambda client: client.session()._run(client._get_tokens()),
+        setup=lambda: session().client('signin_aws'))
+
+    benchmark.add(
+        'signin_amazon.flow.classify',
+        lambda: flow.classify('https://www.amazon.com/ap/signin', SIGNIN_FORM))
+
+    def fresh(service):
+        def setup():
+            client = signed_in.client(service)
+            client._load_tokens({})
+            return client
+        return setup
+
+    benchmark.add(
+        'iam.Client._get_xsrf_token',
+        lambda client: client.session()._run(client._get_xsrf_token()),
+        setup=fresh('iam'))
+    benchmark.add(
+        'billing.Client._get_xsrf_token',
+        lambda client: client.session()._run(client._get_xsrf_token()),
+        setup=fresh('billing'))
+
+    calls = [
+        ('iam', 'get_account_info'),
+        ('iam', 'list_root_access_keys'),
+        ('iam', 'list_root_mfa_devices'),
+        ('billing', 'list_alternate_contacts'),
+        ('billing', 'list_tax_registrations'),
+        ('billing', 'account_status'),
+        ('support', 'get_support_level'),
+        ('account', 'get_account_info'),
+    ]
+    for service, method in calls:
+        benchmark.add(
+            '{0}.Client.{1}'.format(service, method),
+            getattr(signed_in.client(service), method))
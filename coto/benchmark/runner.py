@@ -0,0 +1,274 @@
+import datetime
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from ..session import Hooks
+
+
+class Case:
+    """
+    A benchmarked operation.
+    """
+
+    def __init__(self, name, func, setup=None, phases=None):
+        """
+        Args:
+            name (str): Name of the case, e.g., ``iam._get_xsrf_token``.
+            func (callable): The measured operation. Called with the return
+                value of ``setup``, or without arguments.
+            setup (callable): Called before every call of ``func``, not
+                measured.
+            phases (callable): Called with the return value of ``setup``
+                after every measured call, returns the seconds per phase of
+                the call as reported by the operation itself, e.g.,
+                ``session.signin_timings``.
+        """
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.phases = phases
+
+    def prepare(self):
+        return self.setup() if self.setup is not None else None
+
+    def call(self, state):
+        if self.setup is not None:
+            return self.func(state)
+        return self.func()
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def _covered(intervals):
+    # seconds covered by at least one interval, concurrent requests count once
+    covered = 0
+    end = None
+    for start, stop in sorted(intervals):
+        if end is None or start > end:
+            covered += stop - start
+            end = stop
+        elif stop > end:
+            covered += stop - end
+            end = stop
+    return covered
+
+
+def _summary(values):
+    return {
+        'min': min(values),
+        'median': statistics.median(values),
+        'mean': statistics.mean(values),
+        'p95': _percentile(values, 0.95),
+        'max': max(values),
+    }
+
+
+class Benchmark:
+    """
+    Measures the wall time and allocations of cases, and the time spent per
+    request operation while running them:
+
+    .. code-block:: python
+
+        from coto.benchmark import Benchmark, add_default_cases
+        from coto.testing import Account, FakeConsole
+
+        with FakeConsole([Account('root@example.com', 'password')]) as console:
+            benchmark = Benchmark(iterations=50)
+            add_default_cases(benchmark, console.transport())
+            results = benchmark.run()
+
+    Sessions of the cases must be created with the ``hooks`` of the
+    benchmark to report the time per operation. Cases with ``phases`` also
+    report the median seconds per phase. The time during which no
+    request was waiting for a response is reported as ``overhead``, the cost
+    of the client.
+    """
+
+    def __init__(self, iterations=20, warmup=2):
+        """
+        Args:
+            iterations (int): Measured calls per case.
+            warmup (int): Unmeasured calls per case before measuring.
+        """
+        self.iterations = iterations
+        self.warmup = warmup
+        self.hooks = Hooks()
+        self.hooks.register('on_response', self._on_response)
+        self.cases = []
+        self._events = None
+
+    def add(self, name, func, setup=None, phases=None):
+        """
+        Add a case, see :py:class:`Case`.
+        """
+        self.cases.append(Case(name, func, setup, phases))
+
+    def _on_response(self, event):
+        if self._events is not None and event.elapsed is not None:
+            self._events.append((event, time.monotonic()))
+
+    def measure(self, case):
+        """
+        Args:
+            case (Case): The case.
+
+        Returns:
+            dict: The measurements.
+        """
+        for _ in range(self.warmup):
+            case.call(case.prepare())
+
+        wall = []
+        overhead = []
+        operations = {}
+        phases = {}
+        for _ in range(self.iterations):
+            state = case.prepare()
+            self._events = []
+            start = time.perf_counter()
+            started = time.monotonic()
+            try:
+                case.call(state)
+            finally:
+                wall.append(time.perf_counter() - start)
+                stopped = time.monotonic()
+                events, self._events = self._events, None
+
+            per_operation = {}
+            intervals = []
+            for event, received in events:
+                operation = event.operation or event.host
+                per_operation[operation] = \
+                    per_operation.get(operation, 0) + event.elapsed
+                intervals.append((
+                    max(started, received - event.elapsed),
+                    min(stopped, received)))
+            for operation, elapsed in per_operation.items():
+                operations.setdefault(operation, []).append(elapsed)
+            # same clock as the intervals, which lie within the call
+            overhead.append(stopped - started - _covered(intervals))
+
+            if case.phases is not None:
+                for phase, elapsed in case.phases(state).items():
+                    # e.g., the steps of a Coupled signin are no timing
+                    if isinstance(elapsed, (int, float)):
+                        phases.setdefault(phase, []).append(elapsed)
+
+        # measured separately, tracing slows down the code
+        state = case.prepare()
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            case.call(state)
+            after, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'iterations': self.iterations,
+            'wall': _summary(wall),
+            'overhead': _summary(overhead),
+            'operations': {
+                operation: statistics.median(elapsed)
+                for operation, elapsed in sorted(operations.items())
+            },
+            'phases': {
+                phase: statistics.median(elapsed)
+                for phase, elapsed in sorted(phases.items())
+            },
+            'allocations': {
+                'peak_bytes': peak - before,
+                'retained_bytes': after - before,
+            },
+        }
+
+    def run(self, cases=None):
+        """
+        Args:
+            cases (list): Names of the cases to run, all by default.
+
+        Returns:
+            dict: The results, with the environment and the measurements per
+            case name under ``cases``.
+        """
+        results = {
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cases': {},
+        }
+        for case in self.cases:
+            if cases is None or case.name in cases:
+                results['cases'][case.name] = self.measure(case)
+
+        return results
+
+
+def save(results, path):
+    """
+    Args:
+        results (dict): Results of :py:meth:`Benchmark.run`.
+        path (str): Path of the JSON file to write.
+    """
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load(path):
+    """
+    Args:
+        path (str): Path of a file written by :py:func:`save`.
+
+    Returns:
+        dict: The results.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, results, tolerance=0.1):
+    """
+    Compare the results of two runs.
+
+    Args:
+        baseline (dict): Results of the reference run.
+        results (dict): Results of the new run.
+        tolerance (float): Relative increase above which a metric counts as
+            a regression.
+
+    Returns:
+        list: A dict per case and metric present in both runs, with the
+        ``case``, ``metric``, ``baseline`` and ``current`` values, the
+        relative ``change`` and whether it is a ``regression``.
+    """
+    metrics = [
+        ('wall.median', lambda r: r['wall']['median']),
+        ('overhead.median', lambda r: r['overhead']['median']),
+        ('allocations.peak_bytes', lambda r: r['allocations']['peak_bytes']),
+    ]
+
+    comparison = []
+    for name, current in sorted(results['cases'].items()):
+        reference = baseline['cases'].get(name)
+        if reference is None:
+            continue
+
+        for metric, value in metrics:
+            before, after = value(reference), value(current)
+            change = (after - before) / before if before else 0.0
+            comparison.append({
+                'case': name,
+                'metric': metric,
+                'baseline': before,
+                'current': after,
+                'change': change,
+                'regression': change > tolerance,
+            })
+
+    return comparison
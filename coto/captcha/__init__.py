@@ -0,0 +1 @@
+from .solver import Solver, Poller, poller, submit, encode
@@ -2,6 +2,7 @@ import uuid
 import sys
 import base64
 import urllib.request
+from .solver import Solver, encode
 
 def url_to_base64(url):
     return base64.b64encode(urllib.request.urlopen(url).read()).decode()
@@ -12,19 +13,22 @@ def show_image(b64):
     sys.stdout.write(b64)
     sys.stdout.write("\a\n")
 
-class iTermSolver:
+class iTermSolver(Solver):
     def __init__(self):
+        super().__init__()
         self.jobs = {}
     
-    def solve(self, base64=None, url=None):
+    def solve(self, image=None, url=None, base64=None):
         job_id = uuid.uuid4()
 
-        if base64:
+        if image:
+            b64 = encode(image)
+        elif base64:
             b64 = base64
         elif url:
             b64 = url_to_base64(url)
         else:
-            raise Exception("pass `url` or `base64`")
+            raise Exception("pass `image`, `url` or `base64`")
 
         self.jobs[job_id] = None
         show_image(b64)
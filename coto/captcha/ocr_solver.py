@@ -0,0 +1,391 @@
+import collections
+import itertools
+import json
+import os
+import queue
+import threading
+import uuid
+from io import BytesIO
+from PIL import Image, ImageFilter
+from .solver import Solver, submit
+
+
+#: Width and height, in pixels, glyphs are scaled to before matching.
+GLYPH_SIZE = 16
+
+
+def _otsu(histogram):
+    total = sum(histogram)
+    weighted = sum(i * h for i, h in enumerate(histogram))
+
+    best, threshold = -1, 128
+    background, background_sum = 0, 0
+    for i, h in enumerate(histogram):
+        background += h
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        background_sum += i * h
+        mean_background = background_sum / background
+        mean_foreground = (weighted - background_sum) / foreground
+        variance = background * foreground * \
+            (mean_background - mean_foreground) ** 2
+        if variance > best:
+            best, threshold = variance, i
+
+    return threshold
+
+
+def _binarize(image):
+    """
+    Returns:
+        PIL.Image.Image: Mode ``1`` image with the characters set.
+    """
+    image = Image.open(BytesIO(image)) if isinstance(
+        image, (bytes, bytearray, memoryview)) else image
+    gray = image.convert('L').filter(ImageFilter.MedianFilter(3))
+    threshold = _otsu(gray.histogram())
+    ink = gray.point(lambda p: 255 if p <= threshold else 0)
+
+    # light characters on a dark background
+    if sum(ink.histogram()[128:]) > ink.width * ink.height / 2:
+        ink = ink.point(lambda p: 255 - p)
+
+    return ink.convert('1')
+
+
+def _segments(ink, min_pixels=4):
+    width, height = ink.size
+    pixels = ink.load()
+    columns = [
+        sum(1 for y in range(height) if pixels[x, y]) for x in range(width)
+    ]
+
+    spans, start = [], None
+    for x, count in enumerate(columns + [0]):
+        if count and start is None:
+            start = x
+        elif not count and start is not None:
+            if sum(columns[start:x]) >= min_pixels:
+                spans.append((start, x))
+            start = None
+
+    if not spans:
+        return []
+
+    # split touching characters, assuming they are about as wide as the rest
+    widths = sorted(end - start for start, end in spans)
+    typical = widths[len(widths) // 2]
+    split = []
+    for start, end in spans:
+        parts = max(1, round((end - start) / typical)) \
+            if end - start > 1.6 * typical else 1
+        step = (end - start) / parts
+        split.extend(
+            (start + round(i * step), start + round((i + 1) * step))
+            for i in range(parts)
+        )
+
+    return [ink.crop((start, 0, end, height)) for start, end in split]
+
+
+def _mask(glyph):
+    bbox = glyph.getbbox()
+    if bbox is not None:
+        glyph = glyph.crop(bbox)
+
+    # keep the aspect ratio, to tell, e.g., o and 0 apart
+    size = max(glyph.size)
+    square = Image.new('L', (size, size), 0)
+    square.paste(glyph.convert('L'), (
+        (size - glyph.width) // 2, (size - glyph.height) // 2))
+
+    glyph = square.resize(
+        (GLYPH_SIZE, GLYPH_SIZE), Image.BILINEAR)
+    mask = 0
+    for i, p in enumerate(glyph.tobytes()):
+        if p >= 128:
+            mask |= 1 << i
+    return mask
+
+
+def _bits(mask):
+    return bin(mask).count('1')
+
+
+def glyphs(image):
+    """
+    Preprocess a captcha: grayscale, denoise, binarize and split it into
+    characters.
+
+    Args:
+        image (bytes): The captcha image. Animated images are read from their
+            first frame.
+
+    Returns:
+        list: One bitmask per character, as ints of ``GLYPH_SIZE ** 2`` bits.
+    """
+    return [_mask(g) for g in _segments(_binarize(image))]
+
+
+class OCRSolver(Solver):
+    """
+    Solves captchas on the CPU, by matching their characters against
+    templates of characters seen in solved captchas.
+
+    Captchas are recognized in batches on a background thread. Answers with a
+    confidence below ``threshold`` are handed to the ``fallback`` solver,
+    e.g., an :py:class:`coto.captcha.iterm_solver.iTermSolver` or a remote
+    service. With ``learn=True`` the answers of the fallback are used as
+    templates, so the local recognizer improves over time:
+
+    .. code-block:: python
+
+        import coto
+        from coto.captcha.iterm_solver import iTermSolver
+        from coto.captcha.ocr_solver import OCRSolver
+
+        solver = OCRSolver(
+            fallback=iTermSolver(), learn=True,
+            templates='~/.cache/coto/captcha.json')
+        session = coto.Session(captcha_solver=solver)
+        ...
+        solver.save()
+
+    No templates are bundled, they must be trained with :py:meth:`train` or
+    learned from a fallback solver.
+    """
+
+    poll = False
+
+    def __init__(
+        self, fallback=None, templates=None, threshold=0.8, learn=False,
+        batch_size=16, batch_wait=0.01,
+    ):
+        """
+        Args:
+            fallback: Captcha solver for answers with a low confidence,
+                ``None`` to use them anyway.
+            templates (str): JSON file with the character templates, loaded
+                when it exists.
+            threshold (float): Minimum confidence, from 0 to 1, of an answer.
+            learn (bool): Add the characters of the answers of the fallback
+                solver to the templates.
+            batch_size (int): Maximum captchas recognized at once.
+            batch_wait (float): Seconds to wait for more captchas to fill a
+                batch.
+        """
+        super().__init__()
+        self.fallback = fallback
+        self.path = os.path.expanduser(templates) \
+            if templates is not None else None
+        self.threshold = threshold
+        self.learn = learn
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.templates = collections.defaultdict(list)
+        self._templates_lock = threading.Lock()
+        self._jobs = collections.OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        if self.path is not None and os.path.exists(self.path):
+            self.load(self.path)
+
+    def load(self, path):
+        """
+        Add the templates saved in a file.
+
+        Args:
+            path (str): JSON file written by :py:meth:`save`.
+        """
+        with open(os.path.expanduser(path)) as f:
+            saved = json.load(f)
+
+        with self._templates_lock:
+            for char, masks in saved.items():
+                self.templates[char].extend(int(m, 16) for m in masks)
+
+    def save(self, path=None):
+        """
+        Args:
+            path (str): JSON file to write the templates to, defaults to
+                ``templates``.
+        """
+        path = os.path.expanduser(path) if path is not None else self.path
+        with self._templates_lock:
+            saved = {
+                char: ['{0:x}'.format(m) for m in masks]
+                for char, masks in self.templates.items()
+            }
+
+        with open(path, 'w') as f:
+            json.dump(saved, f)
+
+    def train(self, image, answer):
+        """
+        Add the characters of a solved captcha to the templates.
+
+        Args:
+            image (bytes): The captcha image.
+            answer (str): Its solution.
+
+        Returns:
+            list: The ``(char, mask)`` templates added, empty when the
+            characters could not be told apart.
+        """
+        masks = glyphs(image)
+        if len(masks) != len(answer):
+            return []
+
+        added = list(zip(answer, masks))
+        with self._templates_lock:
+            for char, mask in added:
+                self.templates[char].append(mask)
+        return added
+
+    def recognize(self, images):
+        """
+        Recognize a batch of captchas.
+
+        Args:
+            images (list): Captcha images, as bytes.
+
+        Returns:
+            list: A ``(answer, confidence)`` tuple per image. The confidence
+            is the similarity, from 0 to 1, of the least certain character
+            to its template.
+        """
+        with self._templates_lock:
+            templates = [
+                (char, mask, _bits(mask))
+                for char, masks in self.templates.items() for mask in masks
+            ]
+
+        results = []
+        for image in images:
+            answer, confidence = [], 1.0
+            masks = glyphs(image)
+            for mask in masks:
+                best, similarity = None, 0.0
+                for char, template, bits in templates:
+                    union = _bits(mask | template)
+                    score = (bits + _bits(mask) - union) / union if union else 0
+                    if score > similarity:
+                        best, similarity = char, score
+                answer.append(best or '')
+                confidence = min(confidence, similarity)
+
+            results.append(
+                (''.join(answer), confidence if masks else 0.0))
+        return results
+
+    def solve(self, image=None, url=None, base64=None):
+        if image is None:
+            raise Exception("OCRSolver requires the captcha image")
+
+        job_id = str(uuid.uuid4())
+        self._remember(job_id, {'image': bytes(image), 'url': url})
+        self._queue.put(job_id)
+
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name='coto-ocr-solver', daemon=True)
+                self._worker.start()
+
+        return job_id
+
+    def confidence(self, job_id):
+        """
+        Args:
+            job_id: Id returned by :py:meth:`solve`.
+
+        Returns:
+            float: Confidence of the local recognizer in its answer, ``None``
+            while it is not recognized yet.
+        """
+        with self._jobs_lock:
+            return self._jobs.get(job_id, {}).get('confidence')
+
+    def incorrect(self, job_id):
+        with self._jobs_lock:
+            job = self._jobs.get(job_id, {})
+        with self._templates_lock:
+            for char, mask in job.get('learned', ()):
+                if mask in self.templates[char]:
+                    self.templates[char].remove(mask)
+
+        if 'fallback' in job:
+            self.fallback.incorrect(job['fallback'])
+
+    def _remember(self, job_id, job):
+        with self._jobs_lock:
+            self._jobs[job_id] = job
+            # only recent jobs can be reported incorrect, jobs still being
+            # solved are kept for their futures to resolve
+            finished = (k for k, j in self._jobs.items() if j.get('done'))
+            for old in list(itertools.islice(
+                    finished, max(0, len(self._jobs) - 1000))):
+                del self._jobs[old]
+
+    def _complete(self, job_id, job, answer):
+        job['done'] = True
+        self.complete(job_id, answer)
+
+    def _fail(self, job_id, job, exception):
+        job['done'] = True
+        self.fail(job_id, exception)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=self.batch_wait))
+                except queue.Empty:
+                    break
+
+            with self._jobs_lock:
+                jobs = [(job_id, self._jobs[job_id]) for job_id in batch]
+            try:
+                results = self.recognize([job['image'] for _, job in jobs])
+            except Exception:
+                # unreadable images are left to the fallback
+                results = [('', 0.0)] * len(jobs)
+
+            for (job_id, job), (answer, confidence) in zip(jobs, results):
+                job['confidence'] = confidence
+                if confidence >= self.threshold or self.fallback is None:
+                    del job['image']
+                    self._complete(job_id, job, answer)
+                else:
+                    self._fall_back(job_id, job)
+
+    def _fall_back(self, job_id, job):
+        image = job.pop('image')
+
+        def done(future):
+            if future.exception() is not None:
+                return self._fail(job_id, job, future.exception())
+
+            answer = future.result()
+            if self.learn:
+                job['learned'] = self.train(image, answer)
+            self._complete(job_id, job, answer)
+
+        def start():
+            try:
+                future = submit(
+                    self.fallback, image=image, url=job['url'], callback=done)
+            except Exception as e:
+                return self._fail(job_id, job, e)
+            job['fallback'] = future.job_id
+
+        # solvers may block in solve, e.g., prompting a human
+        threading.Thread(
+            target=start, name='coto-ocr-fallback', daemon=True).start()
@@ -0,0 +1,236 @@
+import collections
+import threading
+import time
+import uuid
+from .solver import Solver, submit
+
+
+class RacingSolver(Solver):
+    """
+    Sends every captcha to several solvers at once, answers with the first
+    guess and cancels the others:
+
+    .. code-block:: python
+
+        import coto
+        from coto.captcha.iterm_solver import iTermSolver
+        from coto.captcha.ocr_solver import OCRSolver
+        from coto.captcha.racing_solver import RacingSolver
+
+        solver = RacingSolver([OCRSolver(templates='captcha.json'), iTermSolver()])
+        session = coto.Session(captcha_solver=solver)
+
+    The latency and accuracy of the solvers are tracked, with wrong guesses
+    reported through :py:meth:`incorrect`. With ``fanout``, only the best
+    solvers start racing right away, the others join when there is no guess
+    after ``hedge`` seconds. Solvers are ranked by their expected seconds per
+    correct guess, solvers that did not race yet first. A solver still
+    solving when another one wins has no latency sample for that race, the
+    lost race lowers its share of races answered first instead.
+    """
+
+    poll = False
+
+    def __init__(self, solvers, fanout=None, hedge=5, smoothing=0.2):
+        """
+        Args:
+            solvers (list): The captcha solvers.
+            fanout (int): Number of solvers to start racing right away,
+                ``None`` for all.
+            hedge (float): Seconds after which the other solvers join.
+            smoothing (float): Weight, from 0 to 1, of the latest latency in
+                the average latency of a solver.
+        """
+        super().__init__()
+        self.solvers = list(solvers)
+        self.fanout = fanout
+        self.hedge = hedge
+        self.smoothing = smoothing
+        self._stats = [
+            {'wins': 0, 'unanswered': 0, 'incorrect': 0, 'failures': 0,
+             'latency': None}
+            for _ in self.solvers
+        ]
+        self._races = collections.OrderedDict()
+        self._stats_lock = threading.Lock()
+
+    def stats(self):
+        """
+        Returns:
+            list: Per solver, in the order they were passed, the number of
+            races won (``wins``), of races lost while still solving
+            (``unanswered``), of wrong guesses (``incorrect``), of failures
+            (``failures``), the average seconds to a winning guess
+            (``latency``) and the fraction of correct guesses
+            (``accuracy``).
+        """
+        with self._stats_lock:
+            return [
+                dict(stats, accuracy=self._accuracy(stats))
+                for stats in self._stats
+            ]
+
+    def ranking(self):
+        """
+        Returns:
+            list: Indexes of the solvers, best first.
+        """
+        with self._stats_lock:
+            latencies = [
+                stats['latency'] for stats in self._stats
+                if stats['latency'] is not None
+            ]
+
+            def cost(i):
+                stats = self._stats[i]
+                races = stats['wins'] + stats['unanswered'] + stats['failures']
+                if races == 0:
+                    return 0
+                # solvers that never won are at least as slow as the slowest
+                # winner
+                latency = stats['latency']
+                if latency is None:
+                    latency = max(latencies, default=self.hedge)
+                # smoothed, so a single lost race does not rule out a solver
+                answered = (stats['wins'] + 1) / (races + 2)
+                return latency / (
+                    max(self._accuracy(stats), 0.01) * answered)
+
+            return sorted(range(len(self.solvers)), key=cost)
+
+    @staticmethod
+    def _accuracy(stats):
+        # smoothed, so a single wrong guess does not rule out a solver
+        return (stats['wins'] - stats['incorrect'] + 1) / (stats['wins'] + 2)
+
+    def solve(self, image=None, url=None, base64=None):
+        job_id = str(uuid.uuid4())
+        race = {
+            'image': {'image': image, 'url': url, 'base64': base64},
+            'started': {}, 'futures': {}, 'pending': set(),
+            'waiting': [], 'winner': None, 'done': False,
+            'lock': threading.Lock(),
+        }
+        self._races[job_id] = race
+        # only recent races can be reported incorrect
+        while len(self._races) > 1000:
+            self._races.popitem(last=False)
+
+        ranking = self.ranking()
+        fanout = len(ranking) if self.fanout is None else self.fanout
+        race['pending'].update(ranking)
+        race['waiting'] = ranking[fanout:]
+        for i in ranking[:fanout]:
+            self._start(job_id, race, i)
+
+        if race['waiting']:
+            timer = threading.Timer(self.hedge, self._join, (job_id, race))
+            timer.daemon = True
+            timer.start()
+
+        return job_id
+
+    def _join(self, job_id, race):
+        with race['lock']:
+            waiting, race['waiting'] = race['waiting'], []
+        for i in waiting:
+            self._start(job_id, race, i)
+
+    def _start(self, job_id, race, i):
+        def run():
+            with race['lock']:
+                if race['done']:
+                    return
+                image = race['image']
+                race['started'][i] = time.monotonic()
+
+            try:
+                future = submit(
+                    self.solvers[i], callback=lambda f: self._finish(
+                        job_id, race, i, f),
+                    **image)
+            except Exception as e:
+                return self._lose(job_id, race, i, e)
+
+            with race['lock']:
+                race['futures'][i] = future
+                cancel = race['done']
+            if cancel:
+                future.cancel()
+
+        # solvers may block in solve, e.g., prompting a human
+        threading.Thread(
+            target=run, name='coto-racing-solver', daemon=True).start()
+
+    def _finish(self, job_id, race, i, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            return self._lose(job_id, race, i, future.exception())
+
+        with race['lock']:
+            if race['done']:
+                return
+            race['done'] = True
+            race['winner'] = i
+            race['image'] = None
+            race['futures'][i] = future
+            others = [f for j, f in race['futures'].items() if j != i]
+            started = dict(race['started'])
+            # failed solvers are no longer pending, and counted as failures
+            losers = [j for j in started if j != i and j in race['pending']]
+
+        latency = time.monotonic() - started[i]
+        with self._stats_lock:
+            stats = self._stats[i]
+            stats['wins'] += 1
+            stats['latency'] = latency if stats['latency'] is None else \
+                self.smoothing * latency \
+                + (1 - self.smoothing) * stats['latency']
+            # censored: the losers would have taken longer, by an unknown
+            # time
+            for j in losers:
+                self._stats[j]['unanswered'] += 1
+
+        for other in others:
+            other.cancel()
+
+        self.complete(job_id, future.result())
+
+    def _lose(self, job_id, race, i, exception):
+        with self._stats_lock:
+            self._stats[i]['failures'] += 1
+
+        with race['lock']:
+            race['pending'].discard(i)
+            lost = not race['pending'] and not race['done']
+            if lost:
+                race['done'] = True
+                race['image'] = None
+
+        if lost:
+            self.fail(job_id, exception)
+        else:
+            # no need to wait for the hedge when a solver gave up
+            self._join(job_id, race)
+
+    def incorrect(self, job_id):
+        race = self._races.get(job_id)
+        if race is None or race['winner'] is None:
+            return
+
+        i = race['winner']
+        with self._stats_lock:
+            self._stats[i]['incorrect'] += 1
+        self.solvers[i].incorrect(race['futures'][i].job_id)
+
+    def cancel(self, job_id):
+        race = self._races.get(job_id)
+        if race is None:
+            return
+
+        with race['lock']:
+            race['done'] = True
+            futures = list(race['futures'].values())
+        for future in futures:
+            future.cancel()
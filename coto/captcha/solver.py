@@ -0,0 +1,328 @@
+import base64 as _base64
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+
+class Solver:
+    """
+    Base class of captcha solvers.
+
+    :py:meth:`submit` hands a captcha to the solver and returns a
+    :py:class:`concurrent.futures.Future` of the guess, so the captchas of
+    many accounts can be pending at once without blocking a thread each.
+
+    Subclasses implement :py:meth:`solve` to start solving a captcha and
+    either:
+
+    * return the guess from :py:meth:`result` once known, which is polled
+      from a shared background thread, starting every ``interval`` seconds
+      and backing off to every ``max_interval`` seconds, or
+    * set ``poll = False`` and push the guess with :py:meth:`complete`, e.g.,
+      from a webhook or chat bot callback.
+
+    The clients download the captcha images through their session and pass
+    the bytes as ``image``, use :py:func:`encode` for solvers that need them
+    base64 encoded.
+    """
+
+    #: Whether :py:meth:`result` is polled for the guesses.
+    poll = True
+
+    #: Whether the clients download the captcha images for :py:meth:`solve`.
+    fetch_image = True
+
+    def __init__(self, interval=0.5, max_interval=5, backoff=1.5, timeout=None):
+        """
+        Args:
+            interval (float): Seconds before the first poll of a guess.
+            max_interval (float): Maximum seconds between polls of a guess.
+            backoff (float): Factor the seconds between polls grow by.
+            timeout (float): Seconds to poll a guess for before its future
+                fails with :py:class:`TimeoutError`, ``None`` for no limit.
+        """
+        self.interval = interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.timeout = timeout
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def solve(self, image=None, url=None, base64=None):
+        """
+        Start solving a captcha.
+
+        Args:
+            image (bytes): The captcha image.
+            url (str): URL of the captcha image.
+            base64 (str): The captcha image, base64 encoded.
+
+        Returns:
+            The id of the job.
+        """
+        raise NotImplementedError()
+
+    def result(self, job_id):
+        """
+        Args:
+            job_id: Id returned by :py:meth:`solve`.
+
+        Returns:
+            str: The guess, ``None`` while it is not known yet.
+        """
+        return None
+
+    def incorrect(self, job_id):
+        """
+        Called when the guess of a job was wrong.
+
+        Args:
+            job_id: Id returned by :py:meth:`solve`.
+        """
+        pass
+
+    def cancel(self, job_id):
+        """
+        Called when the future of a job was cancelled, e.g., because another
+        solver answered first.
+
+        Args:
+            job_id: Id returned by :py:meth:`solve`.
+        """
+        pass
+
+    def submit(self, image=None, url=None, base64=None, callback=None):
+        """
+        Start solving a captcha.
+
+        Args:
+            image (bytes): The captcha image.
+            url (str): URL of the captcha image.
+            base64 (str): The captcha image, base64 encoded.
+            callback (callable): Called with the future once the guess is
+                known.
+
+        Returns:
+            concurrent.futures.Future: Future of the guess, with the id of
+            the job in its ``job_id`` attribute.
+        """
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+
+        job_id = self.solve(**_image(image=image, url=url, base64=base64))
+        future.job_id = job_id
+
+        with self._lock:
+            # the guess may have been pushed while solve was running
+            pushed = self._futures.pop(job_id, None)
+            if pushed is None:
+                self._futures[job_id] = future
+
+        if pushed is not None:
+            _chain(pushed, future)
+        elif self.poll:
+            poller().watch(
+                self.result, job_id, future, self.interval, self.max_interval,
+                self.backoff, self.timeout)
+
+        future.add_done_callback(lambda _: self._forget(job_id, future))
+        return future
+
+    def _forget(self, job_id, future):
+        with self._lock:
+            if self._futures.get(job_id) is future:
+                del self._futures[job_id]
+
+        if future.cancelled():
+            self.cancel(job_id)
+
+    def complete(self, job_id, guess):
+        """
+        Push the guess of a job, for solvers notified of their results.
+
+        Args:
+            job_id: Id returned by :py:meth:`solve`.
+            guess (str): The guess.
+        """
+        future = self._pushed(job_id)
+        if not future.done():
+            future.set_result(guess)
+
+    def fail(self, job_id, exception):
+        """
+        Push the failure of a job, for solvers notified of their results.
+
+        Args:
+            job_id: Id returned by :py:meth:`solve`.
+            exception (Exception): Raised by the future of the guess.
+        """
+        future = self._pushed(job_id)
+        if not future.done():
+            future.set_exception(exception)
+
+    def _pushed(self, job_id):
+        with self._lock:
+            future = self._futures.pop(job_id, None)
+            if future is None:
+                # solve has not returned yet, submit picks it up
+                future = self._futures[job_id] = Future()
+        return future
+
+
+def _image(**kwargs):
+    return {k: v for k, v in kwargs.items() if v is not None}
+
+
+def encode(image):
+    """
+    Args:
+        image (bytes): A captcha image.
+
+    Returns:
+        str: The image, base64 encoded.
+    """
+    return _base64.b64encode(image).decode('ascii')
+
+
+def _chain(source, target):
+    if source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class Poller:
+    """
+    Polls the results of captcha jobs from a single background thread, in
+    the order they are due.
+    """
+
+    def __init__(self):
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def watch(
+        self, result, job_id, future, interval=0.5, max_interval=5,
+        backoff=1.5, timeout=None,
+    ):
+        """
+        Poll ``result(job_id)`` until it returns a guess, and set it as the
+        result of the future.
+
+        Args:
+            result (callable): Returns the guess of a job, ``None`` if not
+                known yet.
+            job_id: Id of the job.
+            future (concurrent.futures.Future): Future of the guess.
+            interval (float): Seconds before the first poll.
+            max_interval (float): Maximum seconds between polls.
+            backoff (float): Factor the seconds between polls grow by.
+            timeout (float): Seconds to poll for, ``None`` for no limit.
+        """
+        now = time.monotonic()
+        deadline = now + timeout if timeout is not None else None
+        job = [result, job_id, future, interval, max_interval, backoff, deadline]
+
+        # a guess known right away does not wait for the first interval
+        if not self._poll(job):
+            self._schedule(now + interval, job)
+
+    def _schedule(self, due, job):
+        with self._condition:
+            heapq.heappush(self._queue, (due, next(self._counter), job))
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='coto-captcha-poller', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _poll(self, job):
+        result, job_id, future, _, _, _, deadline = job
+        if future.done():
+            return True
+
+        try:
+            guess = result(job_id)
+        except Exception as e:
+            future.set_exception(e)
+            return True
+
+        if guess is not None:
+            future.set_result(guess)
+            return True
+
+        if deadline is not None and time.monotonic() >= deadline:
+            future.set_exception(
+                TimeoutError("captcha {0} not solved in time".format(job_id)))
+            return True
+
+        return False
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue or self._queue[0][0] > time.monotonic():
+                    wait = self._queue[0][0] - time.monotonic() \
+                        if self._queue else None
+                    self._condition.wait(wait)
+                _, _, job = heapq.heappop(self._queue)
+
+            if not self._poll(job):
+                # back off on captchas taking longer
+                job[3] = min(job[3] * job[5], job[4])
+                self._schedule(time.monotonic() + job[3], job)
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def poller():
+    """
+    Returns:
+        Poller: The poller shared by all solvers.
+    """
+    global _poller
+    with _poller_lock:
+        if _poller is None:
+            _poller = Poller()
+        return _poller
+
+
+def submit(solver, image=None, url=None, base64=None, callback=None):
+    """
+    Start solving a captcha with any solver, including solvers implementing
+    only ``solve`` and ``result`` without subclassing :py:class:`Solver`.
+    Those are passed the ``url`` of the image, or the image base64 encoded
+    when there is no URL.
+
+    Args:
+        solver: The captcha solver.
+        image (bytes): The captcha image.
+        url (str): URL of the captcha image.
+        base64 (str): The captcha image, base64 encoded.
+        callback (callable): Called with the future once the guess is known.
+
+    Returns:
+        concurrent.futures.Future: Future of the guess, with the id of the
+        job in its ``job_id`` attribute.
+    """
+    if hasattr(solver, 'submit'):
+        return solver.submit(
+            image=image, url=url, base64=base64, callback=callback)
+
+    future = Future()
+    if callback is not None:
+        future.add_done_callback(callback)
+
+    if url is None and base64 is None and image is not None:
+        base64 = encode(image)
+    future.job_id = solver.solve(
+        **({'url': url} if url is not None else {'base64': base64}))
+    poller().watch(solver.result, future.job_id, future)
+    return future
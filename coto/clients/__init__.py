@@ -1,20 +1,170 @@
+import functools
+import importlib
+from ..exceptions import SessionExpiredException, TokenRejectedException
+from .steps import call, operation, parallel, steps_of
+
+
+def reauth_decorator(func):
+    """
+    Signin again and replay the steps once, when the session has expired.
+
+    Tokens from the token store that the console rejects are dropped and the
+    steps replayed once with new tokens. The tokens of the client are put in
+    the store after the steps succeeded.
+    """
+    def replay(self, args, kwargs):
+        try:
+            return (yield from func(self, *args, **kwargs))
+        except TokenRejectedException:
+            self._drop_tokens()
+            return (yield from func(self, *args, **kwargs))
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self._warming is not None:
+            try:
+                yield self._warming
+            except Exception:
+                # loaded again by the steps
+                pass
+            self._warming = None
+
+        try:
+            result = yield from replay(self, args, kwargs)
+        except SessionExpiredException:
+            if not (yield call('_reauthenticate')):
+                raise
+
+            result = yield from replay(self, args, kwargs)
+
+        self._share_tokens()
+        return result
+
+    return wrapper
+
+
 class BaseClient:
+    """
+    Base of the service clients. Their methods are written as steps, see
+    :py:mod:`coto.clients.steps`, and run on the session of the client.
+    """
     REQUIRES_AUTHENTICATION = True
 
     def __init__(self, session):
         self._session = session
+        self._stored_tokens = False
+        self._shared_tokens = None
+        self._warming = None
 
     def session(self):
         return self._session
 
-from . import billing
-from . import account
-from . import federation
-from . import iam
-from . import mfa
-from . import support
-from . import resetpassword
-from . import signin
-from . import signin_amazon
-from . import signin_aws
-from . import sso
\ No newline at end of file
+    @property
+    def _service(self):
+        return type(self).__module__.rsplit('.', 1)[-1]
+
+    def _dump_tokens(self):
+        """
+        Returns:
+            dict: The tokens obtained by this client, to be restored with
+            :py:meth:`_load_tokens`.
+        """
+        return {}
+
+    def _load_tokens(self, tokens):
+        pass
+
+    def _fetch_tokens(self):
+        """
+        Steps loading the page with the tokens of this client, unless it has
+        them.
+        """
+        yield from ()
+
+    def _warm(self):
+        yield from self._fetch_tokens()
+        if not self._stored_tokens:
+            self._share_tokens()
+
+    def _restore_tokens(self, tokens):
+        """
+        Load tokens saved or stored earlier, which the console may reject.
+        """
+        self._load_tokens(tokens)
+        self._stored_tokens = True
+        self._shared_tokens = self._dump_tokens()
+
+    def _check_tokens(self, r):
+        """
+        Raises:
+            :py:class:`coto.exceptions.TokenRejectedException`: The request
+                was refused with tokens restored from earlier.
+        """
+        if self._stored_tokens and r.status_code == 403:
+            raise TokenRejectedException(
+                "{0} token rejected".format(self._service), r)
+
+    def _drop_tokens(self):
+        session = self.session()
+        session.token_store.invalidate(session.identity, self._service)
+        self._load_tokens({})
+        self._stored_tokens = False
+        self._shared_tokens = None
+
+    def _share_tokens(self):
+        """
+        Put the tokens of this client in the token store when they changed.
+        """
+        self._stored_tokens = False
+        if not self.REQUIRES_AUTHENTICATION:
+            return
+
+        tokens = self._dump_tokens()
+        if tokens == self._shared_tokens or \
+                all(v is None for v in tokens.values()):
+            return
+
+        session = self.session()
+        session.token_store.set(session.identity, self._service, tokens)
+        self._shared_tokens = tokens
+
+
+SERVICES = (
+    'account',
+    'billing',
+    'federation',
+    'iam',
+    'mfa',
+    'resetpassword',
+    'signin',
+    'signin_amazon',
+    'signin_aws',
+    'sso',
+    'support',
+)
+
+
+def get(service):
+    """
+    Import the module of a service on first use.
+
+    Args:
+        service (str): Name of the service, e.g., ``iam``.
+
+    Returns:
+        module: The module of the service client, ``None`` if the service
+        is not supported.
+    """
+    if service not in SERVICES:
+        return None
+
+    return importlib.import_module('.' + service, __name__)
+
+
+def __getattr__(name):
+    # keep ``clients.iam`` working without importing every client upfront
+    if name in SERVICES:
+        return get(name)
+
+    raise AttributeError(
+        "module {0!r} has no attribute {1!r}".format(__name__, name))
@@ -1,8 +1,8 @@
-from bs4 import BeautifulSoup
 from pyotp import TOTP
 from datetime import datetime, timedelta
 import json
-from . import BaseClient
+from . import BaseClient, reauth_decorator, call, operation
+from .. import extract
 
 
 class ReauthException(Exception):
@@ -33,27 +33,35 @@ class Client(BaseClient):
         super().__init__(session)
         self.__csrf_token = None
 
+    def _dump_tokens(self):
+        return {'csrf_token': self.__csrf_token}
+
+    def _load_tokens(self, tokens):
+        self.__csrf_token = tokens.get('csrf_token')
+
+    def _fetch_tokens(self):
+        yield from self._csrf_token()
+
     def _csrf_token(self):
         if self.__csrf_token == None:
-            self._get_tokens()
+            yield from self._get_tokens()
 
         return self.__csrf_token
 
     def _get_tokens(self):
-        r = self.session()._get(
-            'https://signin.aws.amazon.com/updateaccount?redirect_uri=https%3A%2F%2Fconsole.aws.amazon.com%2Fbilling%2Fhome%23%2Faccount'
+        r = yield call(
+            '_get',
+            'https://signin.aws.amazon.com/updateaccount?redirect_uri=https%3A%2F%2Fconsole.aws.amazon.com%2Fbilling%2Fhome%23%2Faccount',
+            operation='account.tokens',
         )
 
         if r.status_code != 200:
             raise Exception("failed get tokens")
 
-        soup = BeautifulSoup(r.text, 'html.parser')
-        meta = {
-            m['name']: m['content']
-            for m in soup.find_all('meta') if 'name' in m.attrs
-        }
+        meta = extract.meta_content(r.text, names=('csrf_token',))
         self.__csrf_token = meta['csrf_token']
 
+    @reauth_decorator
     def _action(self, action, data=None):
         """
         Execute an action on the updateaccount API.
@@ -74,16 +82,20 @@ class Client(BaseClient):
 
         data['action'] = action
         data['redirect_uri'] = self._REDIRECT_URL
-        data['csrf'] = self._csrf_token()
+        data['csrf'] = yield from self._csrf_token()
 
-        r = self.session()._post(
+        r = yield call(
+            '_post',
             'https://signin.aws.amazon.com/updateaccount',
             data=data,
+            operation='account.{0}'.format(action),
+            idempotent=action == 'getAuthState',
         )
 
+        self._check_tokens(r)
+
         if r.status_code != 200:
-            print(r.text)
-            raise Exception("failed action {0}".format(action))
+            raise Exception("failed action {0}: {1}".format(action, r.text))
 
         out = json.loads(r.text)
         if out['state'] == 'FAIL' and out['properties']['action'] == 'reAuth':
@@ -97,6 +109,7 @@ class Client(BaseClient):
 
         return out['properties']
 
+    @operation
     def get_account_info(self):
         """
         Gets the account name and email address.
@@ -122,8 +135,9 @@ class Client(BaseClient):
             :py:class:`coto.clients.decoupled_account.ReauthException`: You have to
                 reauthenticate, then try again.
         """
-        return self._action('getAuthState')
+        return (yield from self._action('getAuthState'))
 
+    @operation
     def update_account_name(self, AccountName):
         """
         Sets a new account name.
@@ -150,10 +164,11 @@ class Client(BaseClient):
             :py:class:`coto.clients.decoupled_account.ReauthException`: You have to
                 reauthenticate, then try again.
         """
-        return self._action('updateAccountName', {
+        return (yield from self._action('updateAccountName', {
             'newAccountName': AccountName,
-        })
+        }))
 
+    @operation
     def update_account_email(self, Password, AccountEmail):
         """
         Sets a new account email address.
@@ -185,11 +200,12 @@ class Client(BaseClient):
             :py:class:`coto.clients.decoupled_account.ReauthException`: You have to
                 reauthenticate, then try again.
         """
-        return self._action('updateAccountEmail', {
+        return (yield from self._action('updateAccountEmail', {
             'password': Password,
             'newEmailAddress': AccountEmail,
-        })
+        }))
 
+    @operation
     def update_account_password(self, Password, NewPassword):
         """
         Sets a new account password.
@@ -220,9 +236,9 @@ class Client(BaseClient):
             :py:class:`coto.clients.decoupled_account.ReauthException`: You have to
                 reauthenticate, then try again.
         """
-        return self._action(
+        return (yield from self._action(
             'updateAccountPassword', {
                 'oldpassword': Password,
                 'newpassword': NewPassword,
                 'newpassword1': NewPassword,
-            })
+            }))
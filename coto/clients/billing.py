@@ -1,5 +1,5 @@
 import json
-from . import BaseClient
+from . import BaseClient, reauth_decorator, call, operation, steps_of
 
 
 class Client(BaseClient):
@@ -33,15 +33,26 @@ class Client(BaseClient):
         super().__init__(session)
         self.__xsrf_token = None
 
+    def _dump_tokens(self):
+        return {'xsrf_token': self.__xsrf_token}
+
+    def _load_tokens(self, tokens):
+        self.__xsrf_token = tokens.get('xsrf_token')
+
+    def _fetch_tokens(self):
+        yield from self._xsrf_token()
+
     def _xsrf_token(self):
         if self.__xsrf_token is None:
-            self.__xsrf_token = self._get_xsrf_token()
+            self.__xsrf_token = yield from self._get_xsrf_token()
 
         return self.__xsrf_token
 
     def _get_xsrf_token(self):
-        r = self.session()._get(
-            'https://console.aws.amazon.com/billing/home?region=eu-central-1&state=hashArgs%23'
+        r = yield call(
+            '_get',
+            'https://console.aws.amazon.com/billing/home?region=eu-central-1&state=hashArgs%23',
+            operation='billing.xsrf_token',
         )
 
         if r.status_code != 200:
@@ -49,35 +60,41 @@ class Client(BaseClient):
 
         return r.headers['x-awsbc-xsrf-token']
 
+    @reauth_decorator
     def _get(self, api):
-        r = self.session()._get(
+        token = yield from self._xsrf_token()
+        r = yield call(
+            '_get',
             "https://console.aws.amazon.com/billing/rest/v1.0/{0}?state=hashArgs%23".
             format(api),
-            headers={'x-awsbc-xsrf-token': self._xsrf_token()})
+            headers={'x-awsbc-xsrf-token': token},
+            expect_json=True)
+
+        self._check_tokens(r)
 
         if r.status_code != 200:
             raise Exception("failed get {0}".format(api))
 
         return r
 
+    @reauth_decorator
     def _put(self, api, data=None):
-        if data is None:
-            r = self.session()._put(
-                "https://console.aws.amazon.com/billing/rest/v1.0/{0}?state=hashArgs%23".
-                format(api),
-                headers={
-                    'x-awsbc-xsrf-token': self._xsrf_token(),
-                    'Content-Type': 'application/json',
-                })
-        else:
-            r = self.session()._put(
-                "https://console.aws.amazon.com/billing/rest/v1.0/{0}?state=hashArgs%23".
-                format(api),
-                headers={
-                    'x-awsbc-xsrf-token': self._xsrf_token(),
-                    'Content-Type': 'application/json',
-                },
-                data=json.dumps(data))
+        kwargs = {}
+        if data is not None:
+            kwargs['data'] = json.dumps(data)
+
+        token = yield from self._xsrf_token()
+        r = yield call(
+            '_put',
+            "https://console.aws.amazon.com/billing/rest/v1.0/{0}?state=hashArgs%23".
+            format(api),
+            headers={
+                'x-awsbc-xsrf-token': token,
+                'Content-Type': 'application/json',
+            },
+            **kwargs)
+
+        self._check_tokens(r)
 
         if r.status_code != 200:
             raise Exception("failed put {}: {}".format(api, r.text))
@@ -86,6 +103,7 @@ class Client(BaseClient):
 
     # billing api
 
+    @operation
     def list_alternate_contacts(self):
         """
         Lists the alternate contacts set for the account. In order to keep the
@@ -113,9 +131,10 @@ class Client(BaseClient):
                     },
                 ]
         """
-        r = self._get('additionalcontacts')
+        r = yield from self._get('additionalcontacts')
         return json.loads(r.text)
 
+    @operation
     def set_alternate_contacts(self, AlternateContacts):
         """
         Sets the alternate contacts set for the account. In order to keep the
@@ -170,8 +189,9 @@ class Client(BaseClient):
         Args:
             AlternateContacts (list): List of alternate contacts.
         """
-        self._put('additionalcontacts', AlternateContacts)
+        yield from self._put('additionalcontacts', AlternateContacts)
 
+    @operation
     def list_tax_registrations(self):
         """
         Lists the tax registrations set for the account.
@@ -218,9 +238,10 @@ class Client(BaseClient):
                     },
                 ]
         """
-        r = self._get('taxexemption/eu/vat/information')
+        r = yield from self._get('taxexemption/eu/vat/information')
         return json.loads(r.text)['taxRegistrationList']
 
+    @operation
     def set_tax_registration(self, TaxRegistration):
         """
         Set the tax registrations for the account.
@@ -254,8 +275,9 @@ class Client(BaseClient):
         Args:
             TaxRegistration (dict): Desired tax registration.
         """
-        self._put('taxexemption/eu/vat/information', TaxRegistration)
+        yield from self._put('taxexemption/eu/vat/information', TaxRegistration)
 
+    @operation
     def delete_tax_registration(self, TaxRegistration):
         """
         Delete the given tax registrations from the account.
@@ -287,8 +309,9 @@ class Client(BaseClient):
             TaxRegistration (dict): Tax registration to delete.
         """
         TaxRegistration['currentStatus'] = 'Deleted'
-        return self.set_tax_registration(TaxRegistration)
+        return (yield from steps_of(self.set_tax_registration, TaxRegistration))
 
+    @operation
     def account_status(self):
         """
         Obtain the status of the account.
@@ -307,9 +330,10 @@ class Client(BaseClient):
         Returns:
             string: status
         """
-        r = self._get('account/status')
+        r = yield from self._get('account/status')
         return json.loads(r.text)
 
+    @operation
     def close_account(self):
         """
         Close the account. Returns True iff successful, otherwise throws
@@ -323,5 +347,5 @@ class Client(BaseClient):
         Returns:
             boolean: success
         """
-        self._put('account')
+        yield from self._put('account')
         return True
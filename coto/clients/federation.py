@@ -1,7 +1,7 @@
 from furl import furl
 import json
 import requests
-from . import BaseClient
+from . import BaseClient, call, operation, steps_of
 
 
 class Client(BaseClient):
@@ -10,6 +10,7 @@ class Client(BaseClient):
     def __init__(self, session):
         super().__init__(session)
 
+    @operation
     def signin(self, boto3_session):
         """
         Signin using a boto3 session.
@@ -45,13 +46,19 @@ class Client(BaseClient):
         Returns:
             bool: Signin succeeded.
         """
-        r = self.session()._get(self.get_signin_url(boto3_session))
+        url = yield from steps_of(self.get_signin_url, boto3_session)
+        r = yield call(
+            '_get',
+            url,
+            operation='federation.login',
+        )
         if r.status_code != 200:
             raise Exception("failed session signin")
 
         self.session().authenticated = True
         return True
 
+    @operation
     def get_signin_url(self, boto3_session):
         """
         Signin using a boto3 session.
@@ -92,10 +99,12 @@ class Client(BaseClient):
         url.args['Action'] = "login"
         url.args['Issuer'] = None
         url.args['Destination'] = "https://console.aws.amazon.com/"
-        url.args['SigninToken'] = self.get_signin_token(boto3_session)
+        url.args['SigninToken'] = yield from steps_of(
+            self.get_signin_token, boto3_session)
 
         return url.url
 
+    @operation
     def get_signin_token(self, boto3_session):
         """
         Obtain a signin token for a boto3 session.
@@ -120,7 +129,8 @@ class Client(BaseClient):
         credentials = boto3_session.get_credentials()
 
         url = "https://signin.aws.amazon.com/federation"
-        response = self.session()._get(
+        response = yield call(
+            '_get',
             url,
             params={
                 "Action":
@@ -131,6 +141,7 @@ class Client(BaseClient):
                     "sessionKey": credentials.secret_key,
                     "sessionToken": credentials.token,
                 })
-            }
+            },
+            operation='federation.getSigninToken',
         )
         return json.loads(response.text)["SigninToken"]
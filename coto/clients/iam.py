@@ -1,8 +1,6 @@
-from bs4 import BeautifulSoup
-from pyotp import TOTP
-from datetime import datetime, timedelta
 import json
-from . import BaseClient
+from . import BaseClient, reauth_decorator, call, operation
+from .. import extract
 
 
 class Client(BaseClient):
@@ -39,88 +37,104 @@ class Client(BaseClient):
         super().__init__(session)
         self.__xsrf_token = None
 
+    def _dump_tokens(self):
+        return {'xsrf_token': self.__xsrf_token}
+
+    def _load_tokens(self, tokens):
+        self.__xsrf_token = tokens.get('xsrf_token')
+
     def _url(self, api):
         return "https://console.aws.amazon.com/iam/{0}".format(api)
 
+    def _fetch_tokens(self):
+        yield from self._xsrf_token()
+
     def _xsrf_token(self):
         if self.__xsrf_token is None:
-            self._get_xsrf_token()
+            yield from self._get_xsrf_token()
 
         return self.__xsrf_token
 
     def _get_xsrf_token(self):
-        r = self.session()._get(
-            'https://console.aws.amazon.com/iam/home?&state=hashArgs%23')
+        r = yield call(
+            '_get',
+            'https://console.aws.amazon.com/iam/home?&state=hashArgs%23',
+            operation='iam.xsrf_token')
 
         if r.status_code != 200:
             raise Exception("failed get token")
 
-        r = self.session()._get('https://console.aws.amazon.com/iam/home?#/security_credentials')
+        r = yield call(
+            '_get',
+            'https://console.aws.amazon.com/iam/home?#/security_credentials',
+            operation='iam.xsrf_token')
 
         if r.status_code != 200:
             raise Exception("failed get token")
 
-        soup = BeautifulSoup(r.text, 'html.parser')
-        for m in soup.find_all('meta'):
-            if 'id' in m.attrs and m['id'] == "xsrf-token":
-                self.__xsrf_token = m['data-token']
-                return
+        m = extract.find_meta(r.text, id='xsrf-token')
+        if m is not None and 'data-token' in m:
+            self.__xsrf_token = m['data-token']
+            return
 
         raise Exception('unable to obtain IAM xsrf_token')
 
-    def _get(self, api):
-        r = self.session()._get(
-            self._url(api), headers={'X-CSRF-Token': self._xsrf_token()})
+    def _parse(self, r, failure):
+        self._check_tokens(r)
 
         if 'X-CSRF-Token' in r.headers:
             self.__xsrf_token = r.headers['X-CSRF-Token']
 
         if r.status_code != 200:
-            print(r.text)
-            raise Exception("failed get {0}".format(api))
+            raise Exception("{0}: {1}".format(failure, r.text))
 
         return json.loads(r.text)
 
+    @reauth_decorator
+    def _get(self, api):
+        token = yield from self._xsrf_token()
+        r = yield call(
+            '_get',
+            self._url(api), headers={'X-CSRF-Token': token},
+            expect_json=True)
+
+        return self._parse(r, "failed get {0}".format(api))
+
+    @reauth_decorator
     def _post(self, api, data=None):
-        r = self.session()._post(
+        token = yield from self._xsrf_token()
+        r = yield call(
+            '_post',
             self._url(api),
             headers={
-                'X-CSRF-Token': self._xsrf_token(),
+                'X-CSRF-Token': token,
                 'Content-Type': 'application/json',
             },
             data=json.dumps(data) if data is not None else None,
+            expect_json=True,
         )
 
-        if 'X-CSRF-Token' in r.headers:
-            self.__xsrf_token = r.headers['X-CSRF-Token']
-
-        if r.status_code != 200:
-            print(r.text)
-            raise Exception("failed post {0}".format(api))
-
-        return json.loads(r.text)
+        return self._parse(r, "failed post {0}".format(api))
 
+    @reauth_decorator
     def _http(self, method, api, data=None):
-        r = self.session()._post(
+        token = yield from self._xsrf_token()
+        r = yield call(
+            '_post',
             self._url(api),
             headers={
-                'X-CSRF-Token': self._xsrf_token(),
+                'X-CSRF-Token': token,
                 'x-http-method-override': method.upper(),
             },
             data=json.dumps(data) if data is not None else None,
+            expect_json=True,
         )
 
-        if 'X-CSRF-Token' in r.headers:
-            self.__xsrf_token = r.headers['X-CSRF-Token']
-
-        if r.status_code != 200:
-            print(r.text)
-            raise Exception("failed delete {0}".format(api))
-
-        return json.loads(r.text)
+        return self._parse(r, "failed delete {0}".format(api))
 
     # iam api
 
+    @operation
     def get_account_info(self):
         """
         Retrieves a summary of account information.
@@ -189,8 +203,9 @@ class Client(BaseClient):
                     }
                 }
         """
-        return self._get('service/account')
+        return (yield from self._get('service/account'))
 
+    @operation
     def list_root_mfa_devices(self):
         """
         Lists enabled root MFA devices.
@@ -213,9 +228,10 @@ class Client(BaseClient):
                     'truncated': bool
                 }
         """
-        r = self._get('api/mfa')
+        r = yield from self._get('api/mfa')
         return r
 
+    @operation
     def create_virtual_mfa_device(
             self, VirtualMFADeviceName='root-account-mfa-device', Path='/'):
         """
@@ -260,12 +276,13 @@ class Client(BaseClient):
             **base32StringSeed** (*str*) -- The Base32 seed defined as specified
             in RFC3548 . The Base32StringSeed is Base64-encoded.
         """
-        r = self._post('api/mfa/createVirtualMfa', {
+        r = yield from self._post('api/mfa/createVirtualMfa', {
             'path': Path,
             'virtualMFADeviceName': VirtualMFADeviceName
         })
         return r
 
+    @operation
     def enable_root_mfa_device(self,
                                SerialNumber,
                                Base32StringSeed=None,
@@ -314,13 +331,10 @@ class Client(BaseClient):
 
         """
         if Base32StringSeed:
-            current = datetime.now()
-            previous = current - timedelta(seconds=30)
-            totp = TOTP(Base32StringSeed)
-            AuthenticationCode1 = totp.at(previous)
-            AuthenticationCode2 = totp.at(current)
+            AuthenticationCode1, AuthenticationCode2 = \
+                yield call('_mfa_codes', Base32StringSeed, 2)
 
-        r = self._post(
+        r = yield from self._post(
             'api/mfa/enableMfaDevice', {
                 'userName': '',
                 'serialNumber': SerialNumber,
@@ -329,6 +343,7 @@ class Client(BaseClient):
             })
         return r
 
+    @operation
     def deactivate_root_mfa_device(self, SerialNumber):
         """
         Deactivates the specified MFA device and removes it from association
@@ -346,9 +361,10 @@ class Client(BaseClient):
                 MFA device. For virtual MFA devices, the serial number is the
                 device ARN.
         """
-        r = self._post('api/mfa/deactivateMfaDevice', {'serialNumber': SerialNumber, 'userName': ''})
+        r = yield from self._post('api/mfa/deactivateMfaDevice', {'serialNumber': SerialNumber, 'userName': ''})
         return r
 
+    @operation
     def list_root_access_keys(self, Deleted=False):
         """
         List the access key pairs associated with the account root user.
@@ -382,11 +398,12 @@ class Client(BaseClient):
                 ]
         """
         if Deleted:
-            r = self._get('service/root/keys/?deleted=1')
+            r = yield from self._get('service/root/keys/?deleted=1')
         else:
-            r = self._get('service/root/keys')
+            r = yield from self._get('service/root/keys')
         return r
 
+    @operation
     def create_root_access_key(self):
         """
         Creates a new AWS secret access key and corresponding AWS access key ID
@@ -410,9 +427,10 @@ class Client(BaseClient):
                     "deleteDate": int
                 }
         """
-        r = self._post('service/root/keys')
+        r = yield from self._post('service/root/keys')
         return r
 
+    @operation
     def update_root_access_key(self, AccessKeyId, Status='Inactive'):
         """
         Changes the status of the specified access key from Active to Inactive,
@@ -438,11 +456,12 @@ class Client(BaseClient):
             bool: success
         """
         if Status.lower() == 'active':
-            r = self._http('service/activate', "root/keys/{0}".format(AccessKeyId))
+            r = yield from self._http('service/activate', "root/keys/{0}".format(AccessKeyId))
         else:
-            r = self._http('service/deactivate', "root/keys/{0}".format(AccessKeyId))
+            r = yield from self._http('service/deactivate', "root/keys/{0}".format(AccessKeyId))
         return r['success']
 
+    @operation
     def delete_root_access_key(self, AccessKeyId):
         """
         Deletes the access key pair associated with the account root user.
@@ -461,5 +480,5 @@ class Client(BaseClient):
         Returns:
             bool: success
         """
-        r = self._http('delete', "service/root/keys/{0}".format(AccessKeyId))
+        r = yield from self._http('delete', "service/root/keys/{0}".format(AccessKeyId))
         return r['success']
@@ -1,7 +1,7 @@
 from bs4 import BeautifulSoup
 from pyotp import TOTP
 import json
-from . import BaseClient
+from . import BaseClient, call, operation
 
 
 class Client(BaseClient):
@@ -12,15 +12,22 @@ class Client(BaseClient):
         super().__init__(session)
         self._signin = self.session().client('signin_aws')
 
+    @operation
     def get_mfa_status(self, email):
-        r = self.session()._post(
+        csrf_token = yield from self._signin._csrf_token()
+        session_id = yield from self._signin._session_id()
+        r = yield call(
+            '_post',
             "https://signin.aws.amazon.com/mfa",
             data={
                 'email': email,
                 '_redirect_url': self._REDIRECT_URL,
-                'csrf': self._signin._csrf_token(),
-                'sessionId': self._signin._session_id(),
-            })
+                'csrf': csrf_token,
+                'sessionId': session_id,
+            },
+            operation='mfa.get_mfa_status',
+            idempotent=True,
+        )
 
         if r.status_code != 200:
             raise Exception("failed get mfa status for {0}".format(email))
@@ -3,13 +3,10 @@ from bs4 import BeautifulSoup
 from pyotp import TOTP
 from urllib import parse
 import json
-from . import BaseClient
+from . import BaseClient, call, operation, steps_of
 from .signin_amazon import ap_url
-import time
+from .. import extract
 from PIL import Image
-import shutil
-import base64
-import tempfile
 
 
 class Client(BaseClient):
@@ -21,25 +18,29 @@ class Client(BaseClient):
         super().__init__(session)
         self.__csrf_token = None
 
+    def _dump_tokens(self):
+        return {'csrf_token': self.__csrf_token}
+
+    def _load_tokens(self, tokens):
+        self.__csrf_token = tokens.get('csrf_token')
+
     def _csrf_token(self):
         if self.__csrf_token == None:
-            self._get_tokens()
+            yield from self._get_tokens()
 
         return self.__csrf_token
 
     def _get_tokens(self):
-        r = self.session()._get(
-            'https://signin.aws.amazon.com/resetpassword'
+        r = yield call(
+            '_get',
+            'https://signin.aws.amazon.com/resetpassword',
+            operation='resetpassword.tokens',
         )
 
         if r.status_code != 200:
             raise Exception("failed get tokens")
 
-        soup = BeautifulSoup(r.text, 'html.parser')
-        meta = {
-            m['name']: m['content']
-            for m in soup.find_all('meta') if 'name' in m.attrs
-        }
+        meta = extract.meta_content(r.text, names=('csrf_token',))
 
         if not 'csrf_token' in meta:
             raise Exception("failed get csrf_token")
@@ -61,16 +62,17 @@ class Client(BaseClient):
 
         data['action'] = action
         # data['redirect_uri'] = self._REDIRECT_URL
-        data['csrf'] = self._csrf_token()
+        data['csrf'] = yield from self._csrf_token()
 
-        r = self.session()._post(
+        r = yield call(
+            '_post',
             "https://signin.aws.amazon.com/{0}".format(api),
             data=data,
+            operation='resetpassword.{0}'.format(action),
         )
 
         if r.status_code != 200:
-            print(r.text)
-            raise Exception("failed action {0}".format(action))
+            raise Exception("failed action {0}: {1}".format(action, r.text))
 
         out = json.loads(r.text)
         if out['state'].lower() != 'success':
@@ -81,23 +83,25 @@ class Client(BaseClient):
 
         return out['properties']
 
+    @operation
     def reset_password(self, reset_token_url, password):
         """
         Performs a password reset.
         """
         query = parse.parse_qs(parse.urlparse(reset_token_url).query)
-        return self._action('resetPasswordSubmitForm', {
+        return (yield from self._action('resetPasswordSubmitForm', {
             'token': query['token'][0],
             'key': query['key'][0],
             'newpassword': password,
             'confirmpassword': password,
-        }, api='resetpassword')
+        }, api='resetpassword'))
 
+    @operation
     def request_otp_forgot_password(self, email):
         """
         Request an OTP to be sent to the email.
         """
-        response = self.session()._get(ap_url(email, 'forgotpassword'))
+        response = yield call('_get', ap_url(email, 'forgotpassword'))
         soup = BeautifulSoup(response.text, 'html.parser')
 
         error = soup.find(id="message_error")
@@ -118,28 +122,18 @@ class Client(BaseClient):
             data[name] = value
                 
         data['email'] = email
-        captcha_page = self.session()._post(
+        captcha_page = yield call(
+            '_post',
             form.get('action'),
             data=data
         )
 
         captcha_page_soup = BeautifulSoup(captcha_page.text, 'html.parser')
         div = captcha_page_soup.find_all('div', class_='cvf-captcha-img')
-        solver = self.session()._captcha_solver
-
-        tmp_folder = tempfile.TemporaryDirectory()
-
-        _image = self._get_image(div[0].img['src'], tmp_folder.name)
-        b64_image = self.process_image(_image, tmp_folder.name)
-        guess_uuid = solver.solve(base64=b64_image)
-
-        while True:
-            guess = solver.result(guess_uuid)
-
-            if guess is None:
-                time.sleep(5)
-            else:
-                break
+        image = yield call('_captcha_image', div[0].img['src'])
+        image = self.process_image(image)
+        future = yield call('_solve_captcha', image=image)
+        guess = yield future
 
         error = captcha_page_soup.find(id="message_error")
         if error:
@@ -159,60 +153,50 @@ class Client(BaseClient):
             data[name] = value
                 
         data['cvf_captcha_input'] = guess
-        verify = self.session()._post(
+        verify = yield call(
+            '_post',
             "https://www.amazon.com/ap/cvf/verify",
             data=data
         )
         soup = BeautifulSoup(verify.text, 'html.parser')
         if soup.find_all(class_='cvf-widget-alert-id-cvf-captcha-error'):
             try:
-                solver.incorrect(guess_uuid)
+                self.session()._captcha_solver.incorrect(future.job_id)
             except Exception as e:
                 print (f"ERROR Reporting {e}")
-            return self.request_otp_forgot_password(email)
+            return (yield from steps_of(
+                self.request_otp_forgot_password, email))
 
-        self.__reset_page = self.session()._get(
+        self.__reset_page = yield call(
+            '_get',
             verify.url
         )
-        tmp_folder.cleanup()
         return self.__reset_page
     
-    def _get_image(self, image_url, tmp_folder) -> Image:
-        r = self.session()._get(image_url, stream = True)
-        tmp_img = f'{tmp_folder}/original'
-
-        # Check if the image was retrieved successfully
-        if r.status_code == 200:
-            # Set decode_content value to True, otherwise the downloaded image file's size will be zero.
-            r.raw.decode_content = True
-            
-            # Open a local file with wb ( write binary ) permission.
-            with open(tmp_img,'wb') as f:
-                shutil.copyfileobj(r.raw, f)
-        else:
-            raise IOError('Could not download: %s', image_url)
-
-        return Image.open(tmp_img)
+    def process_image(self, image:bytes) -> bytes:
+        """
+        Keeps every sixth frame of animated captchas, for solvers to see
+        all characters at a glance.
 
-    def process_image(self, imageObject:Image, tmp_folder:str):
-        images = []
-        buffered = BytesIO()
+        Returns:
+            bytes: The image.
+        """
+        imageObject = Image.open(BytesIO(image))
         if imageObject.format != 'GIF':
-            imageObject.save(fp=buffered, format=imageObject.format.lower())
-        else:
-            for frame in range(0,imageObject.n_frames, 6):
-                imageObject.seek(frame)
-                imageObject.save(f'{tmp_folder}/image_{frame}.gif')
-                images.append(Image.open(f'{tmp_folder}/image_{frame}.gif'))
+            return image
 
-            gif = images[0]
-            gif.save(fp=buffered, format='gif', save_all=True, append_images=images[1:], duration=250)
+        images = []
+        for frame in range(0, imageObject.n_frames, 6):
+            imageObject.seek(frame)
+            buffered = BytesIO()
+            imageObject.save(fp=buffered, format='gif')
+            images.append(Image.open(buffered))
 
-        buffered.seek(0)
-        img_byte = buffered.getvalue()
-        img_str = f"data:image/{imageObject.format.lower()};base64," + base64.b64encode(img_byte).decode()
+        buffered = BytesIO()
+        gif = images[0]
+        gif.save(fp=buffered, format='gif', save_all=True, append_images=images[1:], duration=250)
 
-        return img_str
+        return buffered.getvalue()
 
     def retrieve_otp_from_email(self, content):
         """
@@ -222,6 +206,7 @@ class Client(BaseClient):
         otp = soup.find(id="verificationMsg").find(class_='otp').contents[0]
         return otp
 
+    @operation
     def reset_password_coupled(self, password, otp, request=None):
         """
         Performs a password reset in the Coupled Account.
@@ -244,7 +229,8 @@ class Client(BaseClient):
         
         data['code'] = otp
 
-        verify = self.session()._post(
+        verify = yield call(
+            '_post',
             "https://www.amazon.com/ap/cvf/verify",
             data=data
         )
@@ -262,7 +248,8 @@ class Client(BaseClient):
         data['password'] = password
         data['passwordCheck'] = password
 
-        submit_password = self.session()._post(
+        submit_password = yield call(
+            '_post',
             form.get("action"),
             data=data
         )
@@ -1,4 +1,7 @@
-from .. import BaseClient
+import time
+from .. import BaseClient, operation, parallel, steps_of
+from ..signin_aws.exceptions import (
+    AccountTypeMismatchException, MfaRequiredException)
 
 
 class Client(BaseClient):
@@ -10,23 +13,103 @@ class Client(BaseClient):
         self._signin_aws = self.session().client('signin_aws')
         self._signin_amazon = self.session().client('signin_amazon')
 
+    def _timed(self, timings, phase, steps):
+        start = time.monotonic()
+        try:
+            return (yield from steps)
+        finally:
+            timings[phase] = time.monotonic() - start
+
+    @operation
     def signin(self, email, password, mfa_secret=None):
-        # check account type
-        account_type = self._signin_aws.get_account_type(email)
+        """
+        Signin as root user, with the account type and MFA status looked up
+        concurrently once the signin tokens are known, or taken from the
+        ``account_cache`` of the session. When the signin shows that the
+        account type or MFA requirement changed since they were cached, the
+        cache entry is dropped and the signin repeated with lookups.
+
+        The seconds spent per phase (``tokens``, ``account_type``,
+        ``mfa_status``, ``authenticate`` and ``total``) are stored in the
+        ``signin_timings`` attribute of the session, for Coupled accounts
+        along with the ``steps`` of the amazon.com signin flow.
+        """
+        cache = self.session().account_cache
+        cached = cache.get(email) if cache is not None else None
+
+        if cached is not None:
+            try:
+                return (yield from self._signin(
+                    email, password, mfa_secret, cached))
+            except (MfaRequiredException, AccountTypeMismatchException):
+                # the account changed since it was cached
+                cache.invalidate(email)
+
+        return (yield from self._signin(email, password, mfa_secret, {}))
+
+    def _signin(self, email, password, mfa_secret, cached):
+        timings = {}
+        start = time.monotonic()
+        self.session().signin_timings = timings
+
+        try:
+            account_type = cached.get('account_type')
+            mfa_required = cached.get('mfa_required')
 
+            if account_type is None or (
+                    account_type == 'Decoupled' and mfa_required is None):
+                account_type, mfa_required = yield from self._lookup(
+                    timings, email, account_type)
+
+            if account_type == 'Decoupled':
+                return (yield from self._timed(
+                    timings, 'authenticate', steps_of(
+                        self._signin_aws.signin,
+                        email, password, mfa_secret, mfa_required)))
+            elif account_type == 'Coupled':
+                try:
+                    return (yield from self._timed(
+                        timings, 'authenticate', steps_of(
+                            self._signin_amazon.signin,
+                            email, password, mfa_secret)))
+                finally:
+                    timings['steps'] = self._signin_amazon.steps
+            elif account_type == 'Unknown':
+                raise Exception("account {0} not active".format(email))
+            else:
+                raise Exception("unsupported account type {0}".format(email))
+        finally:
+            timings['total'] = time.monotonic() - start
+
+    def _lookup(self, timings, email, account_type=None):
+        # the account type and MFA status lookups both need the tokens
+        yield from self._timed(
+            timings, 'tokens', self._signin_aws._csrf_token())
+
+        if account_type is None:
+            account_type = self._timed(
+                timings, 'account_type',
+                steps_of(self._signin_aws.get_account_type, email))
+        # only used for Decoupled accounts, looked up speculatively
+        account_type, mfa_required = yield parallel(
+            account_type,
+            self._timed(
+                timings, 'mfa_status',
+                steps_of(self._signin_aws.mfa_required, email)),
+        )
+        if isinstance(account_type, Exception):
+            raise account_type
+
+        cache = self.session().account_cache
         if account_type == 'Decoupled':
-            return self._signin_aws.signin(
-                email,
-                password,
-                mfa_secret,
-            )
-        elif account_type == 'Coupled':
-            return self._signin_amazon.signin(
-                email,
-                password,
-                mfa_secret,
-            )
-        elif account_type == 'Unknown':
-            raise Exception("account {0} not active".format(email))
+            if isinstance(mfa_required, Exception):
+                raise mfa_required
+            if cache is not None:
+                cache.set(
+                    email, account_type=account_type, mfa_required=mfa_required)
         else:
-            raise Exception("unsupported account type {0}".format(email))
+            mfa_required = None
+            if account_type == 'Coupled' and cache is not None:
+                cache.set(email, account_type=account_type)
+
+        return account_type, mfa_required
@@ -1,9 +1,9 @@
-from bs4 import BeautifulSoup
-from pyotp import TOTP
 from urllib import parse
 import json
-from .. import BaseClient
 import time
+from .. import BaseClient, call, operation, steps_of
+from . import flow
+from ..signin_aws.exceptions import AccountTypeMismatchException
 from furl import furl
 
 
@@ -55,50 +55,17 @@ class Client(BaseClient):
 
     def __init__(self, session):
         super().__init__(session)
+        self.steps = []
 
-    def find_and_submit_form(self, soup, email, password, mfa_secret=None):
-        error = soup.find(id="message_error")
-        if error:
-            message = error.get_text()
-            # Enter the characters as they are given in the challenge.
-            raise Exception(message)
-
-        form = soup.find(id="ap_signin_form")
-
-        if not form:
-            mfa_form = soup.find(id="auth-mfa-form")
-            if mfa_form:
-                raise Exception("accounts with Amazon MFA not supported")
-
+    def _form_data(self, page, email, password, token_code=None, guess=None):
         data = {'metadata1': self.session()._metadata1_generator.generate()}
+        data.update(page.fields)
 
-        for field in form.find_all('input'):
-            name = field.get('name')
-            if not name:
-                continue
-            value = field.get('value')
-            data[name] = value
-                
-        if "guess" in data:
-            if not self.session()._captcha_solver:
-                raise Exception("captcha solver required")
-
-            captcha = soup.find(id="ap_captcha_img")
-            img = captcha.find("img")
-            src = img.get("src")
-            guess_uuid = self.session()._captcha_solver.solve(url=src)
-
-            while True:
-                guess = self.session()._captcha_solver.result(guess_uuid)
+        if guess is not None:
+            data["guess"] = guess
 
-                if guess is None:
-                    time.sleep(5)
-                else:
-                    data["guess"] = guess
-                    break
-
-        if "tokenCode" in data and mfa_secret:
-            data['tokenCode'] = TOTP(mfa_secret).now()
+        if "tokenCode" in data and token_code:
+            data['tokenCode'] = token_code
 
         overrides = {
             "password": password,
@@ -111,20 +78,62 @@ class Client(BaseClient):
                 if _v:
                     data[k] = _v
 
-        return self.session()._post(
-            form.get("action"),
-            data=data
-        )
+        return data
+
+    @operation
+    def submit(self, page, email, password, mfa_secret=None):
+        """
+        Fill in and submit the form of a page of the signin flow.
+
+        Args:
+            page (coto.clients.signin_amazon.flow.Page): The page.
+            email: Account email address.
+            password: Account password.
+            mfa_secret: Account mfa secret.
+
+        Returns:
+            requests.Response: The response.
+        """
+        if page.kind in (flow.ERROR, flow.UNKNOWN_ACCOUNT):
+            raise Exception(page.error)
+
+        guess = None
+        if page.kind == flow.CAPTCHA:
+            if not self.session()._captcha_solver:
+                raise Exception("captcha solver required")
+
+            future = yield call('_solve_captcha', url=page.captcha_url)
+            guess = yield future
 
-    def signin(self, email, password, mfa_secret=None):
+        token_code = None
+        if "tokenCode" in page.fields and mfa_secret:
+            token_code = (yield call('_mfa_codes', mfa_secret))[0]
+
+        return (yield call(
+            '_post',
+            page.action,
+            data=self._form_data(page, email, password, token_code, guess),
+            operation='signin_amazon.submit',
+        ))
+
+    @operation
+    def signin(self, email, password, mfa_secret=None, max_steps=10):
         """
         Signin into the AWS Management Console using account root user.
 
+        Each page of the signin flow is classified once, as a ``password``,
+        ``captcha`` or ``totp`` form to submit, the console home (``done``)
+        or an ``error``. An ``unknown_account`` error raises
+        :py:class:`coto.clients.signin_aws.exceptions.AccountTypeMismatchException`,
+        other errors raise ``Exception``. The pages and the seconds spent on them are stored
+        in the ``steps`` attribute, e.g., ``[{'page': 'signin', 'seconds':
+        0.3}, {'page': 'password', 'seconds': 0.5}]``.
+
         Request Syntax:
 
             .. code-block:: python
 
-                response = client.get_account_type(
+                response = client.signin(
                     email=str,
                     password=str,
                     mfa_secret=str,
@@ -135,25 +144,35 @@ class Client(BaseClient):
             password: Account password.
             mfa_secret: Account mfa secret. The Base32 seed defined as specified
                 in RFC3548. The Base32StringSeed is Base64-encoded.
+            max_steps (int): Maximum forms to submit.
 
         Returns:
             bool: Signin successful
         """
-
-        # first post password
-        response = self.session()._get(ap_url(email))
-        soup = BeautifulSoup(response.text, 'html.parser')
-        response = self.find_and_submit_form(soup, email, password, mfa_secret)
-        # view_html(response.text)
-
-        counter = 0
-
-        while counter < 10 and response.url != "https://console.aws.amazon.com/console/home":
-            counter += 1
-            soup = BeautifulSoup(response.text, 'html.parser')
-            response = self.find_and_submit_form(soup, email, password, mfa_secret)
-
-        if response.url == "https://console.aws.amazon.com/console/home":
+        self.steps = steps = []
+
+        start = time.monotonic()
+        response = yield call(
+            '_get', ap_url(email), operation='signin_amazon.signin')
+        page = flow.classify(response.url, response.text)
+        steps.append({'page': 'signin', 'seconds': time.monotonic() - start})
+
+        while page.kind != flow.DONE and len(steps) <= max_steps:
+            if page.kind == flow.UNKNOWN_ACCOUNT:
+                # amazon.com does not know the email address of Decoupled
+                # accounts
+                raise AccountTypeMismatchException(page.error)
+            if page.kind == flow.ERROR:
+                raise Exception(page.error)
+
+            start = time.monotonic()
+            kind = page.kind
+            response = yield from steps_of(
+                self.submit, page, email, password, mfa_secret)
+            page = flow.classify(response.url, response.text)
+            steps.append({'page': kind, 'seconds': time.monotonic() - start})
+
+        if page.kind == flow.DONE:
             self.session().authenticated = True
             self.session().root = True
             return True
@@ -0,0 +1,169 @@
+"""
+Classification of the pages of the amazon.com signin flow.
+
+Each response is read once, by a tokenizer that only looks at the error
+message, the signin or MFA form and the captcha image, and stops at the end
+of the form.
+"""
+from html.parser import HTMLParser
+from urllib.parse import urlparse
+
+
+PASSWORD = 'password'
+CAPTCHA = 'captcha'
+TOTP = 'totp'
+DONE = 'done'
+ERROR = 'error'
+UNKNOWN_ACCOUNT = 'unknown_account'
+
+_FORMS = ('ap_signin_form', 'auth-mfa-form')
+# error messages of amazon.com for email addresses without an account
+_UNKNOWN_ACCOUNT = ('cannot find an account', 'no account found')
+_VOID = ('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+         'meta', 'source', 'track', 'wbr')
+
+
+class Page:
+    """
+    A page of the signin flow.
+
+    Attributes:
+        kind (str): ``password``, ``captcha``, ``totp``, ``done``,
+            ``error`` or ``unknown_account``, the error of amazon.com for
+            email addresses without an amazon.com account.
+        url (str): URL of the page.
+        action (str): URL the form is submitted to.
+        fields (dict): Values of the form fields, ``None`` for empty ones.
+        captcha_url (str): URL of the captcha image.
+        error (str): The error message.
+    """
+
+    __slots__ = ('kind', 'url', 'action', 'fields', 'captcha_url', 'error')
+
+    def __init__(
+        self, kind, url, action=None, fields=None, captcha_url=None,
+        error=None,
+    ):
+        self.kind = kind
+        self.url = url
+        self.action = action
+        self.fields = fields or {}
+        self.captcha_url = captcha_url
+        self.error = error
+
+    def __repr__(self):
+        return 'Page({0!r}, {1!r})'.format(self.kind, self.url)
+
+
+class _Stop(Exception):
+    pass
+
+
+class _PageParser(HTMLParser):
+    def __init__(self):
+        super().__init__()
+        self.error = None
+        self.form = None
+        self.form_id = None
+        self.fields = {}
+        self.captcha_url = None
+        self._error_depth = 0
+        self._in_form = False
+        self._in_captcha = False
+
+    def handle_starttag(self, tag, attrs, closed=False):
+        attrs = dict(attrs)
+        element_id = attrs.get('id')
+        opened = not closed and tag not in _VOID
+
+        if self._error_depth:
+            self._error_depth += opened
+        elif element_id == 'message_error' and self.error is None:
+            self.error = []
+            self._error_depth = int(opened)
+
+        if tag == 'form' and element_id in _FORMS and self.form is None:
+            self.form = attrs
+            self.form_id = element_id
+            self._in_form = True
+        elif self._in_form and tag == 'input' and attrs.get('name'):
+            self.fields[attrs['name']] = attrs.get('value')
+
+        if element_id == 'ap_captcha_img':
+            self._in_captcha = True
+        if tag == 'img' and self._in_captcha and self.captcha_url is None:
+            self.captcha_url = attrs.get('src')
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, closed=True)
+
+    def handle_endtag(self, tag):
+        if self._error_depth:
+            self._error_depth -= 1
+
+        if tag == 'form' and self._in_form:
+            raise _Stop()
+
+    def handle_data(self, data):
+        if self._error_depth:
+            self.error.append(data)
+
+    def run(self, html):
+        try:
+            self.feed(html)
+            self.close()
+        except _Stop:
+            pass
+        return self
+
+
+def done(url):
+    """
+    Args:
+        url (str): URL of a page.
+
+    Returns:
+        bool: Whether the page is the console home, where the signin ends.
+    """
+    url = urlparse(url)
+    return url.netloc.endswith('console.aws.amazon.com') and \
+        url.path.rstrip('/') == '/console/home'
+
+
+def classify(url, html):
+    """
+    Args:
+        url (str): URL of the page.
+        html (str): The page.
+
+    Returns:
+        Page: The page.
+    """
+    if done(url):
+        return Page(DONE, url)
+
+    parser = _PageParser().run(html)
+
+    if parser.error is not None:
+        message = ' '.join(' '.join(parser.error).split())
+        if any(m in message.lower() for m in _UNKNOWN_ACCOUNT):
+            return Page(UNKNOWN_ACCOUNT, url, error=message)
+        return Page(ERROR, url, error=message)
+
+    if parser.form_id == 'auth-mfa-form':
+        return Page(
+            ERROR, url, error="accounts with Amazon MFA not supported")
+
+    if parser.form_id is None:
+        return Page(ERROR, url, error="unexpected page {0}".format(url))
+
+    if 'guess' in parser.fields:
+        kind = CAPTCHA
+    elif 'tokenCode' in parser.fields:
+        kind = TOTP
+    else:
+        kind = PASSWORD
+
+    return Page(
+        kind, url, action=parser.form.get('action'), fields=parser.fields,
+        captcha_url=parser.captcha_url)
@@ -1,13 +1,13 @@
-from bs4 import BeautifulSoup
-from pyotp import TOTP
 from urllib import parse
+import functools
 import json
-from .. import BaseClient
+from .. import BaseClient, call, operation, steps_of
 from . import exceptions
-import time
+from ... import extract
 
 
 def captcha_decorator(func):
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         self = args[0]
 
@@ -20,7 +20,7 @@ def captcha_decorator(func):
                 _kwargs = {k: v for k, v in kwargs.items()}
                 if captcha_guess:
                     _kwargs['captcha_guess'] = captcha_guess
-                return func(*args, **_kwargs)
+                return (yield from func(*args, **_kwargs))
             except exceptions.CaptchaRequiredException as e:
                 if solver is None:
                     raise
@@ -28,18 +28,9 @@ def captcha_decorator(func):
                 if guess_uuid and captcha_guess and captcha_guess.action == e.action:
                     solver.incorrect(guess_uuid)
 
-                guess_uuid = solver.solve(url=e.CaptchaURL)
-
-                while True:
-                    guess = solver.result(guess_uuid)
-
-                    if guess is None:
-                        time.sleep(5)
-                    else:
-                        break
-                captcha_guess = e.guess(guess)
-                continue
-            break
+                future = yield call('_solve_captcha', url=e.CaptchaURL)
+                guess_uuid = future.job_id
+                captcha_guess = e.guess((yield future))
 
     return wrapper
 
@@ -53,31 +44,40 @@ class Client(BaseClient):
         self.__csrf_token = None
         self.__session_id = None
 
+    def _dump_tokens(self):
+        return {
+            'csrf_token': self.__csrf_token,
+            'session_id': self.__session_id,
+        }
+
+    def _load_tokens(self, tokens):
+        self.__csrf_token = tokens.get('csrf_token')
+        self.__session_id = tokens.get('session_id')
+
     def _csrf_token(self):
         if self.__csrf_token == None:
-            self._get_tokens()
+            yield from self._get_tokens()
 
         return self.__csrf_token
 
     def _session_id(self):
         if self.__session_id == None:
-            self._get_tokens()
+            yield from self._get_tokens()
 
         return self.__session_id
 
     def _get_tokens(self):
-        r = self.session()._get(
-            "https://signin.aws.amazon.com/signin?redirect_uri=https%3A%2F%2Fconsole.aws.amazon.com%2Fconsole%2Fhome%3Fstate%3DhashArgs%2523%26isauthcode%3Dtrue&client_id=arn%3Aaws%3Aiam%3A%3A015428540659%3Auser%2Fhomepage&forceMobileApp=0"
+        r = yield call(
+            '_get',
+            "https://signin.aws.amazon.com/signin?redirect_uri=https%3A%2F%2Fconsole.aws.amazon.com%2Fconsole%2Fhome%3Fstate%3DhashArgs%2523%26isauthcode%3Dtrue&client_id=arn%3Aaws%3Aiam%3A%3A015428540659%3Auser%2Fhomepage&forceMobileApp=0",
+            operation='signin_aws.tokens',
         )
 
         if r.status_code != 200:
             raise Exception("failed get tokens")
 
-        soup = BeautifulSoup(r.text, 'html.parser')
-        meta = {
-            m['name']: m['content']
-            for m in soup.find_all('meta') if 'name' in m.attrs
-        }
+        meta = extract.meta_content(
+            r.text, names=('csrf_token', 'session_id'))
         self.__csrf_token = meta['csrf_token']
         self.__session_id = meta['session_id']
 
@@ -97,8 +97,8 @@ class Client(BaseClient):
 
         data['action'] = action
         data['redirect_uri'] = self._REDIRECT_URL
-        data['csrf'] = self._csrf_token()
-        data['sessionId'] = self._session_id()
+        data['csrf'] = yield from self._csrf_token()
+        data['sessionId'] = yield from self._session_id()
 
         if captcha_guess and captcha_guess.action == action:
             data['captcha_token'] = captcha_guess.captcha_token
@@ -106,9 +106,12 @@ class Client(BaseClient):
                 captcha_guess.captchaObfuscationToken
             data['captcha_guess'] = captcha_guess.guess
 
-        r = self.session()._post(
+        r = yield call(
+            '_post',
             "https://signin.aws.amazon.com/{}".format(api),
             data=data,
+            operation='signin_aws.{0}'.format(action),
+            idempotent=action == 'resolveAccountType',
         )
 
         if r.status_code != 200:
@@ -124,6 +127,20 @@ class Client(BaseClient):
                 properties['CES'], properties['CaptchaURL'],
                 properties['captchaObfuscationToken'], action)
 
+        if action == 'authenticateRoot':
+            if 'mfa1' not in data and \
+                    properties.get('mfaType', 'NONE') != 'NONE':
+                raise exceptions.MfaRequiredException(
+                    "account {0} requires an MFA code".format(data['email']))
+
+            # Coupled accounts are sent to the amazon.com signin
+            redirect = parse.urlparse(properties.get('RedirectTo', '')).netloc
+            if redirect.endswith('amazon.com') and \
+                    not redirect.endswith('aws.amazon.com'):
+                raise exceptions.AccountTypeMismatchException(
+                    "account {0} signs in through amazon.com".format(
+                        data['email']))
+
         if state != 'success':
             if 'Message' in properties:
                 raise Exception("failed action {}: {}".format(
@@ -133,6 +150,7 @@ class Client(BaseClient):
 
         return properties
 
+    @operation
     @captcha_decorator
     def get_account_type(self, email, captcha_guess=None):
         """
@@ -157,14 +175,15 @@ class Client(BaseClient):
         Returns:
             str: Account type
         """
-        response = self._action(
+        response = yield from self._action(
             'resolveAccountType', {'email': email},
             captcha_guess=captcha_guess)
         return response['resolvedAccountType']
 
+    @operation
     def mfa_required(self, email):
         mfa_client = self.session().client('mfa')
-        mfa = mfa_client.get_mfa_status(email)
+        mfa = yield from steps_of(mfa_client.get_mfa_status, email)
         if 'mfaType' in mfa:
             if mfa['mfaType'] == 'NONE':
                 return False
@@ -175,17 +194,40 @@ class Client(BaseClient):
 
         return True
 
-    def signin(self, email, password, mfa_secret=None):
-        # check mfa
-        mfa_required = self.mfa_required(email)
-        if mfa_required and (mfa_secret is None or len(mfa_secret) == 0):
-            raise Exception("account mfa protected but no secret provided")
+    @operation
+    def signin(self, email, password, mfa_secret=None, mfa_required=None):
+        cache = self.session().account_cache
+        cached = cache.get(email) if cache is not None \
+            and mfa_required is None else None
 
-        if not mfa_required:
-            mfa_secret = None
+        if cached is not None and cached.get('mfa_required') is not None:
+            try:
+                return (yield from self._signin(
+                    email, password, mfa_secret, cached['mfa_required']))
+            except exceptions.MfaRequiredException:
+                # MFA was enabled since the account was cached
+                cache.invalidate(email)
+
+        # check mfa, unless the caller already did
+        if mfa_required is None:
+            mfa_required = yield from steps_of(self.mfa_required, email)
+            if cache is not None:
+                cache.set(
+                    email, account_type='Decoupled', mfa_required=mfa_required)
+
+        return (yield from self._signin(
+            email, password, mfa_secret, mfa_required))
+
+    def _signin(self, email, password, mfa_secret, mfa_required):
+        if mfa_required and (mfa_secret is None or len(mfa_secret) == 0):
+            raise exceptions.MfaRequiredException(
+                "account mfa protected but no secret provided")
 
-        return self.signin_decoupled(email, password, mfa_secret)
+        return (yield from steps_of(
+            self.signin_decoupled,
+            email, password, mfa_secret if mfa_required else None))
 
+    @operation
     @captcha_decorator
     def signin_decoupled(self,
                          email,
@@ -222,15 +264,17 @@ class Client(BaseClient):
 
         if mfa_secret is not None:
             data['mfaType'] = 'OTP'
-            data['mfa1'] = TOTP(mfa_secret).now()
+            data['mfa1'] = (yield call('_mfa_codes', mfa_secret))[0]
             data['mfaSerial'] = 'undefined'
 
         # an exception is thrown if authentication was unsuccessful
-        self._action('authenticateRoot', data, captcha_guess=captcha_guess)
+        yield from self._action(
+            'authenticateRoot', data, captcha_guess=captcha_guess)
         self.session().authenticated = True
         self.session().root = True
         return True
 
+    @operation
     def get_password_recovery_captcha(self):
         """
         Obtains a captcha for password recovery.
@@ -250,18 +294,20 @@ class Client(BaseClient):
                     'captchaObfuscationToken': str,
                 }
         """
-        return self._action('captcha', {'forgotpassword': True})
+        return (yield from self._action('captcha', {'forgotpassword': True}))
 
+    @operation
     def raise_password_recovery_captcha(self):
         """
         Obtains a captcha for password recovery and raises a
         CaptchaRequiredException.
         """
-        captcha = self.get_password_recovery_captcha()
+        captcha = yield from steps_of(self.get_password_recovery_captcha)
         raise exceptions.CaptchaRequiredException(
             captcha['CES'], captcha['CaptchaURL'],
             captcha['captchaObfuscationToken'], 'getResetPasswordToken')
 
+    @operation
     @captcha_decorator
     def get_reset_password_token(self, email, captcha_guess=None):
         """
@@ -282,14 +328,14 @@ class Client(BaseClient):
         """
 
         if not captcha_guess:
-            self.raise_password_recovery_captcha()
+            yield from steps_of(self.raise_password_recovery_captcha)
 
         try:
-            return self._action(
+            return (yield from self._action(
                 'getResetPasswordToken', {'email': email},
-                captcha_guess=captcha_guess)
+                captcha_guess=captcha_guess))
         except Exception as e:
             if str(
                     e
             ) == "failed action getResetPasswordToken: Enter the characters and try again":
-                self.raise_password_recovery_captcha()
+                yield from steps_of(self.raise_password_recovery_captcha)
@@ -17,4 +17,19 @@ class CaptchaRequiredException(Exception):
             self.captchaObfuscationToken,
             self.action,
             guess,
-        )
\ No newline at end of file
+        )
+
+
+class MfaRequiredException(Exception):
+    """
+    The account requires an MFA code, and none was sent.
+    """
+    pass
+
+
+class AccountTypeMismatchException(Exception):
+    """
+    The account is not of the type it was signed in as, e.g., a Coupled
+    account signed in through signin.aws.amazon.com.
+    """
+    pass
@@ -1,10 +1,8 @@
 import json
-from bs4 import BeautifulSoup
-from . import BaseClient
+from . import BaseClient, reauth_decorator, call, operation
+from .. import extract
 import os
-region = os.getenv('AWS_DEFAULT_REGION')
 
-print(f"🌎 Get region from env: AWS_DEFAULT_REGION - Region {region}")
 
 class Client(BaseClient):
     """
@@ -21,118 +19,155 @@ class Client(BaseClient):
     """
     def __init__(self, session):
         super().__init__(session)
-        print(f"⚙️  Init SSO Client")
+        self.region = os.getenv('AWS_DEFAULT_REGION')
+        if not self.region:
+            raise Exception(
+                "sso client requires the region of IAM Identity Center "
+                "in AWS_DEFAULT_REGION")
         self.__xsrf_token = None
 
+    def _dump_tokens(self):
+        return {'xsrf_token': self.__xsrf_token}
+
+    def _load_tokens(self, tokens):
+        self.__xsrf_token = tokens.get('xsrf_token')
+
     def _url(self, api):
-        return "https://"+ region+"console.aws.amazon.com/singlesignon/{0}".format(api)
+        return "https://"+ self.region+"console.aws.amazon.com/singlesignon/{0}".format(api)
+
+    def _fetch_tokens(self):
+        yield from self._xsrf_token()
 
     def _xsrf_token(self):
         if self.__xsrf_token is None:
-            self._get_xsrf_token()
+            yield from self._get_xsrf_token()
         return self.__xsrf_token 
 
     def _get_xsrf_token(self):
-        r = self.session()._get(
-            "https://"+ region+".console.aws.amazon.com/singlesignon/identity/home?region="+region+"&state=hashArgs%23")
+        r = yield call(
+            '_get',
+            "https://"+ self.region+".console.aws.amazon.com/singlesignon/identity/home?region="+self.region+"&state=hashArgs%23",
+            operation='sso.xsrf_token')
 
         if r.status_code != 200:
             raise Exception("failed get token")
 
-        soup = BeautifulSoup(r.text, 'html.parser')
-        for m in soup.find_all('meta'):
-            if 'name' in m.attrs and m['name'] == "awsc-csrf-token":
-                self.__xsrf_token = m['content']
-                print("🔑 Successfully obtain xsrf_token")
-                return
+        m = extract.find_meta(r.text, name='awsc-csrf-token')
+        if m is not None and 'content' in m:
+            self.__xsrf_token = m['content']
+            return
 
         raise Exception('unable to obtain SSO xsrf_token')
 
 
 
-    def _post(self,operation,contentstring,path):
+    def _post_request(self,xsrf_token,operation,contentstring,path):
         x_amz_target = "com.amazon.switchboard.service.SWBService."+operation
-        headers={'x-csrf-token': self._xsrf_token(),
+        headers={'x-csrf-token': xsrf_token,
             "X-Amz-Target": x_amz_target,
             "Content-Encoding": "amz-1.0",
             "Accept": "application/json, text/javascript, */*",
             "Content-Type": "application/json"}
         if operation == "getSyncProfile":
-            apiendpoint = "https://" + region +".console.aws.amazon.com/singlesignon/api/identity-sync"
+            apiendpoint = "https://" + self.region +".console.aws.amazon.com/singlesignon/api/identity-sync"
             json_body = {
                 "headers": headers,
-                "operation":operation,"region":region,"path":path,"params": {}
+                "operation":operation,"region":self.region,"path":path,"params": {}
             }
         if operation == "createSyncProfile" or operation == "createSyncTarget" or operation == "startSync":
-            apiendpoint = "https://" + region +".console.aws.amazon.com/singlesignon/api/identity-sync"
+            apiendpoint = "https://" + self.region +".console.aws.amazon.com/singlesignon/api/identity-sync"
             json_body = {
                 "headers": headers,
-                "operation":operation,"region":region,"path":path,"params": {},"contentString": f"{json.dumps(contentstring)}"
+                "operation":operation,"region":self.region,"path":path,"params": {},"contentString": f"{json.dumps(contentstring)}"
             }
         if operation == "createSyncFilter":
-            apiendpoint = "https://" + region +".console.aws.amazon.com/singlesignon/api/identity-sync"
+            apiendpoint = "https://" + self.region +".console.aws.amazon.com/singlesignon/api/identity-sync"
             json_body = {
                 "headers": headers,
-                "operation":operation,"region":region,"path":path,"params": {"Augmentation": "true","DryRun": "false"},"contentString": f"{json.dumps(contentstring)}"
+                "operation":operation,"region":self.region,"path":path,"params": {"Augmentation": "true","DryRun": "false"},"contentString": f"{json.dumps(contentstring)}"
             }
         else:
-            apiendpoint = "https://" + region +".console.aws.amazon.com/singlesignon/api/peregrine"
+            apiendpoint = "https://" + self.region +".console.aws.amazon.com/singlesignon/api/peregrine"
             json_body = {
                 "headers": headers,
                 "operation":operation,"contentString": f"{json.dumps(contentstring)}",
-                "region":region,"path":path
+                "region":self.region,"path":path
             }
 
-        r = self.session()._post(
-            apiendpoint,
-            data=json.dumps(json_body),
-            headers={'x-csrf-token': self._xsrf_token(),
+        return apiendpoint, json_body, {'x-csrf-token': xsrf_token,
             "X-Amz-Target": x_amz_target,
             "Accept": "application/json, text/javascript, */*","content-type":"application/json"}
+
+    @reauth_decorator
+    def _post(self,operation,contentstring,path):
+        token = yield from self._xsrf_token()
+        apiendpoint, json_body, headers = self._post_request(
+            token, operation, contentstring, path)
+        r = yield call(
+            '_post',
+            apiendpoint,
+            data=json.dumps(json_body),
+            headers=headers,
+            expect_json=True,
+            operation='sso.{0}'.format(operation),
+            idempotent=operation.lower().startswith(('list', 'get')),
             )
-        if r.status_code == 200:
-            print(f"✅ Successfully invoked: {operation}")
+
+        self._check_tokens(r)
+
         if r.status_code != 200:
-            raise Exception(f"🚨 Failed to invoke: {operation} - Method: Post")
+            raise Exception(f"failed to invoke {operation} - Method: Post")
 
         return r
 
-    def _delete(self,operation,contentstring,path):
+    def _delete_request(self,xsrf_token,operation,contentstring,path):
         x_amz_target = "com.amazon.switchboard.service.SWBService."+operation
-        headers={'x-csrf-token': self._xsrf_token(),
+        headers={'x-csrf-token': xsrf_token,
             "X-Amz-Target": x_amz_target,
             "Content-Encoding": "amz-1.0",
             "Accept": "application/json, text/javascript, */*",
             "Content-Type": "application/json"}
         if operation == "deleteSyncProfile":
-            apiendpoint = "https://" + region +".console.aws.amazon.com/singlesignon/api/identity-sync"
+            apiendpoint = "https://" + self.region +".console.aws.amazon.com/singlesignon/api/identity-sync"
             json_body = {
                 "headers": headers,
-                "operation":operation,"region":region,"path":path,"params": "{}"
+                "operation":operation,"region":self.region,"path":path,"params": "{}"
             }
         else:
-            apiendpoint = "https://" + region +".console.aws.amazon.com/singlesignon/api/peregrine"
+            apiendpoint = "https://" + self.region +".console.aws.amazon.com/singlesignon/api/peregrine"
             json_body = {
                 "headers": headers,
                 "operation":operation,"contentString": f"{json.dumps(contentstring)}",
-                "region":region,"path":path
+                "region":self.region,"path":path
             }
-        r = self.session()._delete(
-            apiendpoint,
-            data=json.dumps(json_body),
-            headers={'x-csrf-token': self._xsrf_token(),
+        return apiendpoint, json_body, {'x-csrf-token': xsrf_token,
             "X-Amz-Target": x_amz_target,
             "Accept": "application/json, text/javascript, */*","content-type":"application/json"}
+
+    @reauth_decorator
+    def _delete(self,operation,contentstring,path):
+        token = yield from self._xsrf_token()
+        apiendpoint, json_body, headers = self._delete_request(
+            token, operation, contentstring, path)
+        r = yield call(
+            '_delete',
+            apiendpoint,
+            data=json.dumps(json_body),
+            headers=headers,
+            expect_json=True,
+            operation='sso.{0}'.format(operation),
             )
-        if r.status_code == 200:
-            print(f"✅ Successfully invoked: {operation} - Method: Delete")
+
+        self._check_tokens(r)
+
         if r.status_code != 200:
-            raise Exception(f"🚨 Failed to invoke: {operation} - Method: Delete")
+            raise Exception(f"failed to invoke {operation} - Method: Delete")
 
         return r
 
     # sso api
 
+    @operation
     def create_sync_filter(self,profilename, filtertype, associateddomain,samaccountname):
         """
         Obtain the list of the sso associations.
@@ -154,9 +189,10 @@ class Client(BaseClient):
         operation = "createSyncFilter"
         path = "/v0/profiles/"+ profilename + "/filters"
         contentstring = {"FilterType":filtertype,"Attributes":"{\"associateddomain\":[\"" + associateddomain+ "\"],\"samaccountname\":[\""+samaccountname+"\"]}","Effect":"INCLUDE"}
-        r = self._post(operation,contentstring,path)
+        r = yield from self._post(operation,contentstring,path)
         return json.loads(r.text)
 
+    @operation
     def list_associations(self):
         """
         Obtain the list of the sso associations.
@@ -174,9 +210,10 @@ class Client(BaseClient):
         operation = "ListDirectoryAssociations"
         path = "/control/"
         contentstring = {}
-        r = self._post(operation,contentstring,path)
+        r = yield from self._post(operation,contentstring,path)
         return json.loads(r.text)
 
+    @operation
     def disassociate_directory(self,directoryId,directoryType):
         """
         Associate Directory to the sso.
@@ -197,9 +234,10 @@ class Client(BaseClient):
         operation = "DisassociateDirectory"
         path = "/control/"
         contentstring = {"directoryId":directoryId,"directoryType":directoryType}
-        r = self._post(operation,contentstring,path)
+        r = yield from self._post(operation,contentstring,path)
         return json.loads(r.text)
 
+    @operation
     def create_synctarget(self,profilename, SyncTargetName,TargetResourceArn):
         """
         Create Sync Target for sso.
@@ -220,9 +258,10 @@ class Client(BaseClient):
         operation = "createSyncTarget"
         path = "/v0/profiles/"+ profilename + "/targets"
         contentstring = {"SyncTargetName":SyncTargetName,"TargetResourceArn":TargetResourceArn}
-        r = self._post(operation,contentstring,path)
+        r = yield from self._post(operation,contentstring,path)
         return json.loads(r.text)
 
+    @operation
     def start_sync(self,profilename):
         """
         Start Sync for sso.
@@ -242,9 +281,10 @@ class Client(BaseClient):
         operation = "startSync"
         path = "/v0/profiles/"+ profilename + "/startSync"
         contentstring = ""
-        r = self._post(operation,contentstring,path)
+        r = yield from self._post(operation,contentstring,path)
         return "␖ Started Sync"
 
+    @operation
     def get_ssoconfiguration(self):
         """
         Get the Configuration of the SSO.
@@ -262,9 +302,10 @@ class Client(BaseClient):
         operation = "GetSsoConfiguration"
         path = "/control/"
         contentstring = {}
-        r = self._post(operation,contentstring,path)
+        r = yield from self._post(operation,contentstring,path)
         return json.loads(r.text)
 
+    @operation
     def get_mfadevicemanagementfordirectory(self,directoryId,directoryType):
         """
         Get Mfa Device Management For Directory.
@@ -285,9 +326,10 @@ class Client(BaseClient):
         operation = "GetMfaDeviceManagementForDirectory"
         path = "/control/"
         contentstring = {"directoryId":directoryId,"directoryType":directoryType}
-        r = self._post(operation,contentstring,path)
+        r = yield from self._post(operation,contentstring,path)
         return json.loads(r.text)
 
+    @operation
     def get_syncprofile(self,profilename):
         """
         Get get Sync Profile.
@@ -306,11 +348,11 @@ class Client(BaseClient):
         """
         operation = "getSyncProfile"
         path = "/v0/profiles/" + profilename
-        print(path)
         params = {}
-        r = self._post(operation,params,path)
+        r = yield from self._post(operation,params,path)
         return json.loads(r.text)
 
+    @operation
     def delete_syncprofile(self,profilename):
         """
         Get Mfa Device Management For Directory.
@@ -330,9 +372,10 @@ class Client(BaseClient):
         operation = "deleteSyncProfile"
         path = "/v0/profiles/" + profilename
         params = {}
-        r = self._delete(operation,params,path)
+        r = yield from self._delete(operation,params,path)
         return json.loads(r.text)
 
+    @operation
     def create_syncprofile(self,SyncProfileName,SourceResourceArn):
         """
         Create Sync Profile.
@@ -353,11 +396,12 @@ class Client(BaseClient):
         operation ="createSyncProfile"
         path = "/v0/profiles"
         contentstring = {"SyncProfileName":SyncProfileName,"SourceResourceArn":SourceResourceArn}
-        r = self._post(operation,contentstring,path)
+        r = yield from self._post(operation,contentstring,path)
         return json.loads(r.text)
 
 
 
+    @operation
     def associate_directory(self,directoryId,directoryType):
         """
         Associate Directory to the sso.
@@ -378,5 +422,5 @@ class Client(BaseClient):
         operation = "AssociateDirectory"
         path = "/control/"
         contentstring = {"directoryId":directoryId,"directoryType":directoryType}
-        r = self._post(operation,contentstring,path)
+        r = yield from self._post(operation,contentstring,path)
         return json.loads(r.text)
@@ -0,0 +1,240 @@
+"""
+The clients are written once, for :py:class:`coto.Session` and
+:py:class:`coto.AsyncSession`. Their methods are generators that build the
+requests and parse the responses, and yield whatever has to be waited for:
+
+* a :py:func:`call` of a session method, e.g., ``call('_get', url)``, which
+  is sent back the result,
+* a :py:class:`concurrent.futures.Future` or an asyncio future, which is sent
+  back its result,
+* :py:func:`parallel` steps, which are sent back a list of their results.
+
+Exceptions are thrown into the generator where it yielded. Requests that do
+not name their ``operation`` are named after the client method that makes
+them, e.g., ``iam.get_account_info``. The session runs
+the steps: :py:class:`coto.Session` blocks, :py:class:`coto.AsyncSession`
+awaits only the transport.
+"""
+import concurrent.futures
+import functools
+import inspect
+
+
+# the session methods that send a request, and take its operation name
+_REQUESTS = frozenset(['_request', '_get', '_post', '_put', '_delete'])
+
+
+class Call:
+    """
+    A call of a session method.
+    """
+
+    __slots__ = ('name', 'args', 'kwargs')
+
+    def __init__(self, name, args, kwargs):
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+
+    def __repr__(self):
+        return 'Call({0!r})'.format(self.name)
+
+
+class Parallel:
+    """
+    Steps to run concurrently.
+    """
+
+    __slots__ = ('steps',)
+
+    def __init__(self, steps):
+        self.steps = steps
+
+
+def call(name, *args, **kwargs):
+    """
+    Args:
+        name (str): Name of the session method, e.g., ``_get``.
+        *args: Positional arguments of the method.
+        **kwargs: Keyword arguments of the method.
+
+    Returns:
+        Call: The call, to yield.
+    """
+    return Call(name, args, kwargs)
+
+
+def parallel(*steps):
+    """
+    Args:
+        *steps: Generators to run concurrently. Other values are results
+            already known.
+
+    Returns:
+        Parallel: The steps, to yield. The generator is sent back the list of
+        their results, holding the exception of those that failed.
+    """
+    return Parallel(steps)
+
+
+def operation(func):
+    """
+    Turn the generator method of a client into a method that runs it on the
+    session of the client. Its steps remain available to other generators
+    with :py:func:`steps_of`. Its requests are named
+    ``<service>.<method>``, unless they name their operation.
+    """
+    name = '{0}.{1}'.format(func.__module__.rsplit('.', 1)[-1], func.__name__)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        return self.session()._run(
+            named(name, func(self, *args, **kwargs)))
+
+    wrapper.steps = func
+    wrapper.operation = name
+    return wrapper
+
+
+def steps_of(method, *args, **kwargs):
+    """
+    Args:
+        method: Bound operation of a client, e.g., ``client.get_mfa_status``.
+        *args: Positional arguments of the operation.
+        **kwargs: Keyword arguments of the operation.
+
+    Returns:
+        generator: The steps of the operation, to ``yield from``.
+    """
+    func = method.__func__
+    return named(func.operation, func.steps(method.__self__, *args, **kwargs))
+
+
+def named(name, steps):
+    """
+    Pass steps through, naming the requests that do not name their
+    ``operation``.
+
+    Args:
+        name (str): Name of the operation, e.g., ``iam.get_account_info``.
+        steps: Generator of the steps.
+
+    Returns:
+        generator: The named steps.
+    """
+    value = error = None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None \
+                else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+
+        if isinstance(step, Call) and step.name in _REQUESTS:
+            step.kwargs.setdefault('operation', name)
+        elif isinstance(step, Parallel):
+            step = Parallel([
+                named(name, s) if inspect.isgenerator(s) else s
+                for s in step.steps
+            ])
+
+        try:
+            value, error = (yield step), None
+        except Exception as e:
+            value, error = None, e
+
+
+def run(session, steps):
+    """
+    Run steps on a :py:class:`coto.Session`, blocking until they are done.
+
+    Returns:
+        The return value of the steps.
+    """
+    value = error = None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None \
+                else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+
+        try:
+            value, error = _run_step(session, step), None
+        except Exception as e:
+            value, error = None, e
+
+
+def _run_step(session, step):
+    if isinstance(step, Call):
+        return getattr(session, step.name)(*step.args, **step.kwargs)
+    if isinstance(step, Parallel):
+        return _run_parallel(session, step.steps)
+    if isinstance(step, concurrent.futures.Future):
+        return step.result()
+    raise TypeError("cannot run step {0!r}".format(step))
+
+
+def _run_parallel(session, steps):
+    pending = [s for s in steps if inspect.isgenerator(s)]
+    if not pending:
+        return list(steps)
+
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=len(pending)) as executor:
+        futures = [
+            executor.submit(run, session, s) if inspect.isgenerator(s)
+            else s
+            for s in steps
+        ]
+
+    return [
+        (f.exception() or f.result())
+        if isinstance(f, concurrent.futures.Future) else f
+        for f in futures
+    ]
+
+
+async def arun(session, steps):
+    """
+    Run steps on a :py:class:`coto.AsyncSession`.
+
+    Returns:
+        The return value of the steps.
+    """
+    value = error = None
+    while True:
+        try:
+            step = steps.throw(error) if error is not None \
+                else steps.send(value)
+        except StopIteration as stop:
+            return stop.value
+
+        try:
+            value, error = await _arun_step(session, step), None
+        except Exception as e:
+            value, error = None, e
+
+
+async def _arun_step(session, step):
+    # only imported by users of the asyncio session
+    import asyncio
+
+    if isinstance(step, Call):
+        result = getattr(session, step.name)(*step.args, **step.kwargs)
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+    if isinstance(step, Parallel):
+        async def known(value):
+            return value
+
+        return await asyncio.gather(*(
+            arun(session, s) if inspect.isgenerator(s) else known(s)
+            for s in step.steps
+        ), return_exceptions=True)
+    if isinstance(step, concurrent.futures.Future):
+        return await asyncio.wrap_future(step)
+    if asyncio.isfuture(step):
+        return await step
+    raise TypeError("cannot run step {0!r}".format(step))
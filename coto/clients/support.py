@@ -2,7 +2,7 @@ from bs4 import BeautifulSoup
 from pyotp import TOTP
 from datetime import datetime, timedelta
 import json
-from . import BaseClient
+from . import BaseClient, reauth_decorator, call, operation
 
 
 class ReauthException(Exception):
@@ -29,58 +29,75 @@ class Client(BaseClient):
         super().__init__(session)
         self.__xsrf_token = None
 
+    def _dump_tokens(self):
+        return {'xsrf_token': self.__xsrf_token}
+
+    def _load_tokens(self, tokens):
+        self.__xsrf_token = tokens.get('xsrf_token')
+
     def _url(self, api):
         return "https://console.aws.amazon.com/support/plans/service/{0}?state=hashArgs%23".format(api)
 
+    def _fetch_tokens(self):
+        yield from self._xsrf_token()
+
     def _xsrf_token(self):
         if self.__xsrf_token is None:
-            self._get_xsrf_token()
+            yield from self._get_xsrf_token()
 
         return self.__xsrf_token
 
     def _get_xsrf_token(self):
-        r = self.session()._get(
-            'https://console.aws.amazon.com/support/plans/home?region=eu-central-1&state=hashArgs%23'
+        r = yield call(
+            '_get',
+            'https://console.aws.amazon.com/support/plans/home?region=eu-central-1&state=hashArgs%23',
+            operation='support.xsrf_token',
         )
-        
+
         if r.status_code != 200:
             raise Exception("failed get support xsrf token")
 
-        for cookie in r.cookies:
-            if cookie.name == 'XSRF-TOKEN':
-                self.__xsrf_token = cookie.value
-                break
+        self.__xsrf_token = r.cookies.get('XSRF-TOKEN')
 
-    def _get(self, api):
-        r = self.session()._get(
-            self._url(api), headers={'X-XSRF-TOKEN': self._xsrf_token()})
+    def _parse(self, r, failure):
+        self._check_tokens(r)
 
-        if 'X-CSRF-TOKEN' in r.headers:
+        if 'X-CSRF-Token' in r.headers:
             self.__xsrf_token = r.headers['X-CSRF-Token']
 
         if r.status_code != 200:
-            raise Exception("failed get {0}".format(api))
+            raise Exception(failure)
 
         return json.loads(r.text)
 
+    @reauth_decorator
+    def _get(self, api):
+        token = yield from self._xsrf_token()
+        r = yield call(
+            '_get',
+            self._url(api), headers={'X-XSRF-TOKEN': token},
+            expect_json=True)
+
+        return self._parse(r, "failed get {0}".format(api))
+
+    @reauth_decorator
     def _post(self, api, data=None):
-        r = self.session()._post(
+        token = yield from self._xsrf_token()
+        r = yield call(
+            '_post',
             self._url(api),
             headers={
                 'Content-Type': 'application/json',
-                'X-XSRF-TOKEN': self._xsrf_token(),
+                'X-XSRF-TOKEN': token,
             },
             data=json.dumps(data) if data is not None else None,
+            expect_json=True,
+            idempotent=api.startswith('describe'),
         )
 
-        if 'X-CSRF-Token' in r.headers:
-            self.__xsrf_token = r.headers['X-CSRF-TOKEN']
-
-        if r.status_code != 200:
-            raise Exception("failed post {0}".format(api))
-
-        return json.loads(r.text)
+        return self._parse(r, "failed post {0}".format(api))
 
+    @operation
     def get_support_level(self):
         """
         Lists the current support contract level for the account.
@@ -100,12 +117,13 @@ class Client(BaseClient):
                     'canChange': bool
                 }
         """
-        r = self._post('describeSupportLevelSummary', { "lang": "en" })
+        r = yield from self._post('describeSupportLevelSummary', { "lang": "en" })
         return {
             'supportLevel': r['response']['supportLevel'],
             'canChange': r['response']['canChange']
         }
 
+    @operation
     def update_support_level(self, support_level):
         """
         Change the support contract level for the account.
@@ -129,7 +147,7 @@ class Client(BaseClient):
                     'supportLevel': str
                 }
         """
-        r = self._post('updateSupportLevel', { "supportLevel": support_level })
+        r = yield from self._post('updateSupportLevel', { "supportLevel": support_level })
         return {
             'supportLevel': r['response']['supportLevel']
         }
@@ -0,0 +1,40 @@
+class SessionExpiredException(Exception):
+    """
+    The AWS Management Console session has expired, signin again.
+    """
+    pass
+
+
+class ResponseException(Exception):
+    """
+    A request failed with an error response.
+
+    Attributes:
+        response: The failed response.
+    """
+
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response
+
+
+class ThrottlingException(ResponseException):
+    """
+    A request was throttled (status 429), also after retrying.
+    """
+    pass
+
+
+class ServerErrorException(ResponseException):
+    """
+    A request failed with a server error (status 5xx), also after retrying.
+    """
+    pass
+
+
+class TokenRejectedException(ResponseException):
+    """
+    The console rejected an XSRF or CSRF token taken from the token store,
+    load a new one.
+    """
+    pass
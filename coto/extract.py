@@ -0,0 +1,227 @@
+"""
+Extraction of tokens and forms from HTML pages.
+
+The clients only need a few tags of the pages they load, usually a ``<meta>``
+tag. The default ``stream`` backend tokenizes the page with
+:py:class:`html.parser.HTMLParser`, and stops as soon as the requested tag
+was found when only the first is needed, instead of building a tree of the
+whole page. The ``bs4``
+backend parses the whole page with BeautifulSoup, the ``lxml`` backend with
+lxml, which must be installed separately (``pip install coto[lxml]``).
+
+Select the backend for all clients with:
+
+.. code-block:: python
+
+    import coto.extract
+
+    coto.extract.default_backend = 'lxml'
+"""
+from html.parser import HTMLParser
+
+
+BACKENDS = ('stream', 'bs4', 'lxml')
+
+default_backend = 'stream'
+
+
+class _Stop(Exception):
+    pass
+
+
+def _matches(attrs, match):
+    return all(attrs.get(k) == v for k, v in match.items())
+
+
+class _Extractor(HTMLParser):
+    def __init__(self, tag, match, first, names=None):
+        super().__init__()
+        self.tag = tag
+        self.match = match
+        self.first = first
+        # names still wanted, stop once all are found
+        self.names = set(names) if names is not None else None
+        self.found = []
+        self.form = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k: v if v is not None else '' for k, v in attrs}
+
+        if self.tag == 'form':
+            if self.form is None:
+                if tag == 'form' and _matches(attrs, self.match):
+                    self.form = {'attrs': attrs, 'inputs': []}
+            elif tag in ('input', 'button', 'select', 'textarea'):
+                self.form['inputs'].append(attrs)
+            return
+
+        if tag == self.tag and _matches(attrs, self.match):
+            if self.names is not None:
+                if attrs.get('name') not in self.names:
+                    return
+                self.names.discard(attrs['name'])
+
+            self.found.append(attrs)
+            if self.first or self.names is not None and not self.names:
+                raise _Stop()
+
+    handle_startendtag = handle_starttag
+
+    def handle_endtag(self, tag):
+        if tag == 'form' and self.form is not None:
+            raise _Stop()
+
+    def run(self, html):
+        try:
+            self.feed(html)
+            self.close()
+        except _Stop:
+            pass
+        return self
+
+
+def _backend(backend):
+    backend = backend or default_backend
+    if backend not in BACKENDS:
+        raise Exception("unknown html backend {0}".format(backend))
+    return backend
+
+
+def _bs4(html):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, 'html.parser')
+
+
+def _lxml(html):
+    try:
+        import lxml.html
+    except ImportError:
+        raise Exception("lxml backend requires lxml, install coto[lxml]")
+    return lxml.html.fromstring(html)
+
+
+def _bs4_attrs(element):
+    # bs4 splits multi-valued attributes, e.g., class, into lists
+    return {
+        k: ' '.join(v) if isinstance(v, list) else v
+        for k, v in element.attrs.items()
+    }
+
+
+def _find_all(html, tag, match, backend):
+    if backend == 'bs4':
+        found = (_bs4_attrs(e) for e in _bs4(html).find_all(tag))
+    else:
+        found = (dict(e.attrib) for e in _lxml(html).iter(tag))
+
+    return [attrs for attrs in found if _matches(attrs, match)]
+
+
+def meta(html, backend=None):
+    """
+    Args:
+        html (str): The page.
+        backend (str): ``stream``, ``bs4`` or ``lxml``, defaults to
+            :py:data:`default_backend`.
+
+    Returns:
+        list: The attributes of the ``<meta>`` tags of the page, as dicts.
+    """
+    backend = _backend(backend)
+    if backend == 'stream':
+        return _Extractor('meta', {}, False).run(html).found
+
+    return _find_all(html, 'meta', {}, backend)
+
+
+def meta_content(html, backend=None, names=None):
+    """
+    Args:
+        html (str): The page.
+        backend (str): See :py:func:`meta`.
+        names (iterable): Names of the ``<meta>`` tags to read, ``None`` for
+            all. The ``stream`` backend stops reading the page once it found
+            a tag for each name.
+
+    Returns:
+        dict: The ``content`` of the ``<meta>`` tags of the page, by
+        ``name``. With ``names``, of the first tag per name, the names
+        without a tag are missing.
+    """
+    if names is None:
+        return {
+            m['name']: m.get('content')
+            for m in meta(html, backend) if 'name' in m
+        }
+
+    backend = _backend(backend)
+    if backend == 'stream':
+        found = _Extractor('meta', {}, False, names).run(html).found
+    else:
+        found = _find_all(html, 'meta', {}, backend)
+
+    content = {}
+    for m in found:
+        if m.get('name') in names:
+            content.setdefault(m['name'], m.get('content'))
+    return content
+
+
+def find_meta(html, backend=None, **attrs):
+    """
+    Find the first ``<meta>`` tag with the given attributes, anywhere in the
+    page. The ``stream`` backend stops reading the page once it is found.
+
+    Args:
+        html (str): The page.
+        backend (str): See :py:func:`meta`.
+        **attrs: Attribute values the tag must have, e.g., ``id='xsrf-token'``.
+
+    Returns:
+        dict: The attributes of the tag, ``None`` if there is none.
+    """
+    backend = _backend(backend)
+    if backend == 'stream':
+        found = _Extractor('meta', attrs, True).run(html).found
+    else:
+        found = _find_all(html, 'meta', attrs, backend)
+
+    return found[0] if found else None
+
+
+def form(html, backend=None, **attrs):
+    """
+    Find the first ``<form>`` with the given attributes. The ``stream``
+    backend stops reading the page at the end of the form.
+
+    Args:
+        html (str): The page.
+        backend (str): See :py:func:`meta`.
+        **attrs: Attribute values the form must have, e.g.,
+            ``id='ap_signin_form'``.
+
+    Returns:
+        dict: The ``attrs`` of the form, and the attributes of its
+        ``inputs``, ``None`` if there is no such form.
+    """
+    backend = _backend(backend)
+    if backend == 'stream':
+        return _Extractor('form', attrs, True).run(html).form
+
+    fields = ('input', 'button', 'select', 'textarea')
+    if backend == 'bs4':
+        for element in _bs4(html).find_all('form'):
+            if _matches(_bs4_attrs(element), attrs):
+                return {
+                    'attrs': _bs4_attrs(element),
+                    'inputs': [_bs4_attrs(i) for i in element.find_all(fields)],
+                }
+        return None
+
+    for element in _lxml(html).iter('form'):
+        if _matches(element.attrib, attrs):
+            return {
+                'attrs': dict(element.attrib),
+                'inputs': [dict(i.attrib) for i in element.iter(*fields)],
+            }
+    return None
@@ -0,0 +1,167 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .session import Session, PooledTransport
+
+
+class Result:
+    """
+    The outcome of running an operation for a single account.
+
+    Attributes:
+        account: The account, as it was passed to :py:func:`run`.
+        value: The return value of the operation, ``None`` if it failed.
+        exception (Exception): The exception raised while signing in or
+            executing the operation, ``None`` if it succeeded. Accounts that
+            did not finish in time get a :py:class:`TimeoutError`.
+        elapsed (float): Seconds spent signing in and executing.
+    """
+
+    def __init__(self, account, value=None, exception=None, elapsed=None):
+        self.account = account
+        self.value = value
+        self.exception = exception
+        self.elapsed = elapsed
+
+    @property
+    def ok(self):
+        """
+        bool: The operation succeeded.
+        """
+        return self.exception is None
+
+    def __repr__(self):
+        if self.ok:
+            return "<Result ok {0!r}>".format(self.value)
+        return "<Result failed {0!r}>".format(self.exception)
+
+
+class _Job:
+    def __init__(self, account):
+        self.account = account
+        self.started = None
+
+    def elapsed(self):
+        if self.started is None:
+            return None
+        return time.monotonic() - self.started
+
+
+def _signin_kwargs(account):
+    if isinstance(account, dict):
+        return account
+
+    return {'boto3_session': account}
+
+
+def run(accounts, operation, workers=10, timeout=None, **kwargs):
+    """
+    Run an operation for many accounts, with bounded concurrency.
+
+    For every account a :py:class:`coto.Session` is created and signed in,
+    after which the operation is called with the session. At most ``workers``
+    accounts are processed at the same time.
+
+    Example:
+        .. code-block:: python
+
+            import coto
+
+            accounts = [
+                {'email': 'email@example.com', 'password': 's3cur3 p4ssw0rd!'},
+                boto3.Session(profile_name='member'),
+            ]
+
+            for result in coto.fleet.run(
+                accounts,
+                lambda s: s.client('iam').list_root_access_keys(),
+                workers=20,
+                timeout=120,
+            ):
+                if result.ok:
+                    print(result.value)
+
+    Args:
+        accounts (iterable): The accounts, either dicts with the root user
+            ``email``, ``password`` and optionally ``mfa_secret``, or
+            ``boto3.session.Session`` objects. Consumed lazily.
+        operation (callable): Called with the signed in
+            :py:class:`coto.Session` of every account.
+        workers (int): Maximum number of accounts processed concurrently.
+        timeout (float): Maximum number of seconds for signing in and
+            executing for a single account, ``None`` for no limit. A timed
+            out account is reported immediately, its worker is only released
+            once the underlying call returns.
+        **kwargs: Passed on to :py:class:`coto.Session`, e.g.,
+            ``captcha_solver``. Unless a ``transport`` is passed, all
+            sessions share a :py:class:`coto.PooledTransport` sized for
+            ``workers``.
+
+    Returns:
+        iterator: :py:class:`Result` per account, in completion order.
+    """
+    accounts = iter(accounts)
+
+    if 'transport' not in kwargs:
+        kwargs['transport'] = PooledTransport(pool_maxsize=workers)
+
+    def task(job):
+        job.started = time.monotonic()
+        session = Session(**kwargs)
+        session.signin(**_signin_kwargs(job.account))
+        return operation(session)
+
+    def submit():
+        for account in accounts:
+            job = _Job(account)
+            pending[executor.submit(task, job)] = job
+            if len(pending) >= workers:
+                break
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = {}
+
+    try:
+        submit()
+
+        while pending:
+            wait_timeout = None
+            if timeout is not None:
+                # jobs that have not started yet are queued behind timed out
+                # ones, check back regularly to start their clock
+                wait_timeout = min(
+                    [
+                        timeout - job.elapsed()
+                        for job in pending.values()
+                        if job.started is not None
+                    ] + [1.0]
+                )
+
+            done, _ = wait(
+                pending,
+                timeout=max(wait_timeout, 0) if wait_timeout is not None else None,
+                return_when=FIRST_COMPLETED,
+            )
+
+            for future in done:
+                job = pending.pop(future)
+                try:
+                    yield Result(job.account, value=future.result(), elapsed=job.elapsed())
+                except Exception as e:
+                    yield Result(job.account, exception=e, elapsed=job.elapsed())
+
+            if timeout is not None:
+                for future, job in list(pending.items()):
+                    if job.started is not None and job.elapsed() >= timeout:
+                        del pending[future]
+                        yield Result(
+                            job.account,
+                            exception=TimeoutError(
+                                "account did not finish within {0} seconds".format(timeout)),
+                            elapsed=job.elapsed(),
+                        )
+
+            submit()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
@@ -0,0 +1,113 @@
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PooledGenerator:
+    """
+    Wraps a metadata1 generator, to compute values ahead of time on an
+    executor and hand them out without waiting:
+
+    .. code-block:: python
+
+        import coto
+        from coto.metadata1.pooled_generator import PooledGenerator
+
+        generator = PooledGenerator(MyGenerator(), size=8, low_water=2)
+        session = coto.Session(metadata1_generator=generator)
+
+    The pool is refilled to ``size`` values whenever it drops below
+    ``low_water``. When it is empty, the value is computed right away. CPU
+    bound generators can run on a
+    :py:class:`concurrent.futures.ProcessPoolExecutor`, which requires the
+    wrapped generator to be picklable.
+    """
+
+    def __init__(
+        self, generator, size=8, low_water=2, workers=1, executor=None,
+        max_age=None,
+    ):
+        """
+        Args:
+            generator: The metadata1 generator, with a ``generate`` method.
+            size (int): Values to keep ready.
+            low_water (int): Refill when fewer values are ready.
+            workers (int): Threads computing values, when no ``executor`` is
+                passed.
+            executor (concurrent.futures.Executor): Executor computing the
+                values.
+            max_age (float): Seconds a value can be handed out for, ``None``
+                for no limit.
+        """
+        self.generator = generator
+        self.size = size
+        self.low_water = low_water
+        self.max_age = max_age
+        self._own_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='coto-metadata1')
+        self._ready = collections.deque()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._refill()
+
+    def generate(self):
+        """
+        Returns:
+            str: A precomputed metadata1 value, or a new one when the pool is
+            empty.
+        """
+        value = None
+        with self._lock:
+            while self._ready:
+                created, candidate = self._ready.popleft()
+                if self.max_age is None or \
+                        time.monotonic() - created <= self.max_age:
+                    value = candidate
+                    break
+
+        self._refill()
+        if value is None:
+            value = self.generator.generate()
+        return value
+
+    def ready(self):
+        """
+        Returns:
+            int: Values ready to be handed out.
+        """
+        with self._lock:
+            return len(self._ready)
+
+    def close(self):
+        """
+        Stop computing values, and shut the executor down unless it was
+        passed in.
+        """
+        with self._lock:
+            self._closed = True
+            self._ready.clear()
+        if self._own_executor:
+            self._executor.shutdown(wait=False)
+
+    def _refill(self):
+        with self._lock:
+            if self._closed or \
+                    len(self._ready) + self._pending >= self.low_water:
+                return
+            missing = self.size - len(self._ready) - self._pending
+            self._pending += missing
+
+        for _ in range(missing):
+            self._executor.submit(self.generator.generate).add_done_callback(
+                self._add)
+
+    def _add(self, future):
+        with self._lock:
+            self._pending -= 1
+            if self._closed or future.cancelled() or \
+                    future.exception() is not None:
+                return
+            self._ready.append((time.monotonic(), future.result()))
@@ -1 +1,10 @@
 from .session import Session
+from .retry import RetryPolicy
+from .ratelimit import RateLimiter
+from .transport import PooledTransport
+from .hooks import Hooks
+from .metrics import Metrics
+from .cassette import Cassette, RecordingTransport, ReplayTransport
+from .cache import AccountCache
+from .clock import ServerClock
+from .tokens import TokenStore
@@ -0,0 +1,66 @@
+from .persisted import PersistedMap, digest
+
+
+class AccountCache:
+    """
+    Remembers the account type and whether MFA is required per root user
+    email address, to skip their lookups on the next signin:
+
+    .. code-block:: python
+
+        import coto
+
+        cache = coto.AccountCache('~/.cache/coto/accounts.json')
+        session = coto.Session(account_cache=cache)
+        session.signin(email='email@example.com', password='s3cur3 p4ssw0rd!')
+
+    When a signin shows that the account type or MFA requirement changed,
+    the entry is removed and the signin repeated with fresh lookups. Both
+    ``session.signin`` and the ``signin_aws`` client use the cache. Email
+    addresses are stored hashed. The cache is safe to share between sessions
+    and threads.
+    """
+
+    def __init__(self, path=None, ttl=86400):
+        """
+        Args:
+            path (str): JSON file to persist the cache in, ``None`` to keep it
+                in memory only.
+            ttl (float): Seconds an entry is used for.
+        """
+        self._entries = PersistedMap(path, ttl)
+
+    @staticmethod
+    def _key(email):
+        return digest(email.strip().lower())
+
+    def get(self, email):
+        """
+        Args:
+            email (str): Root user email address.
+
+        Returns:
+            dict: The cached ``account_type`` and ``mfa_required``, either
+            may be missing. ``None`` when nothing is cached or the entry
+            expired.
+        """
+        cached = self._entries.get(self._key(email))
+        return dict(cached) if cached is not None else None
+
+    def set(self, email, **values):
+        """
+        Cache values for an email address, keeping the other cached values.
+
+        Args:
+            email (str): Root user email address.
+            **values: ``account_type`` and/or ``mfa_required``.
+        """
+        self._entries.update(
+            self._key(email), lambda cached: dict(cached or {}, **values))
+
+    def invalidate(self, email):
+        """
+        Args:
+            email (str): Root user email address to forget.
+        """
+        self._entries.discard(self._key(email))
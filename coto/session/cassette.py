@@ -0,0 +1,413 @@
+import base64
+import http.client
+import io
+import json
+import re
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+
+REDACTED = 'REDACTED'
+
+# MFA codes are sent as mfa1 on signin and authenticationCode1/2 to IAM,
+# "mfa" alone would also hide the mfaType that signin reads on replay
+SENSITIVE = (
+    'password', 'token', 'csrf', 'xsrf', 'secret', 'session', 'otp',
+    'signature', 'credential', 'authorization', 'cookie', 'guess',
+    'mfa1', 'authenticationcode',
+)
+
+# headers describing the encoding on the wire, recorded bodies are decoded
+_WIRE_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length')
+
+
+class Scrubber:
+    """
+    Removes secrets from recorded exchanges.
+
+    Replaces the values of cookies, of query, form and JSON fields, of HTML
+    form inputs and meta tags, and of headers whose name contains one of the
+    sensitive words, and every occurrence of the literal secrets.
+    """
+
+    def __init__(self, secrets=(), sensitive=SENSITIVE):
+        """
+        Args:
+            secrets (iterable): Strings to remove wherever they appear,
+                e.g., the root user email address and password.
+            sensitive (iterable): Words that mark a field name as sensitive.
+        """
+        self.secrets = [s for s in secrets if s]
+        self.sensitive = tuple(w.lower() for w in sensitive)
+
+    def is_sensitive(self, name):
+        name = name.lower()
+        return any(word in name for word in self.sensitive)
+
+    def text(self, value):
+        for secret in self.secrets:
+            value = value.replace(secret, REDACTED)
+        return value
+
+    def url(self, url):
+        parts = urlsplit(url)
+        query = urlencode([
+            (k, REDACTED if self.is_sensitive(k) else v)
+            for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        ], safe='/:')
+        return self.text(urlunsplit(parts._replace(query=query)))
+
+    def headers(self, headers):
+        scrubbed = []
+        for name, value in headers:
+            lower = name.lower()
+            if lower == 'set-cookie':
+                cookie, _, attributes = value.partition(';')
+                value = '{0}={1}'.format(cookie.split('=', 1)[0], REDACTED)
+                if attributes:
+                    value += ';' + attributes
+            elif lower == 'location':
+                value = self.url(value)
+            elif self.is_sensitive(name):
+                value = REDACTED
+            scrubbed.append([name, self.text(value)])
+        return scrubbed
+
+    def body(self, body, content_type):
+        if not body:
+            return body
+
+        if 'json' in content_type or body[:1] in ('{', '['):
+            try:
+                return json.dumps(self._json(json.loads(body)))
+            except ValueError:
+                pass
+
+        if 'x-www-form-urlencoded' in content_type:
+            return self.text(urlencode([
+                (k, REDACTED if self.is_sensitive(k) else v)
+                for k, v in parse_qsl(body, keep_blank_values=True)
+            ]))
+
+        if 'html' in content_type:
+            body = self._html(body)
+
+        return self.text(body)
+
+    def _json(self, value):
+        if isinstance(value, dict):
+            return {
+                k: REDACTED if self.is_sensitive(k) and isinstance(v, str)
+                else self._json(v)
+                for k, v in value.items()
+            }
+        if isinstance(value, list):
+            return [self._json(v) for v in value]
+        if isinstance(value, str):
+            return self.text(value)
+        return value
+
+    _TAG = re.compile(r'<(?:input|meta)\b[^>]*>', re.IGNORECASE)
+    _ATTRIBUTE = re.compile(
+        r'''\b([\w-]+)\s*=\s*("[^"]*"|'[^']*')''', re.IGNORECASE)
+
+    def _html(self, html):
+        def tag(match):
+            tag = match.group(0)
+            attributes = {
+                k.lower(): v[1:-1] for k, v in self._ATTRIBUTE.findall(tag)
+            }
+            name = attributes.get('name') or attributes.get('id') or ''
+
+            def attribute(match):
+                key = match.group(1).lower()
+                if key.startswith('data-') and self.is_sensitive(key) or \
+                        key in ('value', 'content') and self.is_sensitive(name):
+                    quote = match.group(2)[0]
+                    return '{0}={1}{2}{1}'.format(
+                        match.group(1), quote, REDACTED)
+                return match.group(0)
+
+            return self._ATTRIBUTE.sub(attribute, tag)
+
+        return self._TAG.sub(tag, html)
+
+
+class Cassette:
+    """
+    Recorded HTTP exchanges, see :py:class:`RecordingTransport` and
+    :py:class:`ReplayTransport`.
+    """
+
+    def __init__(self, interactions=None):
+        self.interactions = interactions or []
+
+    def __len__(self):
+        return len(self.interactions)
+
+    def __iter__(self):
+        return iter(self.interactions)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Args:
+            path (str): Path of a cassette written by :py:meth:`save`.
+
+        Returns:
+            Cassette: The cassette.
+        """
+        with open(path) as f:
+            return cls(json.load(f)['interactions'])
+
+    def save(self, path):
+        """
+        Args:
+            path (str): Path of the JSON file to write.
+        """
+        with open(path, 'w') as f:
+            json.dump({'interactions': self.interactions}, f, indent=2)
+
+
+def _header(headers, name):
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return ''
+
+
+def _encode_body(content):
+    try:
+        return content.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        return base64.b64encode(content).decode('ascii'), 'base64'
+
+
+def _decode_body(body, encoding):
+    if encoding == 'base64':
+        return base64.b64decode(body)
+    return body.encode('utf-8')
+
+
+class _RecordingAdapter(HTTPAdapter):
+    def __init__(self, transport, **kwargs):
+        super().__init__(**kwargs)
+        self.transport = transport
+
+    def send(self, request, **kwargs):
+        start = time.monotonic()
+        r = super().send(request, **kwargs)
+        content = r.content
+        elapsed = time.monotonic() - start
+
+        headers = list(r.raw.headers.items()) if r.raw is not None \
+            else list(r.headers.items())
+        self.transport.record(request, r, headers, content, elapsed)
+        return r
+
+
+class RecordingTransport:
+    """
+    Records the HTTP exchanges of a session to a :py:class:`Cassette`, with
+    secrets scrubbed, for replay with :py:class:`ReplayTransport`:
+
+    .. code-block:: python
+
+        import coto
+
+        cassette = coto.Cassette()
+        session = coto.Session(
+            transport=coto.RecordingTransport(
+                cassette, secrets=['email@example.com', 's3cur3 p4ssw0rd!']),
+        )
+        session.signin(email='email@example.com', password='s3cur3 p4ssw0rd!')
+        session.client('iam').get_account_info()
+        cassette.save('iam.json')
+
+    Scrubbing is best effort, review cassettes before sharing them. Only
+    :py:class:`coto.Session` is supported.
+    """
+
+    def __init__(self, cassette, secrets=(), scrubber=None):
+        """
+        Args:
+            cassette (Cassette): The cassette to append exchanges to.
+            secrets (iterable): Strings to remove from the recording.
+            scrubber (Scrubber): Removes secrets from the recording, replaces
+                ``secrets`` when passed.
+        """
+        self.cassette = cassette
+        self.scrubber = scrubber or Scrubber(secrets)
+        self.adapter = _RecordingAdapter(self)
+        self._lock = threading.Lock()
+
+    def record(self, request, r, headers, content, elapsed):
+        scrub = self.scrubber
+        request_body = request.body
+        if isinstance(request_body, bytes):
+            request_body = request_body.decode('utf-8', errors='replace')
+
+        body, encoding = _encode_body(content)
+        if encoding != 'base64':
+            body = scrub.body(body, _header(headers, 'content-type'))
+
+        interaction = {
+            'request': {
+                'method': request.method,
+                'url': scrub.url(request.url),
+                'headers': scrub.headers(request.headers.items()),
+                'body': scrub.body(
+                    request_body, request.headers.get('Content-Type', '')),
+            },
+            'response': {
+                'status': r.status_code,
+                'reason': r.reason,
+                'headers': scrub.headers(
+                    [h for h in headers if h[0].lower() not in _WIRE_HEADERS]),
+                'body': body,
+                'encoding': encoding,
+            },
+            'elapsed': elapsed,
+        }
+
+        with self._lock:
+            self.cassette.interactions.append(interaction)
+
+    def mount(self, session):
+        """
+        Let a session record its exchanges.
+
+        Args:
+            session (requests.Session): The session.
+        """
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+
+    def close(self):
+        self.adapter.close()
+
+
+class _OriginalResponse:
+    # the part of http.client.HTTPResponse used to extract cookies
+    def __init__(self, headers):
+        self.msg = http.client.HTTPMessage()
+        for name, value in headers:
+            self.msg[name] = value
+
+    def isclosed(self):
+        return True
+
+
+class _ReplayAdapter(HTTPAdapter):
+    def __init__(self, transport):
+        super().__init__()
+        self.transport = transport
+
+    def send(self, request, stream=False, timeout=None, verify=True,
+             cert=None, proxies=None):
+        interaction = self.transport.match(request)
+        response = interaction['response']
+
+        delay = self.transport.latency
+        if delay == 'recorded':
+            delay = interaction.get('elapsed', 0)
+        if delay:
+            time.sleep(delay)
+
+        content = _decode_body(response['body'], response['encoding'])
+        headers = response['headers'] + [['Content-Length', str(len(content))]]
+
+        raw = HTTPResponse(
+            body=io.BytesIO(content),
+            headers=headers,
+            status=response['status'],
+            reason=response.get('reason'),
+            preload_content=False,
+            decode_content=False,
+            original_response=_OriginalResponse(headers),
+        )
+        return self.build_response(request, raw)
+
+
+class ReplayTransport:
+    """
+    Serves the exchanges of a :py:class:`Cassette`, without network access:
+
+    .. code-block:: python
+
+        import coto
+
+        session = coto.Session(
+            transport=coto.ReplayTransport(coto.Cassette.load('iam.json')),
+        )
+
+    Requests are matched to recorded exchanges by method and URL, ignoring
+    the query string, and every exchange is served once in recorded order.
+    A request without a matching exchange raises an exception.
+    """
+
+    def __init__(self, cassette, latency=None, repeat=False):
+        """
+        Args:
+            cassette (Cassette): The recorded exchanges.
+            latency (float | str): Seconds to wait before every response,
+                ``'recorded'`` to wait as long as the recorded exchange took.
+                ``None`` to respond immediately (default).
+            repeat (bool): Once all exchanges matching a request were served,
+                serve them again from the first, e.g., for benchmarks.
+        """
+        self.cassette = cassette
+        self.latency = latency
+        self.repeat = repeat
+        self.adapter = _ReplayAdapter(self)
+        self._served = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(method, url):
+        parts = urlsplit(url)
+        return method, parts.scheme, parts.netloc, parts.path
+
+    def match(self, request):
+        key = self._key(request.method, request.url)
+        with self._lock:
+            matching = [
+                i for i, interaction in enumerate(self.cassette.interactions)
+                if self._key(
+                    interaction['request']['method'],
+                    interaction['request']['url']) == key
+            ]
+            if self.repeat and matching and \
+                    all(i in self._served for i in matching):
+                self._served.difference_update(matching)
+
+            for i in matching:
+                if i not in self._served:
+                    self._served.add(i)
+                    return self.cassette.interactions[i]
+
+        raise Exception("no recorded response for {0} {1}".format(
+            request.method, request.url))
+
+    def rewind(self):
+        """
+        Serve all exchanges again.
+        """
+        with self._lock:
+            self._served = set()
+
+    def mount(self, session):
+        """
+        Let a session replay the exchanges.
+
+        Args:
+            session (requests.Session): The session.
+        """
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+
+    def close(self):
+        pass
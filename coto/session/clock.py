@@ -0,0 +1,124 @@
+import collections
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+
+class ServerClock:
+    """
+    Estimates the clock of the AWS servers from the ``Date`` headers of the
+    responses, to compute MFA codes the servers accept on hosts with a
+    drifting clock.
+
+    A ``Date`` header tells that the server clock was at least at that
+    second when the response was received, and less than a second past it
+    when the request was sent. The offset to the local clock is estimated
+    from these bounds over the last ``window`` responses.
+
+    Codes are computed for the current 30 second period of the server. When
+    too little of the period is left for the request to arrive in it, the
+    next period is waited for.
+    """
+
+    def __init__(self, window=32, margin=1.0, step=30):
+        """
+        Args:
+            window (int): Number of responses to estimate the offset from.
+            margin (float): Seconds a code must stay valid for beyond the
+                expected round trip.
+            step (int): Seconds a code is valid for.
+        """
+        self.margin = margin
+        self.step = step
+        self.rtt = None
+        self._bounds = collections.deque(maxlen=window)
+        self._last_date = None
+        self._last_timestamp = None
+        self._lock = threading.Lock()
+
+    def observe(self, date, sent, received):
+        """
+        Args:
+            date (str): ``Date`` header of a response.
+            sent (float): Local :py:func:`time.time` the request was sent at.
+            received (float): Local :py:func:`time.time` the response was
+                received at.
+        """
+        if not date:
+            return
+
+        with self._lock:
+            if date != self._last_date:
+                try:
+                    self._last_timestamp = parsedate_to_datetime(
+                        date).timestamp()
+                except (TypeError, ValueError):
+                    return
+                self._last_date = date
+            server = self._last_timestamp
+
+            self._bounds.append((server - received, server + 1 - sent))
+            rtt = received - sent
+            self.rtt = rtt if self.rtt is None else 0.8 * self.rtt + 0.2 * rtt
+
+    def _estimate(self):
+        if not self._bounds:
+            return 0.0, 0.0
+
+        low = max(b[0] for b in self._bounds)
+        high = min(b[1] for b in self._bounds)
+        if low > high:
+            # stale cached responses or a local clock change, the lower
+            # bounds can only be too low
+            return low, 1.0
+
+        return (low + high) / 2, (high - low) / 2
+
+    @property
+    def offset(self):
+        """
+        float: Seconds the server clock is ahead of the local clock.
+        """
+        with self._lock:
+            return self._estimate()[0]
+
+    def now(self):
+        """
+        Returns:
+            float: Estimated server time, as a Unix timestamp.
+        """
+        return time.time() + self.offset
+
+    def wait(self):
+        """
+        Returns:
+            float: Seconds to wait for a code to stay valid until the
+            request reaches the server.
+        """
+        with self._lock:
+            offset, uncertainty = self._estimate()
+            rtt = self.rtt or 0.0
+
+        left = self.step - (time.time() + offset) % self.step
+        if left < rtt + uncertainty + self.margin:
+            return left + uncertainty
+        return 0.0
+
+    def codes(self, secret, count=1):
+        """
+        Args:
+            secret (str): Base32 MFA secret.
+            count (int): Number of consecutive codes.
+
+        Returns:
+            list: The codes of the last ``count`` periods, ending with the
+            current one, at the estimated server time.
+        """
+        # only imported by root user signins with MFA
+        from pyotp import TOTP
+
+        totp = TOTP(secret, interval=self.step)
+        now = self.now()
+        return [
+            totp.at(now - self.step * i) for i in reversed(range(count))
+        ]
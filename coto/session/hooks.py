@@ -0,0 +1,107 @@
+class Event:
+    """
+    Describes a request, passed to the hooks.
+
+    Attributes:
+        name (str): ``on_request``, ``on_response`` or ``on_retry``.
+        method (str): HTTP method.
+        url (str): Requested URL.
+        host (str): Requested host.
+        operation (str): Name of the operation, e.g., ``iam.get_account_info``,
+            ``None`` for requests the client did not name.
+        attempt (int): Number of the attempt, starting at 1.
+        status (int): Response status code. ``None`` before the response
+            arrived, or when the request failed.
+        request_bytes (int): Size of the request body.
+        response_bytes (int): Size of the response body.
+        elapsed (float): Seconds between sending the request and receiving
+            the response, including redirects.
+        exception (Exception): The error when the request failed.
+        delay (float): Seconds until the next attempt, for ``on_retry``.
+    """
+
+    __slots__ = (
+        'name', 'method', 'url', 'host', 'operation', 'attempt', 'status',
+        'request_bytes', 'response_bytes', 'elapsed', 'exception', 'delay',
+    )
+
+    def __init__(
+        self, name, method, url, host, operation, attempt, status=None,
+        request_bytes=None, response_bytes=None, elapsed=None,
+        exception=None, delay=None,
+    ):
+        self.name = name
+        self.method = method
+        self.url = url
+        self.host = host
+        self.operation = operation
+        self.attempt = attempt
+        self.status = status
+        self.request_bytes = request_bytes
+        self.response_bytes = response_bytes
+        self.elapsed = elapsed
+        self.exception = exception
+        self.delay = delay
+
+    def __repr__(self):
+        return "<Event {0} {1} {2} {3}>".format(
+            self.name, self.method, self.url, self.status)
+
+
+class Hooks:
+    """
+    Functions called for every request of a session.
+
+    * ``on_request``: before a request is sent.
+    * ``on_response``: after a response is received, or the request failed.
+    * ``on_retry``: before waiting to retry a request.
+
+    Every hook is called with an :py:class:`Event`. Sessions do not create
+    events when no hook is registered for them.
+
+    .. code-block:: python
+
+        import coto
+
+        session = coto.Session()
+        session.hooks.register(
+            'on_response',
+            lambda e: print(e.operation, e.status, e.elapsed),
+        )
+
+    Pass the same hooks to multiple sessions to observe all of them.
+    """
+
+    EVENTS = ('on_request', 'on_response', 'on_retry')
+
+    def __init__(self):
+        self.on_request = []
+        self.on_response = []
+        self.on_retry = []
+
+    def register(self, event, hook):
+        """
+        Args:
+            event (str): ``on_request``, ``on_response`` or ``on_retry``.
+            hook (callable): Called with an :py:class:`Event`.
+        """
+        if event not in self.EVENTS:
+            raise Exception("unknown event {0}".format(event))
+
+        getattr(self, event).append(hook)
+
+    def unregister(self, event, hook):
+        getattr(self, event).remove(hook)
+
+    @staticmethod
+    def emit(hooks, event):
+        for hook in hooks:
+            hook(event)
+
+
+def debug_hook(event):
+    """
+    Prints a line per response, without headers or bodies.
+    """
+    print(event.status or event.exception, event.method, event.url,
+          "{0:.3f}s".format(event.elapsed))
@@ -0,0 +1,204 @@
+import threading
+
+
+DEFAULT_BUCKETS = (
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+class _Operation:
+    __slots__ = (
+        'client', 'requests', 'errors', 'retries', 'request_bytes',
+        'response_bytes', 'latency_sum', 'latency_buckets',
+    )
+
+    def __init__(self, client, buckets):
+        self.client = client
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency_sum = 0.0
+        # non cumulative, the last one counts observations above all bounds
+        self.latency_buckets = [0] * (len(buckets) + 1)
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+class Metrics:
+    """
+    Per operation request counters and latency histograms.
+
+    Sessions created with ``metrics`` collect them for their requests. Pass
+    the same metrics to multiple sessions, e.g., to :py:func:`coto.fleet.run`,
+    to aggregate them:
+
+    .. code-block:: python
+
+        import coto
+
+        metrics = coto.Metrics()
+        for result in coto.fleet.run(accounts, operation, metrics=metrics):
+            pass
+
+        print(metrics.prometheus())
+
+    Operations are named ``<client>.<operation>``, e.g.,
+    ``signin_aws.authenticateRoot``. Requests the clients did not name are
+    counted under their host.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='coto'):
+        """
+        Args:
+            buckets (tuple): Upper bounds of the latency histogram buckets,
+                in seconds.
+            prefix (str): Prefix of the exported metric names.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    def register(self, hooks):
+        """
+        Start collecting the requests of a session.
+
+        Args:
+            hooks (coto.Hooks): The hooks of the session.
+        """
+        if self.on_response not in hooks.on_response:
+            hooks.register('on_response', self.on_response)
+            hooks.register('on_retry', self.on_retry)
+
+    def _operation(self, event):
+        operation = event.operation or event.host
+        stats = self._operations.get(operation)
+        if stats is None:
+            client = operation.split('.', 1)[0] if event.operation else None
+            stats = _Operation(client, self.buckets)
+            self._operations[operation] = stats
+
+        return stats
+
+    def on_response(self, event):
+        with self._lock:
+            stats = self._operation(event)
+            stats.requests += 1
+            if event.exception is not None or \
+                    (event.status is not None and event.status >= 400):
+                stats.errors += 1
+            stats.request_bytes += event.request_bytes or 0
+            stats.response_bytes += event.response_bytes or 0
+
+            if event.elapsed is not None:
+                stats.latency_sum += event.elapsed
+                index = len(self.buckets)
+                for i, bound in enumerate(self.buckets):
+                    if event.elapsed <= bound:
+                        index = i
+                        break
+                stats.latency_buckets[index] += 1
+
+    def on_retry(self, event):
+        with self._lock:
+            self._operation(event).retries += 1
+
+    def reset(self):
+        """
+        Forget all collected metrics.
+        """
+        with self._lock:
+            self._operations = {}
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: Per operation name, a dict with the ``client``, the number
+            of ``requests``, ``errors`` and ``retries``, the total
+            ``request_bytes`` and ``response_bytes``, and the ``latency``
+            with its ``count``, ``sum`` and cumulative ``buckets`` keyed by
+            upper bound.
+        """
+        with self._lock:
+            snapshot = {}
+            for operation, stats in self._operations.items():
+                buckets = {}
+                count = 0
+                for bound, n in zip(self.buckets, stats.latency_buckets):
+                    count += n
+                    buckets[bound] = count
+                count += stats.latency_buckets[-1]
+                buckets[float('inf')] = count
+
+                snapshot[operation] = {
+                    'client': stats.client,
+                    'requests': stats.requests,
+                    'errors': stats.errors,
+                    'retries': stats.retries,
+                    'request_bytes': stats.request_bytes,
+                    'response_bytes': stats.response_bytes,
+                    'latency': {
+                        'count': count,
+                        'sum': stats.latency_sum,
+                        'buckets': buckets,
+                    },
+                }
+
+        return snapshot
+
+    def prometheus(self):
+        """
+        Export the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics.
+        """
+        snapshot = self.snapshot()
+        counters = [
+            ('requests', 'requests_total', "Requests sent."),
+            ('errors', 'errors_total',
+             "Requests that failed or returned an error status."),
+            ('retries', 'retries_total', "Requests that were retried."),
+            ('request_bytes', 'request_bytes_total', "Request body bytes."),
+            ('response_bytes', 'response_bytes_total',
+             "Response body bytes."),
+        ]
+
+        lines = []
+        for key, name, help in counters:
+            name = '{0}_{1}'.format(self.prefix, name)
+            lines.append('# HELP {0} {1}'.format(name, help))
+            lines.append('# TYPE {0} counter'.format(name))
+            for operation, stats in sorted(snapshot.items()):
+                lines.append('{0}{{{1}}} {2}'.format(
+                    name, self._labels(operation, stats), stats[key]))
+
+        name = '{0}_request_duration_seconds'.format(self.prefix)
+        lines.append('# HELP {0} Request latency.'.format(name))
+        lines.append('# TYPE {0} histogram'.format(name))
+        for operation, stats in sorted(snapshot.items()):
+            labels = self._labels(operation, stats)
+            latency = stats['latency']
+            for bound, count in latency['buckets'].items():
+                le = '+Inf' if bound == float('inf') else _format_bound(bound)
+                lines.append('{0}_bucket{{{1},le="{2}"}} {3}'.format(
+                    name, labels, le, count))
+            lines.append('{0}_sum{{{1}}} {2!r}'.format(
+                name, labels, latency['sum']))
+            lines.append('{0}_count{{{1}}} {2}'.format(
+                name, labels, latency['count']))
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _labels(operation, stats):
+        return 'client="{0}",operation="{1}"'.format(
+            _escape(stats['client'] or ''), _escape(operation))
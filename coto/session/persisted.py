@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+def digest(text):
+    """
+    Args:
+        text (str): Text to store hashed, e.g., an email address.
+
+    Returns:
+        str: The SHA-256 hex digest of the text.
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class PersistedMap:
+    """
+    Values by key that expire after ``ttl`` seconds, optionally persisted in a
+    JSON file. The file is replaced atomically on every change and created
+    readable by the owner only. Safe to share between threads.
+    """
+
+    def __init__(self, path=None, ttl=3600):
+        """
+        Args:
+            path (str): JSON file to persist the values in, ``None`` to keep
+                them in memory only.
+            ttl (float): Seconds a value is used for.
+        """
+        self.path = os.path.expanduser(path) if path is not None else None
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+        if self.path is not None and os.path.exists(self.path):
+            with open(self.path) as f:
+                self._entries = json.load(f)
+
+    def _value(self, key):
+        entry = self._entries.get(key)
+        if entry is None or time.time() - entry['stored_at'] > self.ttl:
+            return None
+        return entry['value']
+
+    def get(self, key):
+        """
+        Returns:
+            The value, ``None`` when nothing is stored or the value expired.
+        """
+        with self._lock:
+            return self._value(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._set(key, value)
+
+    def update(self, key, func):
+        """
+        Replace a value, atomically.
+
+        Args:
+            key (str): The key.
+            func (callable): Called with the current value, or ``None``,
+                returns the new value.
+        """
+        with self._lock:
+            self._set(key, func(self._value(key)))
+
+    def _set(self, key, value):
+        self._entries[key] = {'value': value, 'stored_at': time.time()}
+        self._save()
+
+    def keys(self):
+        """
+        Returns:
+            list: The keys, including those of expired values.
+        """
+        with self._lock:
+            return list(self._entries)
+
+    def discard(self, *keys):
+        with self._lock:
+            removed = [
+                key for key in keys if self._entries.pop(key, None) is not None
+            ]
+            if removed:
+                self._save()
+
+    def _save(self):
+        if self.path is None:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        tmp = '{0}.{1}.tmp'.format(self.path, os.getpid())
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self._entries, f)
+        os.replace(tmp, self.path)
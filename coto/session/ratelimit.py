@@ -0,0 +1,114 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Allows ``rate`` requests per second on average, and bursts of up to
+    ``burst`` requests.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Take a token, possibly one that is yet to be added to the bucket.
+
+        Returns:
+            float: Seconds to wait before the token may be used.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst,
+                self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+
+            if self._tokens >= 0:
+                return 0.0
+
+            return -self._tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Limits the rate of requests per host, and optionally per operation on a
+    host.
+
+    All sessions share :py:data:`default_limiter`, which has no limits until
+    they are configured:
+
+    .. code-block:: python
+
+        from coto.session.ratelimit import default_limiter
+
+        default_limiter.set_limit('signin.aws.amazon.com', rate=5, burst=10)
+        default_limiter.set_limit(
+            'signin.aws.amazon.com', rate=1,
+            operation='signin_aws.resolveAccountType')
+        default_limiter.set_limit('console.aws.amazon.com', rate=20)
+
+    A request has to wait for both the limit of its host and the limit of
+    its operation. Operations are named like in
+    :py:class:`coto.RetryPolicy`.
+    """
+
+    def __init__(self):
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return len(self._buckets) > 0
+
+    def set_limit(self, host, rate, burst=None, operation=None):
+        """
+        Args:
+            host (str): Host name, e.g., ``signin.aws.amazon.com``.
+            rate (float): Average number of requests per second.
+            burst (int): Number of requests that may be made at once, when
+                no requests were made for a while. Defaults to ``rate``.
+            operation (str): Only limit this operation on the host.
+        """
+        with self._lock:
+            self._buckets[(host, operation)] = TokenBucket(rate, burst)
+
+    def remove_limit(self, host, operation=None):
+        with self._lock:
+            self._buckets.pop((host, operation), None)
+
+    def reserve(self, host, operation=None):
+        """
+        Reserve a request.
+
+        Returns:
+            float: Seconds to wait before making the request.
+        """
+        keys = [(host, None)]
+        if operation is not None:
+            keys.append((host, operation))
+
+        delay = 0.0
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                delay = max(delay, bucket.reserve())
+
+        return delay
+
+    def acquire(self, host, operation=None):
+        """
+        Wait until a request may be made.
+        """
+        delay = self.reserve(host, operation)
+        if delay > 0:
+            time.sleep(delay)
+
+
+#: The rate limiter shared by all sessions in the process.
+default_limiter = RateLimiter()
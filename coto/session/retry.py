@@ -0,0 +1,105 @@
+import random
+
+
+class RetryPolicy:
+    """
+    Determines which failed requests are retried, and when.
+
+    Requests are retried after connection errors, timeouts, and responses
+    with one of the ``statuses`` status codes, but only when they are safe to
+    repeat: their method is one of ``methods``, or the client marked the
+    operation as an idempotent read. The delay before the next attempt grows
+    exponentially from ``backoff`` up to ``max_backoff`` seconds, randomized
+    when ``jitter`` is set. A ``Retry-After`` header takes precedence.
+
+    Operations are named after the client method, ``<service>.<method>``,
+    for example ``iam.get_account_info``, or after the console action, for
+    example ``signin_aws.authenticateRoot``. Use
+    ``overrides`` to set a different policy for specific operations:
+
+    .. code-block:: python
+
+        import coto
+
+        session = coto.Session(
+            retry_policy=coto.RetryPolicy(
+                max_attempts=5,
+                overrides={
+                    'sso.ListDirectoryAssociations': coto.RetryPolicy(
+                        max_attempts=10,
+                    ),
+                },
+            ),
+        )
+    """
+
+    def __init__(
+        self, max_attempts=3, backoff=0.5, max_backoff=20, jitter=True,
+        statuses=(429, 500, 502, 503, 504), exceptions=(),
+        methods=('GET', 'HEAD', 'OPTIONS'), overrides=None,
+    ):
+        """
+        Args:
+            max_attempts (int): Maximum number of attempts, including the
+                first. ``1`` disables retries.
+            backoff (float): Delay in seconds before the first retry.
+            max_backoff (float): Maximum delay in seconds between attempts.
+            jitter (bool): Pick a random delay between zero and the
+                exponential delay, to spread the retries of many sessions.
+            statuses (tuple): Status codes to retry.
+            exceptions (tuple): Exception classes to retry, in addition to
+                connection errors and timeouts.
+            methods (tuple): HTTP methods that are always safe to retry.
+            overrides (dict): Policies for specific operations.
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.statuses = statuses
+        self.exceptions = exceptions
+        self.methods = methods
+        self.overrides = overrides or {}
+
+    def for_operation(self, operation):
+        """
+        Args:
+            operation (str): Name of the operation.
+
+        Returns:
+            RetryPolicy: The policy that applies to the operation.
+        """
+        return self.overrides.get(operation, self)
+
+    def retryable(self, method, idempotent=None):
+        """
+        Args:
+            method (str): HTTP method of the request.
+            idempotent (bool): Whether the client marked the operation as
+                safe to repeat, ``None`` when it did not say.
+
+        Returns:
+            bool: The request may be retried.
+        """
+        if idempotent is not None:
+            return idempotent
+
+        return method.upper() in self.methods
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Args:
+            attempt (int): Number of the attempt that failed, starting at 1.
+            retry_after (str): Value of the ``Retry-After`` header.
+
+        Returns:
+            float: Seconds to wait before the next attempt.
+        """
+        if retry_after is not None and retry_after.strip().isdigit():
+            return min(float(retry_after), self.max_backoff)
+
+        delay = min(self.backoff * 2 ** (attempt - 1), self.max_backoff)
+        if self.jitter:
+            return random.uniform(0, delay)
+
+        return delay
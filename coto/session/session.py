@@ -1,44 +1,193 @@
 import requests
 import json
-from urllib.parse import unquote
-from .. import clients
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from .. import captcha, clients
+from ..exceptions import SessionExpiredException
+from ..exceptions import ThrottlingException, ServerErrorException
+from .retry import RetryPolicy
+from . import ratelimit
+from .hooks import Event, Hooks, debug_hook
+from .clock import ServerClock
+from . import tokens
+
+
+# sso needs AWS_DEFAULT_REGION, warm it explicitly
+WARM_SERVICES = ('iam', 'billing', 'support')
+
+
+def expired(url, r, expect_json=False):
+    """
+    Determine whether a response shows that the console session expired.
 
+    Only requests to the console are considered: these are redirected to
+    signin, refused with 401, or answered with an HTML page where an API
+    response was expected, once the session expired.
 
-def dr(r):
-    for i in r.history + [r]:
-        if i.status_code < 400:
-            fg = 'green'
-        else:
-            fg = 'red'
-
-        # print(
-        #     color(
-        #         str(i.status_code) + \
-        #             " " + i.request.method + \
-        #             " " + i.request.url,
-        #         fg=fg,
-        #         style='underline'))
-
-        for k, v in i.request.headers.items():
-            if k == 'Cookie':
-                #print(color(k + ':', fg='blue'))
-                for c in v.split(";"):
-                    c = c.strip()
-                    (n, c) = c.split('=', maxsplit=1)
-                    #print(color('    ' + n + ': ', fg='blue') + unquote(c))
-            #else:
-                #print(color(k + ':', fg='blue'), v)
-
-        # for k, v in i.headers.items():
-        #     print(color(k + ':', fg='yellow'), v)
-
-        if i.request.body and len(i.request.body) > 0:
-            #print(color('Body:', fg='blue'))
-            print(i.request.body)
-            #print(color('EOF', fg='blue'))
-
-
-class Session:
+    Args:
+        url (str): The requested URL.
+        r: The response, after following redirects.
+        expect_json (bool): The request expects an API response.
+
+    Returns:
+        bool: The session expired.
+    """
+    if not urlparse(url).netloc.endswith('console.aws.amazon.com'):
+        return False
+
+    if urlparse(r.url).netloc == 'signin.aws.amazon.com':
+        return True
+
+    if r.status_code == 401:
+        return True
+
+    html = r.headers.get('Content-Type', '').startswith('text/html')
+    if r.status_code == 403 and html:
+        return True
+
+    return expect_json and r.status_code == 200 and html
+
+
+def response_exception(method, url, r):
+    """
+    Args:
+        method (str): The request method.
+        url (str): The requested URL.
+        r: The response.
+
+    Returns:
+        Exception: The typed exception for a throttled or server error
+        response, ``None`` for other responses.
+    """
+    if r.status_code == 429:
+        return ThrottlingException(
+            "throttled on {0} {1}".format(method, url), r)
+
+    if r.status_code >= 500:
+        return ServerErrorException(
+            "server error {0} on {1} {2}: {3}".format(
+                r.status_code, method, url, r.text[:200]), r)
+
+    return None
+
+
+class BaseSession:
+    """
+    The request handling shared by :py:class:`Session` and
+    :py:class:`coto.AsyncSession`: rate limiting, retries, hooks and the
+    mapping of responses to exceptions. Subclasses provide the transport:
+
+    * ``_send(method, url, kwargs)``, the response of a request,
+    * ``_sleep(delay)``,
+    * ``_transport_errors()``, the exceptions of the transport to retry,
+    * ``_transferred(r, kwargs)``, the request and response sizes in bytes,
+
+    and run the request steps with ``_run``.
+    """
+
+    def _event(self, name, method, url, operation, attempt, **kwargs):
+        return Event(
+            name, method, url, urlparse(url).netloc, operation, attempt,
+            **kwargs)
+
+    def _request_steps(
+        self, method, url, expect_json, operation, idempotent, kwargs
+    ):
+        """
+        The steps of a request, see :py:mod:`coto.clients.steps`.
+
+        Returns:
+            The response.
+        """
+        self._set_defaults(kwargs)
+        policy = self.retry_policy.for_operation(operation)
+        retryable = policy.retryable(method, idempotent)
+        retry_exceptions = self._transport_errors() + policy.exceptions
+        hooks = self.hooks
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.rate_limiter:
+                delay = self.rate_limiter.reserve(
+                    urlparse(url).netloc, operation)
+                if delay > 0:
+                    yield clients.steps.call('_sleep', delay)
+
+            if hooks.on_request:
+                hooks.emit(hooks.on_request, self._event(
+                    'on_request', method, url, operation, attempt))
+
+            start = time.monotonic()
+            sent = time.time()
+            try:
+                r = yield clients.steps.call('_send', method, url, kwargs)
+            except retry_exceptions as e:
+                if hooks.on_response:
+                    hooks.emit(hooks.on_response, self._event(
+                        'on_response', method, url, operation, attempt,
+                        elapsed=time.monotonic() - start, exception=e))
+
+                if not retryable or attempt >= policy.max_attempts:
+                    raise
+
+                delay = policy.delay(attempt)
+                if hooks.on_retry:
+                    hooks.emit(hooks.on_retry, self._event(
+                        'on_retry', method, url, operation, attempt,
+                        exception=e, delay=delay))
+                yield clients.steps.call('_sleep', delay)
+                continue
+
+            self.clock.observe(r.headers.get('Date'), sent, time.time())
+
+            if hooks.on_response:
+                request_bytes, response_bytes = self._transferred(r, kwargs)
+                hooks.emit(hooks.on_response, self._event(
+                    'on_response', method, url, operation, attempt,
+                    status=r.status_code,
+                    request_bytes=request_bytes,
+                    response_bytes=response_bytes,
+                    elapsed=time.monotonic() - start))
+
+            if r.status_code not in policy.statuses or \
+                    not retryable or attempt >= policy.max_attempts:
+                break
+
+            delay = policy.delay(attempt, r.headers.get('Retry-After'))
+            if hooks.on_retry:
+                hooks.emit(hooks.on_retry, self._event(
+                    'on_retry', method, url, operation, attempt,
+                    status=r.status_code, delay=delay))
+            yield clients.steps.call('_sleep', delay)
+
+        error = response_exception(method, url, r)
+        if error is not None:
+            raise error
+
+        if self.authenticated and expired(url, r, expect_json):
+            raise SessionExpiredException(
+                "session expired on {0} {1}".format(method, url))
+
+        return r
+
+    def _get(self, url, **kwargs):
+        return self._request('GET', url, **kwargs)
+
+    def _post(self, url, **kwargs):
+        return self._request('POST', url, **kwargs)
+
+    def _put(self, url, **kwargs):
+        return self._request('PUT', url, **kwargs)
+
+    def _delete(self, url, **kwargs):
+        return self._request('DELETE', url, **kwargs)
+
+
+class Session(BaseSession):
     """
     The Session class represents a session with the AWS Management Console.
 
@@ -49,27 +198,73 @@ class Session:
     def __init__(
         self, debug=False, verify=True,
         metadata1_generator=None,
-        captcha_solver=None, **kwargs
+        captcha_solver=None, retry_policy=None, rate_limiter=None,
+        transport=None, hooks=None, metrics=None, account_cache=None,
+        clock=None, token_store=None,
+        **kwargs
     ):
         """
         Args:
-            debug (bool): Enable debug messages.
+            debug (bool): Print a line for every response.
             verify (str | bool): Requests SSL certificate checking. Path to
                 CA certificates file. ``False`` to ignore certificate errors.
                 ``True`` to use defaults (default).
             captcha_solver (coto.captcha.Solver): Class implementing a way to solve captchas (e.g., send them to Slack for you to solve).
             metadata1_generator (coto.metadata1.Generator): Class implementing a way to generate metadata1.
+            retry_policy (coto.RetryPolicy): Which failed requests to retry,
+                and when. Defaults to three attempts for idempotent requests.
+            rate_limiter (coto.RateLimiter): Limits the request rate.
+                Defaults to the limiter shared by all sessions in the
+                process, :py:data:`coto.session.ratelimit.default_limiter`.
+            transport (coto.PooledTransport): Connection pools to share with
+                other sessions. By default the session has its own.
+            hooks (coto.session.hooks.Hooks): Functions to call for every
+                request. By default the session has its own, available as
+                the ``hooks`` attribute.
+            metrics (coto.Metrics): Collects per operation request metrics,
+                available as the ``metrics`` attribute. ``None`` to not
+                collect them (default).
+            account_cache (coto.AccountCache): Remembers account types and
+                MFA requirements to skip their lookups on root user signin.
+            clock (coto.ServerClock): Estimates the server time from the
+                responses, to compute MFA codes. Pass the same clock to
+                multiple sessions to share the estimate. By default the
+                session has its own, available as the ``clock`` attribute.
+            token_store (coto.TokenStore): Keeps the tokens of the clients
+                per signed in identity. Pass the same store to multiple
+                sessions to share the tokens. By default the session has its
+                own, available as the ``token_store`` attribute.
             **kwargs: You can pass arguments for the signin method here.
         """
         self.debug = debug
+        self.hooks = hooks if hooks is not None else Hooks()
+        if debug and debug_hook not in self.hooks.on_response:
+            self.hooks.register('on_response', debug_hook)
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.register(self.hooks)
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter if rate_limiter is not None \
+            else ratelimit.default_limiter
         self._metadata1_generator = metadata1_generator
         self._captcha_solver = captcha_solver
         self.root = False
         self.coupled = None
         self.session = requests.Session()
         self.session.verify = verify
+        if transport is not None:
+            transport.mount(self.session)
         self.authenticated = False
         self._clients = {}
+        self._saved_tokens = {}
+        self._signin_kwargs = None
+        self._reauthenticating = False
+        self.signin_timings = None
+        self.account_cache = account_cache
+        self.clock = clock if clock is not None else ServerClock()
+        self.token_store = token_store if token_store is not None \
+            else tokens.TokenStore()
+        self.identity = uuid.uuid4().hex
 
         self.timeout = (3.1, 10)
         self.user_agent = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_13_3) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/64.0.3282.186 Safari/537.36'
@@ -86,6 +281,11 @@ class Session:
             * Using the Account Root User, pass the ``email``, ``password``, and
               optionally ``mfa_secret`` arguments.
 
+        A root user signin looks up the account type and MFA status
+        concurrently, and stores the seconds spent per phase in
+        ``signin_timings``, e.g., ``{'tokens': 0.2, 'account_type': 0.3,
+        'mfa_status': 0.3, 'authenticate': 0.6, 'total': 1.1}``.
+
         Args:
             boto3_session (boto3.session.Session): The credentials of this
                 session are retrieved and used to signin to the console.
@@ -95,16 +295,181 @@ class Session:
                 The Base32 seed defined as specified in RFC3548.
                 The Base32StringSeed is Base64-encoded.
         """
+        self._signin_kwargs = kwargs
+        self.identity = tokens.identity(kwargs) or self.identity
+
         if 'boto3_session' in kwargs:
             boto3_session = kwargs.get('boto3_session')
-            return self.client('federation').signin(boto3_session)
+            result = self.client('federation').signin(boto3_session)
 
         elif 'email' in kwargs and 'password' in kwargs:
             args = {}
             for key in ['email', 'password', 'mfa_secret']:
                 if key in kwargs:
                     args[key] = kwargs.get(key)
-            return self.client('signin').signin(**args)
+            result = self.client('signin').signin(**args)
+
+        else:
+            return None
+
+        # the tokens of earlier console sessions are rejected
+        if self.authenticated:
+            self.identity = tokens.identity(
+                kwargs, self._console_session()) or self.identity
+        return result
+
+    def _console_session(self):
+        for cookie in self.session.cookies:
+            if cookie.name == tokens.CONSOLE_SESSION_COOKIE:
+                return cookie.value
+        return None
+
+    def _reauthenticate(self):
+        """
+        Signin again, using the arguments of the previous signin.
+
+        Returns:
+            bool: Signin succeeded. ``False`` when there is no previous
+            signin to repeat.
+        """
+        if self._signin_kwargs is None or self._reauthenticating:
+            return False
+
+        self._reauthenticating = True
+        try:
+            self.authenticated = False
+            self.session.cookies.clear()
+            self._saved_tokens = {}
+            self.token_store.invalidate(self.identity)
+            for client in self._clients.values():
+                client._drop_tokens()
+
+            self.signin(**self._signin_kwargs)
+        finally:
+            self._reauthenticating = False
+
+        return self.authenticated
+
+    def save(self, path):
+        """
+        Save the session to a file, to be restored with :py:meth:`load`.
+
+        The cookies, the authentication state and the tokens obtained by the
+        clients are saved. Signin credentials are not. Anyone holding the file
+        has access to the account for as long as the session lasts, the file
+        is therefore created readable by the owner only.
+
+        Args:
+            path (str): Path of the file to write.
+        """
+        saved_tokens = self.token_store.tokens(self.identity)
+        saved_tokens.update(self._saved_tokens)
+        for service, client in self._clients.items():
+            dump = client._dump_tokens()
+            if any(v is not None for v in dump.values()):
+                saved_tokens[service] = dump
+
+        state = {
+            'saved_at': time.time(),
+            'identity': self.identity,
+            'authenticated': self.authenticated,
+            'root': self.root,
+            'coupled': self.coupled,
+            'cookies': [
+                {
+                    'name': c.name,
+                    'value': c.value,
+                    'domain': c.domain,
+                    'path': c.path,
+                    'expires': c.expires,
+                    'secure': c.secure,
+                    'rest': c._rest,
+                }
+                for c in self.session.cookies
+            ],
+            'tokens': saved_tokens,
+        }
+
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(state, f)
+
+    @classmethod
+    def load(cls, path, max_age=3600, **kwargs):
+        """
+        Restore a session saved with :py:meth:`save`.
+
+        Freshness is checked without contacting AWS: the session is rejected
+        when it was saved more than ``max_age`` seconds ago, or when all of
+        its cookies have expired.
+
+        Example:
+            .. code-block:: python
+
+                import coto
+
+                try:
+                    session = coto.Session.load('session.json')
+                except coto.exceptions.SessionExpiredException:
+                    session = coto.Session(email=email, password=password)
+                    session.save('session.json')
+
+        Args:
+            path (str): Path of the file to read.
+            max_age (float): Maximum age in seconds of the saved session.
+                ``None`` to only check cookie expiry.
+            **kwargs: Passed on to :py:class:`Session`, e.g.,
+                ``captcha_solver``. Signin arguments are not used to signin
+                now, but to signin again once the restored session expires.
+
+        Returns:
+            Session: The restored session.
+
+        Raises:
+            :py:class:`coto.exceptions.SessionExpiredException`: The saved
+                session is too old to be used.
+        """
+        with open(path) as f:
+            state = json.load(f)
+
+        now = time.time()
+        if max_age is not None and now - state['saved_at'] > max_age:
+            raise SessionExpiredException(
+                "saved session older than {0} seconds".format(max_age))
+
+        cookies = [
+            c for c in state['cookies']
+            if c['expires'] is None or c['expires'] > now
+        ]
+        if state['authenticated'] and len(cookies) == 0:
+            raise SessionExpiredException("saved session cookies expired")
+
+        signin_kwargs = {
+            key: kwargs.pop(key)
+            for key in ['boto3_session', 'email', 'password', 'mfa_secret']
+            if key in kwargs
+        }
+
+        session = cls(**kwargs)
+        session._signin_kwargs = signin_kwargs or None
+        for c in cookies:
+            session.session.cookies.set_cookie(requests.cookies.create_cookie(
+                c['name'], c['value'],
+                domain=c['domain'],
+                path=c['path'],
+                expires=c['expires'],
+                secure=c['secure'],
+                rest=c['rest'],
+            ))
+
+        session.authenticated = state['authenticated']
+        session.root = state['root']
+        session.coupled = state['coupled']
+        session._saved_tokens = state['tokens']
+        session.identity = tokens.identity(
+            signin_kwargs, session._console_session()) or \
+            state.get('identity', session.identity)
+        return session
 
     # http requests
     def _set_defaults(self, kwargs):
@@ -116,34 +481,73 @@ class Session:
 
         kwargs['headers']['User-Agent'] = self.user_agent
 
-    def _get(self, url, **kwargs):
-        self._set_defaults(kwargs)
-        r = self.session.get(url, **kwargs)
-        if self.debug:
-            dr(r)
-        return r
+    def _transport_errors(self):
+        return (requests.ConnectionError, requests.Timeout)
 
-    def _post(self, url, **kwargs):
-        self._set_defaults(kwargs)
+    def _send(self, method, url, kwargs):
+        return self.session.request(method, url, **kwargs)
 
-        r = self.session.post(url, **kwargs)
-        if self.debug:
-            dr(r)
-        return r
+    def _transferred(self, r, kwargs):
+        if kwargs.get('stream'):
+            response_bytes = int(r.headers.get('Content-Length', 0))
+        else:
+            response_bytes = len(r.content)
 
-    def _put(self, url, **kwargs):
-        self._set_defaults(kwargs)
-        r = self.session.put(url, **kwargs)
-        if self.debug:
-            dr(r)
-        return r
+        return len(r.request.body or ''), response_bytes
 
-    def _delete(self, url, **kwargs):
-        self._set_defaults(kwargs)
-        r = self.session.delete(url, **kwargs)
-        if self.debug:
-            dr(r)
-        return r
+    def _sleep(self, delay):
+        time.sleep(delay)
+
+    def _request(
+        self, method, url, expect_json=False, operation=None,
+        idempotent=None, **kwargs
+    ):
+        return self._run(self._request_steps(
+            method, url, expect_json, operation, idempotent, kwargs))
+
+    def _mfa_codes(self, secret, count=1):
+        """
+        Returns:
+            list: The MFA codes of the last ``count`` periods at the server
+            time, after waiting for the next period when the current one
+            ends before the request would arrive.
+        """
+        delay = self.clock.wait()
+        if delay > 0:
+            time.sleep(delay)
+
+        return self.clock.codes(secret, count)
+
+    def _captcha_image(self, url):
+        r = self._get(url, operation='captcha.image', idempotent=True)
+        if r.status_code != 200:
+            raise IOError("could not download captcha {0}".format(url))
+
+        return r.content
+
+    def _solve_captcha(self, url=None, image=None):
+        """
+        Hand a captcha to the captcha solver. Its image is downloaded through
+        this session, unless the solver does not take images.
+
+        Returns:
+            concurrent.futures.Future: Future of the guess, with the id of
+            the job in its ``job_id`` attribute.
+        """
+        solver = self._captcha_solver
+        if image is None and getattr(solver, 'fetch_image', False):
+            image = self._captcha_image(url)
+
+        return captcha.submit(solver, image=image, url=url)
+
+    def _run(self, steps):
+        """
+        Run the steps of a client method, see :py:mod:`coto.clients.steps`.
+
+        Returns:
+            The return value of the steps.
+        """
+        return clients.steps.run(self, steps)
 
     def client(self, service):
         """
@@ -170,10 +574,11 @@ class Session:
         service = service.lower()
 
         if service not in self._clients:
-            if not hasattr(clients, service):
+            module = clients.get(service)
+            if module is None:
                 raise Exception("service {0} unsupported".format(service))
 
-            klass = getattr(clients, service).Client
+            klass = module.Client
 
             if klass.REQUIRES_AUTHENTICATION and not self.authenticated:
                 raise Exception(
@@ -182,4 +587,47 @@ class Session:
 
             self._clients[service] = klass(self)
 
+            saved = self._saved_tokens.pop(service, None)
+            if saved is None and klass.REQUIRES_AUTHENTICATION:
+                saved = self.token_store.get(self.identity, service)
+            if saved is not None:
+                self._clients[service]._restore_tokens(saved)
+
         return self._clients[service]
+
+    def warm(self, services=WARM_SERVICES):
+        """
+        Load the pages with the tokens of service clients in the background,
+        concurrently, for the first calls to the clients not to wait for them
+        one after the other:
+
+        .. code-block:: python
+
+            session = coto.Session(email=email, password=password)
+            session.warm(['iam', 'billing', 'support'])
+
+        A call to a client waits until its tokens are loaded. A client whose
+        tokens fail to load, loads them again on its first call.
+
+        Args:
+            services (list): Names of the services, e.g., ``iam``. By
+                default ``iam``, ``billing`` and ``support``.
+
+        Returns:
+            dict: :py:class:`concurrent.futures.Future` per service, done once
+            its tokens are loaded.
+        """
+        warming = {service: self.client(service) for service in services}
+        if not warming:
+            return {}
+
+        executor = ThreadPoolExecutor(
+            max_workers=len(warming), thread_name_prefix='coto-warm')
+        try:
+            for service, client in warming.items():
+                client._warming = warming[service] = executor.submit(
+                    self._run, client._warm())
+        finally:
+            executor.shutdown(wait=False)
+
+        return warming
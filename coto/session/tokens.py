@@ -0,0 +1,129 @@
+from .persisted import PersistedMap, digest
+
+
+#: Cookie of the console session, the tokens of the clients are bound to it.
+CONSOLE_SESSION_COOKIE = 'aws-creds'
+
+
+def identity(signin_kwargs, console_session=None):
+    """
+    Args:
+        signin_kwargs (dict): Arguments of :py:meth:`coto.Session.signin`.
+        console_session (str): Value of the console session cookie, once
+            signed in.
+
+    Returns:
+        str: Hashed identity the session signs in as, the root user email
+        address or the access key of the boto3 session, and the console
+        session. ``None`` when it cannot be told.
+    """
+    if 'email' in signin_kwargs:
+        principal = 'root:' + signin_kwargs['email'].strip().lower()
+    elif 'boto3_session' in signin_kwargs:
+        try:
+            credentials = signin_kwargs['boto3_session'].get_credentials()
+            principal = 'federation:' + credentials.access_key
+        except (AttributeError, TypeError):
+            return None
+    else:
+        return None
+
+    if console_session is not None:
+        principal += ':' + console_session
+
+    return digest(principal)
+
+
+class TokenStore:
+    """
+    Keeps the XSRF and CSRF tokens the clients scrape from console pages,
+    per console session and service, to skip the page loads when a client
+    is created again, by the same session or another one using the console
+    session, e.g., restored with :py:meth:`coto.Session.load`:
+
+    .. code-block:: python
+
+        import coto
+
+        store = coto.TokenStore('~/.cache/coto/tokens.json')
+        session = coto.Session(token_store=store)
+        session.signin(email='email@example.com', password='s3cur3 p4ssw0rd!')
+
+    Stored tokens are used until they expire, or until the console rejects
+    one: the client then drops it, loads the page for a new one and replays
+    the request once. The console binds the tokens to its session: a new
+    signin does not use the tokens of earlier ones, and signing in again
+    after the session expired drops them.
+    The store is safe to share between sessions and threads. Anyone holding
+    the file can use the tokens, it is therefore created readable by the
+    owner only.
+    """
+
+    def __init__(self, path=None, ttl=3600):
+        """
+        Args:
+            path (str): JSON file to persist the tokens in, ``None`` to keep
+                them in memory only.
+            ttl (float): Seconds the tokens of a service are used for.
+        """
+        self._entries = PersistedMap(path, ttl)
+
+    @staticmethod
+    def _key(identity, service):
+        return '{0}/{1}'.format(identity, service)
+
+    def get(self, identity, service):
+        """
+        Args:
+            identity (str): The session identity.
+            service (str): Name of the service, e.g., ``iam``.
+
+        Returns:
+            dict: The tokens, ``None`` when nothing is stored or the tokens
+            expired.
+        """
+        tokens = self._entries.get(self._key(identity, service))
+        return dict(tokens) if tokens is not None else None
+
+    def set(self, identity, service, tokens):
+        """
+        Args:
+            identity (str): The session identity.
+            service (str): Name of the service, e.g., ``iam``.
+            tokens (dict): The tokens of the service client.
+        """
+        self._entries.set(self._key(identity, service), dict(tokens))
+
+    def _services(self, identity):
+        prefix = self._key(identity, '')
+        return [
+            key[len(prefix):] for key in self._entries.keys()
+            if key.startswith(prefix)
+        ]
+
+    def tokens(self, identity):
+        """
+        Args:
+            identity (str): The session identity.
+
+        Returns:
+            dict: The tokens per service that have not expired.
+        """
+        tokens = {}
+        for service in self._services(identity):
+            stored = self.get(identity, service)
+            if stored is not None:
+                tokens[service] = stored
+        return tokens
+
+    def invalidate(self, identity, service=None):
+        """
+        Args:
+            identity (str): The session identity.
+            service (str): Name of the service to drop the tokens of,
+                ``None`` to drop the tokens of all services.
+        """
+        services = [service] if service is not None \
+            else self._services(identity)
+        self._entries.discard(
+            *(self._key(identity, service) for service in services))
@@ -0,0 +1,56 @@
+from requests.adapters import HTTPAdapter
+
+
+class PooledTransport:
+    """
+    Connection pools shared by many sessions.
+
+    Every :py:class:`coto.Session` normally has connection pools of its own.
+    Sessions created with the same transport instead reuse the same
+    keep-alive connections to the signin and console hosts, while keeping
+    their own cookies and tokens:
+
+    .. code-block:: python
+
+        import coto
+
+        transport = coto.PooledTransport(pool_maxsize=50)
+        sessions = [
+            coto.Session(transport=transport, boto3_session=boto3_session)
+            for boto3_session in boto3_sessions
+        ]
+
+    The transport is safe to use from multiple threads.
+    """
+
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False):
+        """
+        Args:
+            pool_connections (int): Number of hosts to keep a pool for.
+            pool_maxsize (int): Maximum number of connections kept open per
+                host. Set to the number of threads making requests.
+            pool_block (bool): Wait for a free connection when all
+                ``pool_maxsize`` connections of a host are in use, instead
+                of opening a connection that is not kept.
+        """
+        self.adapter = HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+
+    def mount(self, session):
+        """
+        Let a session use the shared connection pools.
+
+        Args:
+            session (requests.Session): The session.
+        """
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+
+    def close(self):
+        """
+        Close all connections.
+        """
+        self.adapter.close()
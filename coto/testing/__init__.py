@@ -0,0 +1,2 @@
+from .server import Account, FakeConsole
+from .transport import LocalTransport
@@ -0,0 +1,720 @@
+import json
+import random
+import secrets
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from pyotp import TOTP
+from .transport import LocalTransport
+
+
+# 1x1 transparent PNG, served as captcha image
+CAPTCHA_IMAGE = bytes.fromhex(
+    '89504e470d0a1a0a0000000d4948445200000001000000010806000000'
+    '1f15c4890000000d49444154789c63000100000500010d0a2db40000000049454e44ae426082'
+)
+
+SESSION_COOKIE = 'aws-creds'
+
+
+class Account:
+    """
+    An account served by :py:class:`FakeConsole`.
+
+    Attributes are updated by the requests of the clients, e.g., the
+    ``access_keys`` after :py:meth:`coto.clients.iam.Client.create_root_access_key`.
+    """
+
+    def __init__(
+        self, email, password, mfa_secret=None, account_id=None,
+        name=None, access_key_id=None, captcha=False,
+    ):
+        """
+        Args:
+            email (str): Root user email address.
+            password (str): Root user password.
+            mfa_secret (str): Base32 seed of the root user virtual MFA
+                device, ``None`` when the root user has no MFA.
+            account_id (str): Account ID, random by default.
+            name (str): Account name, the email address by default.
+            access_key_id (str): Access key ID accepted by the federation
+                endpoint to signin to this account.
+            captcha (bool): Require a captcha for every signin.
+        """
+        self.email = email
+        self.password = password
+        self.mfa_secret = mfa_secret
+        self.account_id = account_id or ''.join(
+            random.choice('0123456789') for _ in range(12))
+        self.name = name or email
+        self.access_key_id = access_key_id
+        self.captcha = captcha
+        self.status = 'ACTIVE'
+        self.support_level = 'basic'
+        self.access_keys = []
+        self.mfa_devices = [] if mfa_secret is None else [
+            'arn:aws:iam::{0}:mfa/root-account-mfa-device'.format(
+                self.account_id)]
+        self.alternate_contacts = []
+        self.tax_registrations = []
+        self.sso_associations = []
+        self.sso_profiles = {}
+
+
+class _Session:
+    def __init__(self, account, ttl):
+        self.account = account
+        self.expires = time.monotonic() + ttl if ttl is not None else None
+        self.xsrf_token = secrets.token_urlsafe(16)
+
+    def valid(self):
+        return self.expires is None or time.monotonic() < self.expires
+
+
+class FakeConsole:
+    """
+    A local stand-in for the AWS Management Console endpoints used by the
+    clients, for tests and load tests without AWS:
+
+    .. code-block:: python
+
+        import coto
+        from coto.testing import Account, FakeConsole
+
+        accounts = [
+            Account('{0}@example.com'.format(i), 'password')
+            for i in range(10000)
+        ]
+
+        with FakeConsole(accounts, latency=0.05, throttle=0.01) as console:
+            session = coto.Session(transport=console.transport())
+            session.signin(email='0@example.com', password='password')
+            session.client('iam').list_root_access_keys()
+
+    Serves the signin (``/signin``, ``/mfa``, ``/federation``,
+    ``/updateaccount``), IAM root access keys and MFA devices, billing,
+    support plan and IAM Identity Center (SSO) endpoints of Decoupled
+    accounts, keeping their state in memory. Accounts are not signed in
+    through amazon.com.
+    """
+
+    def __init__(
+        self, accounts=(), host='127.0.0.1', port=0, latency=0,
+        throttle=0, captcha=0, captcha_answer='coto', session_ttl=None,
+        certfile=None, keyfile=None, seed=None, clock_skew=0,
+    ):
+        """
+        Args:
+            accounts (iterable): The :py:class:`Account` objects to serve.
+            host (str): Address to listen on.
+            port (int): Port to listen on, ``0`` for a free port.
+            latency (float): Seconds to wait before every response.
+            throttle (float): Fraction of requests answered with status 429.
+            captcha (float): Fraction of signins that require a captcha, in
+                addition to accounts created with ``captcha=True``.
+            captcha_answer (str): The solution of every captcha.
+            session_ttl (float): Seconds after which console sessions expire,
+                ``None`` to never expire.
+            certfile (str): Certificate to serve HTTPS with.
+            keyfile (str): Private key of the certificate.
+            seed (int): Seed for throttling and captcha decisions.
+            clock_skew (float): Seconds the clock of the server is ahead of
+                the local clock, for ``Date`` headers and MFA codes.
+        """
+        self.accounts = {}
+        self._access_keys = {}
+        for account in accounts:
+            self.add_account(account)
+
+        self.latency = latency
+        self.throttle = throttle
+        self.captcha = captcha
+        self.captcha_answer = captcha_answer
+        self.session_ttl = session_ttl
+        self.clock_skew = clock_skew
+
+        self._random = random.Random(seed)
+        self._sessions = {}
+        self._signin_tokens = {}
+        self._captchas = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.console = self
+        self.scheme = 'http'
+        if certfile is not None:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self._server.socket = context.wrap_socket(
+                self._server.socket, server_side=True)
+            self.scheme = 'https'
+
+    @property
+    def url(self):
+        """
+        str: Base URL of the server.
+        """
+        host, port = self._server.server_address[:2]
+        return '{0}://{1}:{2}'.format(self.scheme, host, port)
+
+    def add_account(self, account):
+        """
+        Args:
+            account (Account): Account to serve.
+        """
+        self.accounts[account.email] = account
+        if account.access_key_id is not None:
+            self._access_keys[account.access_key_id] = account
+
+    def start(self):
+        """
+        Start serving in a background thread.
+        """
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, args=(0.1,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def transport(self, verify=None, pool_maxsize=10):
+        """
+        Create a transport that sends the requests of sessions to this
+        server.
+
+        Args:
+            verify (str | bool): Certificate checking for HTTPS, see
+                :py:class:`LocalTransport`.
+            pool_maxsize (int): Maximum number of connections kept open.
+
+        Returns:
+            LocalTransport: The transport, for the ``transport`` argument
+            of :py:class:`coto.Session`.
+        """
+        return LocalTransport(
+            self.url, verify=verify, pool_maxsize=pool_maxsize)
+
+    def expire_sessions(self):
+        """
+        Expire all console sessions, the clients have to signin again.
+        """
+        with self._lock:
+            self._sessions = {}
+
+    # state, called by the handler
+
+    def _chance(self, fraction):
+        if not fraction:
+            return False
+        with self._lock:
+            return self._random.random() < fraction
+
+    def _create_session(self, account):
+        session_id = secrets.token_urlsafe(24)
+        with self._lock:
+            self._sessions[session_id] = _Session(account, self.session_ttl)
+        return session_id
+
+    def _session(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and not session.valid():
+                del self._sessions[session_id]
+                session = None
+        return session
+
+    def _create_captcha(self):
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._captchas[token] = self.captcha_answer
+        return token
+
+    def _solve_captcha(self, token, guess):
+        with self._lock:
+            answer = self._captchas.pop(token, None)
+        return answer is not None and answer == guess
+
+    def _create_signin_token(self, account):
+        token = secrets.token_urlsafe(32)
+        with self._lock:
+            self._signin_tokens[token] = account
+        return token
+
+    def _redeem_signin_token(self, token):
+        with self._lock:
+            return self._signin_tokens.pop(token, None)
+
+
+def _html(meta='', body=''):
+    return '<html><head>{0}</head><body>{1}</body></html>'.format(meta, body)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written separately, avoid waiting for acks
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def date_time_string(self, timestamp=None):
+        if timestamp is None:
+            timestamp = time.time() + self.server.console.clock_skew
+        return super().date_time_string(timestamp)
+
+    # responses
+
+    def _send(self, status, body=b'', content_type='application/json',
+              headers=()):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _json(self, data, status=200, headers=()):
+        self._send(status, json.dumps(data), headers=headers)
+
+    def _page(self, meta='', headers=()):
+        self._send(
+            200, _html(meta), content_type='text/html; charset=utf-8',
+            headers=headers)
+
+    def _redirect(self, location, headers=()):
+        self._send(302, headers=[('Location', location)] + list(headers))
+
+    def _action(self, state, properties):
+        self._json({'state': state, 'properties': properties})
+
+    # requests
+
+    def _handle(self):
+        console = self.server.console
+        parts = urlsplit(self.path)
+        self.route = parts.path
+        self.query = dict(parse_qsl(parts.query, keep_blank_values=True))
+        self.host = self.headers.get('Host', '').split(':')[0]
+
+        length = int(self.headers.get('Content-Length') or 0)
+        self.body = self.rfile.read(length).decode('utf-8') if length else ''
+
+        if console.latency:
+            time.sleep(console.latency)
+
+        if console._chance(console.throttle):
+            return self._json(
+                {'message': 'Rate exceeded'}, status=429,
+                headers=[('Retry-After', '0')])
+
+        cookies = {}
+        for cookie in self.headers.get_all('Cookie') or []:
+            for pair in cookie.split(';'):
+                name, _, value = pair.strip().partition('=')
+                cookies[name] = value
+        self.session = console._session(cookies.get(SESSION_COOKIE))
+
+        if self.host == 'signin.aws.amazon.com':
+            return self._signin(console)
+        if self.host.endswith('console.aws.amazon.com'):
+            return self._console(console)
+
+        self._json({'message': 'unknown host'}, status=404)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_PUT = _handle
+    do_DELETE = _handle
+
+    def _form(self):
+        return dict(parse_qsl(self.body, keep_blank_values=True))
+
+    def _data(self):
+        return json.loads(self.body) if self.body else None
+
+    def _session_cookie(self, session_id):
+        return (
+            'Set-Cookie',
+            '{0}={1}; Domain=.aws.amazon.com; Path=/'.format(
+                SESSION_COOKIE, session_id),
+        )
+
+    # signin.aws.amazon.com
+
+    def _signin(self, console):
+        if self.route == '/federation':
+            return self._federation(console)
+
+        if self.route == '/captcha':
+            return self._send(200, CAPTCHA_IMAGE, content_type='image/png')
+
+        if self.command == 'GET' and self.route in ('/signin', '/updateaccount'):
+            return self._page(
+                '<meta name="csrf_token" content="{0}">'
+                '<meta name="session_id" content="{1}">'.format(
+                    secrets.token_urlsafe(16), secrets.token_urlsafe(16)))
+
+        if self.command == 'POST' and self.route == '/signin':
+            return self._signin_action(console, self._form())
+
+        if self.command == 'POST' and self.route == '/mfa':
+            account = console.accounts.get(self._form().get('email'))
+            mfa_type = 'SW' if account and account.mfa_secret else 'NONE'
+            return self._json({'mfaType': mfa_type})
+
+        if self.command == 'POST' and self.route == '/updateaccount':
+            return self._account_action(console, self._form())
+
+        self._json({'message': 'not found'}, status=404)
+
+    def _captcha_required(self, console, account, data):
+        if not account.captcha and not console._chance(console.captcha):
+            return None
+
+        if data.get('captcha_token') and console._solve_captcha(
+                data['captcha_token'], data.get('captcha_guess')):
+            return None
+
+        return {
+            'Captcha': 'true',
+            'CES': console._create_captcha(),
+            'CaptchaURL': 'https://signin.aws.amazon.com/captcha',
+            'captchaObfuscationToken': secrets.token_urlsafe(8),
+        }
+
+    def _signin_action(self, console, data):
+        action = data.get('action')
+        account = console.accounts.get(data.get('email'))
+
+        if action == 'captcha':
+            return self._action('SUCCESS', {
+                'Captcha': 'true',
+                'CES': console._create_captcha(),
+                'CaptchaURL': 'https://signin.aws.amazon.com/captcha',
+                'captchaObfuscationToken': secrets.token_urlsafe(8),
+            })
+
+        if action == 'resolveAccountType':
+            if account is None:
+                return self._action(
+                    'SUCCESS', {'resolvedAccountType': 'Unknown'})
+
+            captcha = self._captcha_required(console, account, data)
+            if captcha is not None:
+                return self._action('FAIL', captcha)
+
+            return self._action(
+                'SUCCESS', {'resolvedAccountType': 'Decoupled'})
+
+        if action == 'authenticateRoot':
+            if account is None or account.password != data.get('password'):
+                return self._action('FAIL', {
+                    'Message': 'Your authentication information is incorrect.'})
+
+            if account.mfa_secret is not None and 'mfa1' not in data:
+                return self._action('FAIL', {
+                    'Message': 'MFA code required.', 'mfaType': 'SW'})
+
+            if account.mfa_secret is not None and not TOTP(
+                    account.mfa_secret).verify(
+                        data.get('mfa1', ''),
+                        for_time=time.time() + console.clock_skew,
+                        valid_window=1):
+                return self._action('FAIL', {
+                    'Message': 'Your authentication information is incorrect.'})
+
+            session_id = console._create_session(account)
+            self._json(
+                {'state': 'SUCCESS', 'properties': {
+                    'RedirectTo': data.get('redirect_uri')}},
+                headers=[self._session_cookie(session_id)])
+            return
+
+        self._action('FAIL', {'Message': 'unknown action {0}'.format(action)})
+
+    def _account_action(self, console, data):
+        if self.session is None:
+            return self._action('FAIL', {'action': 'reAuth'})
+
+        account = self.session.account
+        action = data.get('action')
+
+        if action == 'getAuthState':
+            return self._action('SUCCESS', {
+                'accountEmail': account.email,
+                'accountName': account.name,
+            })
+
+        if action == 'updateAccountName':
+            account.name = data.get('newAccountName')
+            return self._action(
+                'SUCCESS', {'updatedAccountName': account.name})
+
+        if action in ('updateAccountEmail', 'updateAccountPassword'):
+            password = data.get('password', data.get('oldpassword'))
+            if password != account.password:
+                return self._action(
+                    'FAIL', {'Message': 'Incorrect password'})
+
+            if action == 'updateAccountEmail':
+                with console._lock:
+                    del console.accounts[account.email]
+                    account.email = data.get('newEmailAddress')
+                    console.accounts[account.email] = account
+                return self._action(
+                    'SUCCESS', {'updatedAccountEmail': account.email})
+
+            account.password = data.get('newpassword')
+            return self._action('SUCCESS', {})
+
+        self._action('FAIL', {'Message': 'unknown action {0}'.format(action)})
+
+    def _federation(self, console):
+        action = self.query.get('Action')
+
+        if action == 'getSigninToken':
+            credentials = json.loads(self.query.get('Session', '{}'))
+            account = console._access_keys.get(credentials.get('sessionId'))
+            if account is None:
+                return self._json(
+                    {'message': 'invalid credentials'}, status=400)
+
+            return self._json({
+                'SigninToken': console._create_signin_token(account)})
+
+        if action == 'login':
+            account = console._redeem_signin_token(
+                self.query.get('SigninToken'))
+            if account is None:
+                return self._json({'message': 'invalid token'}, status=400)
+
+            session_id = console._create_session(account)
+            return self._redirect(
+                self.query.get('Destination', 'https://console.aws.amazon.com/'),
+                headers=[self._session_cookie(session_id)])
+
+        self._json({'message': 'unknown action'}, status=400)
+
+    # console.aws.amazon.com
+
+    def _console(self, console):
+        route = self.route
+        page = self.command == 'GET' and (
+            route in ('/', '/console/home') or route.endswith('/home'))
+
+        if self.session is None:
+            if page:
+                return self._redirect(
+                    'https://signin.aws.amazon.com/signin?' + urlencode(
+                        {'redirect_uri': 'https://console.aws.amazon.com' + route}))
+            return self._json({'message': 'unauthenticated'}, status=401)
+
+        token = self.session.xsrf_token
+        if page:
+            if route == '/iam/home':
+                return self._page(
+                    '<meta id="xsrf-token" data-token="{0}">'.format(token))
+            if route == '/billing/home':
+                return self._page(headers=[('x-awsbc-xsrf-token', token)])
+            if route == '/support/plans/home':
+                return self._page(headers=[
+                    ('Set-Cookie', 'XSRF-TOKEN={0}; Path=/'.format(token))])
+            if route == '/singlesignon/identity/home':
+                return self._page(
+                    '<meta name="awsc-csrf-token" content="{0}">'.format(token))
+            return self._page()
+
+        headers = {k.lower(): v for k, v in self.headers.items()}
+        if token not in (
+            headers.get('x-csrf-token'),
+            headers.get('x-awsbc-xsrf-token'),
+            headers.get('x-xsrf-token'),
+        ):
+            return self._json({'message': 'invalid xsrf token'}, status=403)
+
+        account = self.session.account
+        with console._lock:
+            if route.startswith('/iam/'):
+                return self._iam(account, route[len('/iam/'):].rstrip('/'))
+            if route.startswith('/billing/rest/v1.0/'):
+                return self._billing(account, route[len('/billing/rest/v1.0/'):])
+            if route.startswith('/support/plans/service/'):
+                return self._support(
+                    account, route[len('/support/plans/service/'):])
+            if route.startswith('/singlesignon/api/'):
+                return self._sso(account)
+
+        self._json({'message': 'not found'}, status=404)
+
+    def _iam(self, account, api):
+        method = self.headers.get('x-http-method-override', self.command).upper()
+
+        if api == 'service/account':
+            return self._json({
+                'aliases': [],
+                'errorMap': {},
+                'errors': [],
+                'summaryMap': {
+                    'AccountAccessKeysPresent': int(any(
+                        k['status'] != 'Deleted' for k in account.access_keys)),
+                    'AccountMFAEnabled': int(bool(account.mfa_devices)),
+                    'MFADevices': len(account.mfa_devices),
+                    'MFADevicesInUse': len(account.mfa_devices),
+                },
+            })
+
+        if api == 'service/root/keys' and method == 'GET':
+            deleted = self.query.get('deleted') == '1'
+            return self._json([
+                k for k in account.access_keys
+                if (k['status'] == 'Deleted') == deleted
+            ])
+
+        if api == 'service/root/keys' and method == 'POST':
+            now = int(time.time() * 1000)
+            key = {
+                'id': 'AKIA' + secrets.token_hex(8).upper(),
+                'status': 'Active',
+                'createDate': now,
+                'deleteDate': None,
+                'lastUsedDetails': {},
+            }
+            account.access_keys.append(key)
+            return self._json(dict(key, secret=secrets.token_urlsafe(30)))
+
+        if api.startswith(('root/keys/', 'service/root/keys/')):
+            key_id = api.rsplit('/', 1)[1]
+            for key in account.access_keys:
+                if key['id'] == key_id:
+                    if method == 'DELETE':
+                        key['status'] = 'Deleted'
+                        key['deleteDate'] = int(time.time() * 1000)
+                    elif method == 'SERVICE/ACTIVATE':
+                        key['status'] = 'Active'
+                    elif method == 'SERVICE/DEACTIVATE':
+                        key['status'] = 'Inactive'
+                    return self._json({'success': True})
+            return self._json({'success': False}, status=404)
+
+        if api == 'api/mfa':
+            return self._json({
+                'serialNumber': list(account.mfa_devices),
+                'truncated': False,
+            })
+
+        data = self._data() or {}
+        if api == 'api/mfa/createVirtualMfa':
+            return self._json({
+                'serialNumber': 'arn:aws:iam::{0}:mfa/{1}'.format(
+                    account.account_id, data.get('virtualMFADeviceName')),
+                'qrCodePNG': '',
+                'base32StringSeed': '',
+            })
+
+        if api == 'api/mfa/enableMfaDevice':
+            account.mfa_devices.append(data.get('serialNumber'))
+            return self._json({})
+
+        if api == 'api/mfa/deactivateMfaDevice':
+            if data.get('serialNumber') in account.mfa_devices:
+                account.mfa_devices.remove(data.get('serialNumber'))
+            return self._json({})
+
+        self._json({'message': 'not found'}, status=404)
+
+    def _billing(self, account, api):
+        if api == 'account/status':
+            return self._json(account.status)
+
+        if api == 'account' and self.command == 'PUT':
+            account.status = 'SUSPENDED'
+            return self._json({})
+
+        if api == 'additionalcontacts':
+            if self.command == 'PUT':
+                account.alternate_contacts = self._data()
+                return self._json({})
+            return self._json(account.alternate_contacts)
+
+        if api == 'taxexemption/eu/vat/information':
+            if self.command == 'PUT':
+                registration = self._data()
+                account.tax_registrations = [
+                    r for r in account.tax_registrations
+                    if r.get('registrationId') != registration.get('registrationId')
+                ]
+                if registration.get('currentStatus') != 'Deleted':
+                    account.tax_registrations.append(
+                        dict(registration, currentStatus='Verified'))
+                return self._json({})
+            return self._json(
+                {'taxRegistrationList': account.tax_registrations})
+
+        self._json({'message': 'not found'}, status=404)
+
+    def _support(self, account, api):
+        if api == 'describeSupportLevelSummary':
+            return self._json({'response': {
+                'supportLevel': account.support_level, 'canChange': True}})
+
+        if api == 'updateSupportLevel':
+            account.support_level = (self._data() or {}).get('supportLevel')
+            return self._json({'response': {
+                'supportLevel': account.support_level}})
+
+        self._json({'message': 'not found'}, status=404)
+
+    def _sso(self, account):
+        data = self._data() or {}
+        operation = data.get('operation')
+        content = data.get('contentString')
+        content = json.loads(content) if content else {}
+
+        if operation == 'ListDirectoryAssociations':
+            return self._json({'associations': list(account.sso_associations)})
+
+        if operation == 'AssociateDirectory':
+            account.sso_associations.append(content)
+            return self._json({})
+
+        if operation == 'DisassociateDirectory':
+            account.sso_associations = [
+                a for a in account.sso_associations
+                if a.get('directoryId') != content.get('directoryId')
+            ]
+            return self._json({})
+
+        if operation == 'createSyncProfile':
+            account.sso_profiles[content.get('SyncProfileName')] = content
+            return self._json(content)
+
+        name = data.get('path', '').split('/')[3:4]
+        if operation in ('getSyncProfile', 'deleteSyncProfile'):
+            profile = account.sso_profiles.get(name[0] if name else None)
+            if profile is None:
+                return self._json({'message': 'not found'}, status=404)
+            if operation == 'deleteSyncProfile':
+                del account.sso_profiles[name[0]]
+            return self._json(profile)
+
+        self._json({})
@@ -0,0 +1,67 @@
+from urllib.parse import urlsplit, urlunsplit
+from requests.adapters import HTTPAdapter
+
+
+class _LocalAdapter(HTTPAdapter):
+    def __init__(self, transport, **kwargs):
+        super().__init__(**kwargs)
+        self.transport = transport
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+
+        local = request.copy()
+        local.url = urlunsplit(
+            (self.transport.scheme, self.transport.netloc) + parts[2:])
+        local.headers['Host'] = parts.netloc
+
+        if self.transport.verify is not None:
+            kwargs['verify'] = self.transport.verify
+
+        r = super().send(local, **kwargs)
+
+        # let the session handle cookies and redirects for the real URL
+        r.request = request
+        r.url = request.url
+        return r
+
+
+class LocalTransport:
+    """
+    Sends all requests of a session to a local server, e.g.,
+    :py:class:`coto.testing.FakeConsole`, instead of AWS.
+
+    The server receives the requested host in the ``Host`` header, the
+    session sees the responses as coming from AWS.
+    """
+
+    def __init__(self, url, verify=None, pool_maxsize=10):
+        """
+        Args:
+            url (str): Base URL of the local server, e.g.,
+                ``http://127.0.0.1:8080``.
+            verify (str | bool): Certificate checking for ``https`` servers,
+                overrides the ``verify`` setting of the session. ``None`` to
+                use the setting of the session.
+            pool_maxsize (int): Maximum number of connections kept open to
+                the server. Set to the number of threads making requests.
+        """
+        parts = urlsplit(url)
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.verify = verify
+        self.adapter = _LocalAdapter(
+            self, pool_connections=1, pool_maxsize=pool_maxsize)
+
+    def mount(self, session):
+        """
+        Let a session send its requests to the local server.
+
+        Args:
+            session (requests.Session): The session.
+        """
+        session.mount('https://', self.adapter)
+        session.mount('http://', self.adapter)
+
+    def close(self):
+        self.adapter.close()
@@ -35,6 +35,14 @@ setup(
         'urllib3==1.26.3',
         'Pillow==8.4.0',
     ],
+    extras_require = {
+        'async': [
+            'aiohttp==3.8.1',
+        ],
+        'lxml': [
+            'lxml==4.9.1',
+        ],
+    },
     classifiers=[
         # How mature is this project? Common values are
         #   3 - Alpha
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import unittest
+from tests import mock, BaseTestCase
+import coto
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def response(url, text='', status_code=200, headers=None):
+    r = mock.Mock()
+    r.url = url
+    r.text = text
+    r.content = text.encode()
+    r.status_code = status_code
+    r.headers = headers or {}
+    r.cookies = {}
+    return r
+
+
+HOME = 'https://console.aws.amazon.com/iam/home'
+XSRF_PAGE = '<html><head><meta id="xsrf-token" data-token="token"></head></html>'
+
+
+def session_with(*responses):
+    session = coto.AsyncSession()
+    session.authenticated = True
+    session._request = mock.AsyncMock(side_effect=list(responses))
+    return session
+
+
+class TestAsyncClients(BaseTestCase):
+
+    def test_iam_get_account_info(self):
+        session = session_with(
+            response(HOME, XSRF_PAGE),
+            response(HOME, XSRF_PAGE),
+            response(HOME + '/service/account', '{"aliases": []}',
+                     headers={'X-CSRF-Token': 'refreshed'}),
+        )
+        iam = session.client('iam')
+
+        self.assertEqual(
+            {'aliases': []}, asyncio.run(iam.get_account_info()))
+
+        method, url = session._request.call_args.args[:2]
+        self.assertEqual('GET', method)
+        self.assertEqual(
+            'https://console.aws.amazon.com/iam/service/account', url)
+        self.assertEqual(
+            {'X-CSRF-Token': 'token'},
+            session._request.call_args.kwargs['headers'])
+        self.assertEqual({'xsrf_token': 'refreshed'}, iam._dump_tokens())
+
+    def test_iam_failure_raises_with_response(self):
+        session = session_with(response(
+            HOME + '/service/account', 'denied', status_code=400))
+        session.client('iam')._load_tokens({'xsrf_token': 'token'})
+
+        with self.assertRaisesRegex(Exception, 'failed get .*: denied'):
+            asyncio.run(session.client('iam').get_account_info())
+
+    def test_iam_awaits_mfa_codes(self):
+        session = session_with(response(HOME + '/service/mfa', '{}'))
+        session.client('iam')._load_tokens({'xsrf_token': 'token'})
+        session._mfa_codes = mock.AsyncMock(return_value=['123456', '654321'])
+
+        asyncio.run(session.client('iam').enable_root_mfa_device(
+            SerialNumber='arn', Base32StringSeed='seed'))
+
+        session._mfa_codes.assert_awaited_once_with('seed', 2)
+        data = json.loads(session._request.call_args.kwargs['data'])
+        self.assertEqual('123456', data['authenticationCode1'])
+        self.assertEqual('654321', data['authenticationCode2'])
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def test_reauthenticate_on_expiry(self):
+        session = session_with(
+            coto.exceptions.SessionExpiredException('expired'),
+            response(HOME, XSRF_PAGE),
+            response(HOME, XSRF_PAGE),
+            response(HOME + '/service/account', '{"aliases": []}'),
+        )
+        session.client('iam')._load_tokens({'xsrf_token': 'stale'})
+        session._signin_kwargs = {'email': 'e', 'password': 'p'}
+
+        async def signin(**kwargs):
+            session.authenticated = True
+
+        session.signin = signin
+
+        self.assertEqual(
+            {'aliases': []},
+            asyncio.run(session.client('iam').get_account_info()))
+        self.assertEqual(
+            {'X-CSRF-Token': 'token'},
+            session._request.call_args.kwargs['headers'])
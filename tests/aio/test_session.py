@@ -0,0 +1,58 @@
+import asyncio
+import unittest
+from tests import mock, BaseTestCase
+import coto
+
+try:
+    from aiohttp import web
+except ImportError:
+    web = None
+
+
+class TestAsyncSession(BaseTestCase):
+
+    def test_plain(self):
+        session = coto.AsyncSession()
+
+        self.assertEqual(False, session.debug)
+        self.assertEqual(False, session.authenticated)
+
+    def test_client_requires_signin(self):
+        session = coto.AsyncSession()
+
+        with self.assertRaises(Exception):
+            session.client('iam')
+
+        self.assertIsInstance(
+            session.client('signin'), coto.clients.signin.Client)
+
+    @unittest.skipIf(web is None, 'aiohttp is not installed')
+    def test_request(self):
+        async def handler(request):
+            response = web.Response(
+                text=request.headers['User-Agent'],
+                content_type='text/plain')
+            response.set_cookie('XSRF-TOKEN', 'token')
+            return response
+
+        async def run():
+            app = web.Application()
+            app.router.add_get('/', handler)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, '127.0.0.1', 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+
+            try:
+                async with coto.AsyncSession() as session:
+                    return await session._get(
+                        'http://127.0.0.1:{0}/'.format(port))
+            finally:
+                await runner.cleanup()
+
+        r = asyncio.run(run())
+
+        self.assertEqual(200, r.status_code)
+        self.assertIn('Mozilla', r.text)
+        self.assertEqual('token', r.cookies['XSRF-TOKEN'])
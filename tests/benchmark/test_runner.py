@@ -0,0 +1,38 @@
+from tests import BaseTestCase
+from coto.benchmark import Benchmark, add_default_cases, compare
+from coto.benchmark.runner import _covered
+from coto.testing import Account, FakeConsole
+
+
+class TestBenchmark(BaseTestCase):
+
+    def test_run_and_compare(self):
+        with FakeConsole([Account('root@example.com', 'password')]) as console:
+            benchmark = Benchmark(iterations=2, warmup=0)
+            add_default_cases(benchmark, console.transport())
+            results = benchmark.run(['Session.signin', 'iam.Client._get_xsrf_token'])
+
+        self.assertEqual(
+            ['Session.signin', 'iam.Client._get_xsrf_token'],
+            list(results['cases']))
+        signin = results['cases']['Session.signin']
+        self.assertIn('signin_aws.authenticateRoot', signin['operations'])
+        self.assertEqual(
+            {'tokens', 'account_type', 'mfa_status', 'authenticate', 'total'},
+            set(signin['phases']))
+        self.assertEqual(
+            {}, results['cases']['iam.Client._get_xsrf_token']['phases'])
+        self.assertGreaterEqual(signin['overhead']['min'], 0)
+        self.assertLess(signin['overhead']['median'], signin['wall']['median'])
+        self.assertGreater(signin['allocations']['peak_bytes'], 0)
+
+        slower = {'cases': {'Session.signin': dict(
+            signin, wall=dict(signin['wall'], median=signin['wall']['median'] * 2))}}
+        regressions = [
+            c['metric'] for c in compare(results, slower) if c['regression']]
+        self.assertEqual(['wall.median'], regressions)
+
+    def test_concurrent_requests_count_once(self):
+        self.assertEqual(0, _covered([]))
+        self.assertEqual(3, _covered([(0, 2), (1, 3), (1.5, 2.5)]))
+        self.assertEqual(2, _covered([(4, 5), (0, 1)]))
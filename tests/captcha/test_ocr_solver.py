@@ -0,0 +1,114 @@
+from tests import mock, BaseTestCase
+import os
+import tempfile
+import threading
+from io import BytesIO
+from PIL import Image, ImageDraw, ImageFont
+from coto.captcha import Solver
+from coto.captcha.ocr_solver import OCRSolver
+
+
+def captcha(text):
+    image = Image.new('1', (20 + 14 * len(text), 30), 1)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+    for i, char in enumerate(text):
+        draw.text((10 + 14 * i, 8), char, fill=0, font=font)
+
+    image = image.resize((image.width * 3, image.height * 3), Image.NEAREST)
+    buffered = BytesIO()
+    image.save(buffered, format='png')
+    return buffered.getvalue()
+
+
+class Human(Solver):
+    poll = False
+
+    def __init__(self, answer):
+        super().__init__()
+        self.answer = answer
+        self.wrong = []
+
+    def solve(self, image=None, url=None, base64=None):
+        self.complete('job', self.answer)
+        return 'job'
+
+    def incorrect(self, job_id):
+        self.wrong.append(job_id)
+
+
+class TestOCRSolver(BaseTestCase):
+
+    def trained(self, **kwargs):
+        solver = OCRSolver(**kwargs)
+        for text in ['abcdef', 'ghijkl', 'mnopqr', 'stuvwx', 'yz0123', '456789']:
+            self.assertEqual(6, len(solver.train(captcha(text), text)))
+        return solver
+
+    def test_recognize(self):
+        solver = self.trained()
+        self.assertEqual(
+            [('coto42', 1.0), ('zebra9', 1.0)],
+            solver.recognize([captcha('coto42'), captcha('zebra9')]))
+
+    def test_solve(self):
+        solver = self.trained()
+        future = solver.submit(image=captcha('coto42'))
+        self.assertEqual('coto42', future.result(timeout=5))
+        self.assertEqual(1.0, solver.confidence(future.job_id))
+
+    def test_fallback_and_learn(self):
+        fallback = Human('coto')
+        solver = OCRSolver(fallback=fallback, learn=True)
+
+        future = solver.submit(image=captcha('coto'))
+        self.assertEqual('coto', future.result(timeout=5))
+        self.assertEqual(0.0, solver.confidence(future.job_id))
+        self.assertEqual({'c', 'o', 't'}, set(solver.templates))
+
+        # learned from the fallback
+        future = solver.submit(image=captcha('otto'))
+        self.assertEqual('otto', future.result(timeout=5))
+
+        solver.incorrect(future.job_id)
+        self.assertEqual([], fallback.wrong)
+
+    def test_incorrect_fallback(self):
+        fallback = Human('cot')
+        solver = OCRSolver(fallback=fallback, learn=True)
+
+        future = solver.submit(image=captcha('coto'))
+        self.assertEqual('cot', future.result(timeout=5))
+
+        solver.incorrect(future.job_id)
+        self.assertEqual(['job'], fallback.wrong)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'templates.json')
+            self.trained(templates=path).save()
+
+            solver = OCRSolver(templates=path)
+            self.assertEqual(
+                [('coto42', 1.0)], solver.recognize([captcha('coto42')]))
+
+    def test_queued_jobs_are_not_evicted(self):
+        solver = OCRSolver()
+        started = threading.Event()
+
+        def blocked(images):
+            started.wait()
+            return [('coto42', 1.0)] * len(images)
+
+        solver.recognize = blocked
+        image = captcha('coto42')
+        futures = [solver.submit(image=image) for _ in range(1100)]
+
+        # more jobs queued than remembered, all still get an answer
+        started.set()
+        for future in futures:
+            self.assertEqual('coto42', future.result(timeout=10))
+
+        # finished jobs are forgotten
+        solver.submit(image=image).result(timeout=5)
+        self.assertEqual(1000, len(solver._jobs))
@@ -0,0 +1,97 @@
+from tests import mock, BaseTestCase
+import threading
+import time
+from coto.captcha import Solver
+from coto.captcha.racing_solver import RacingSolver
+
+
+class Backend(Solver):
+    poll = False
+
+    def __init__(self, guess, delay=0, error=None):
+        super().__init__()
+        self.guess = guess
+        self.delay = delay
+        self.error = error
+        self.jobs = 0
+        self.cancelled = []
+        self.wrong = []
+
+    def solve(self, image=None, url=None, base64=None):
+        self.jobs += 1
+        job_id = 'job{0}'.format(self.jobs)
+        if self.error is not None:
+            threading.Timer(
+                self.delay, self.fail, (job_id, self.error)).start()
+        else:
+            threading.Timer(
+                self.delay, self.complete, (job_id, self.guess)).start()
+        return job_id
+
+    def cancel(self, job_id):
+        self.cancelled.append(job_id)
+
+    def incorrect(self, job_id):
+        self.wrong.append(job_id)
+
+
+class TestRacingSolver(BaseTestCase):
+
+    def test_first_answer_wins(self):
+        fast, slow = Backend('fast', 0.01), Backend('slow', 0.5)
+        solver = RacingSolver([slow, fast])
+
+        future = solver.submit(image=b'captcha')
+        self.assertEqual('fast', future.result(timeout=2))
+        time.sleep(0.05)
+        self.assertEqual(['job1'], slow.cancelled)
+
+        solver.incorrect(future.job_id)
+        self.assertEqual(['job1'], fast.wrong)
+
+        stats = solver.stats()
+        self.assertEqual(0, stats[0]['wins'])
+        self.assertEqual(1, stats[0]['unanswered'])
+        self.assertIsNone(stats[0]['latency'])
+        self.assertEqual(1, stats[1]['wins'])
+        self.assertEqual(1, stats[1]['incorrect'])
+
+    def test_ranking(self):
+        fast, slow = Backend('fast', 0.01), Backend('slow', 0.2)
+        solver = RacingSolver([slow, fast], fanout=1, hedge=0.1)
+
+        # the fast solver joins late and still wins
+        self.assertEqual('fast', solver.submit(image=b'a').result(timeout=2))
+        self.assertEqual([1, 0], solver.ranking())
+
+        # then races first and answers before the slow one is started
+        self.assertEqual('fast', solver.submit(image=b'b').result(timeout=2))
+        time.sleep(0.15)
+        self.assertEqual(1, slow.jobs)
+
+    def test_failures(self):
+        broken = Backend(None, error=Exception('unavailable'))
+        solver = RacingSolver([broken, Backend('guess', 0.05)])
+        self.assertEqual('guess', solver.submit(image=b'a').result(timeout=2))
+
+        solver = RacingSolver([broken])
+        with self.assertRaises(Exception):
+            solver.submit(image=b'a').result(timeout=2)
+        self.assertEqual(1, solver.stats()[0]['failures'])
+
+    def test_losers_rank_after_winners(self):
+        slow, fast = Backend('slow', 0.3), Backend('fast', 0.1)
+        solver = RacingSolver([slow, fast])
+
+        for captcha in (b'a', b'b', b'c'):
+            future = solver.submit(image=captcha)
+            self.assertEqual('fast', future.result(timeout=2))
+            if captcha != b'a':
+                solver.incorrect(future.job_id)
+        time.sleep(0.05)
+
+        # the slow solver lost while still solving: it is not ranked first
+        # for seeming as fast as the winner and never guessing wrong
+        self.assertEqual(3, solver.stats()[0]['unanswered'])
+        self.assertIsNone(solver.stats()[0]['latency'])
+        self.assertEqual([1, 0], solver.ranking())
@@ -0,0 +1,76 @@
+from tests import mock, BaseTestCase
+import threading
+import time
+from coto.captcha import Solver, submit
+
+
+class PollingSolver(Solver):
+
+    def __init__(self, ready_after, **kwargs):
+        super().__init__(interval=0.01, max_interval=0.05, **kwargs)
+        self.ready_after = ready_after
+        self.polls = 0
+
+    def solve(self, base64=None, url=None):
+        self.started = time.monotonic()
+        return 'job'
+
+    def result(self, job_id):
+        self.polls += 1
+        if time.monotonic() - self.started >= self.ready_after:
+            return 'guess'
+
+
+class PushSolver(Solver):
+    poll = False
+
+    def solve(self, base64=None, url=None):
+        threading.Timer(0.01, self.complete, ('job', 'pushed')).start()
+        return 'job'
+
+
+class TestSolver(BaseTestCase):
+
+    def test_polling(self):
+        solver = PollingSolver(0.1)
+        start = time.monotonic()
+        future = solver.submit(url='https://example.com/captcha.jpg')
+
+        self.assertEqual('job', future.job_id)
+        self.assertEqual('guess', future.result(timeout=1))
+        self.assertLess(time.monotonic() - start, 1)
+        # polls back off instead of running at the initial interval
+        self.assertLess(solver.polls, 10)
+
+    def test_timeout(self):
+        future = PollingSolver(60, timeout=0.05).submit(url='url')
+        with self.assertRaises(TimeoutError):
+            future.result(timeout=1)
+
+    def test_push_and_callback(self):
+        done = []
+        future = PushSolver().submit(url='url', callback=done.append)
+        self.assertEqual('pushed', future.result(timeout=1))
+        self.assertEqual([future], done)
+
+    def test_many_pending(self):
+        solvers = [PollingSolver(0.05) for _ in range(50)]
+        futures = [s.submit(url='url') for s in solvers]
+        self.assertEqual(
+            ['guess'] * 50, [f.result(timeout=2) for f in futures])
+
+    def test_submit_plain_solver(self):
+        solver = mock.Mock(spec=['solve', 'result', 'incorrect'])
+        solver.solve.return_value = 'job'
+        solver.result.side_effect = [None, 'guess']
+
+        future = submit(solver, url='url')
+        self.assertEqual('guess', future.result(timeout=2))
+        solver.solve.assert_called_once_with(url='url')
+
+    def test_submit_plain_solver_image(self):
+        solver = mock.Mock(spec=['solve', 'result', 'incorrect'])
+        solver.result.return_value = 'guess'
+
+        submit(solver, image=b'\x89PNG').result(timeout=1)
+        solver.solve.assert_called_once_with(base64='iVBORw==')
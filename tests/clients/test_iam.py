@@ -0,0 +1,53 @@
+from tests import mock, BaseTestCase
+import coto
+
+
+def response(url, text='', status_code=200, content_type='application/json'):
+    r = mock.Mock()
+    r.url = url
+    r.text = text
+    r.status_code = status_code
+    r.headers = {'Content-Type': content_type}
+    return r
+
+
+XSRF_PAGE = '<html><head><meta id="xsrf-token" data-token="token"></head></html>'
+
+
+class TestIam(BaseTestCase):
+
+    def test_reauthenticate_on_expiry(self):
+        session = coto.Session()
+        session.authenticated = True
+        session._signin_kwargs = {'email': 'e', 'password': 'p'}
+
+        def signin(**kwargs):
+            session.authenticated = True
+
+        session.signin = signin
+
+        home = 'https://console.aws.amazon.com/iam/home'
+        session.session.request = mock.Mock(side_effect=[
+            response(home, XSRF_PAGE, content_type='text/html'),
+            response(home, XSRF_PAGE, content_type='text/html'),
+            response('https://signin.aws.amazon.com/signin', 'login',
+                     content_type='text/html'),
+            response(home, XSRF_PAGE, content_type='text/html'),
+            response(home, XSRF_PAGE, content_type='text/html'),
+            response('https://console.aws.amazon.com/iam/service/account',
+                     '{"aliases": []}'),
+        ])
+
+        self.assertEqual(
+            {'aliases': []}, session.client('iam').get_account_info())
+
+    def test_expired_without_signin_arguments(self):
+        session = coto.Session()
+        session.authenticated = True
+        session.client('iam')._load_tokens({'xsrf_token': 'token'})
+        session.session.request = mock.Mock(return_value=response(
+            'https://console.aws.amazon.com/iam/service/account',
+            status_code=401))
+
+        with self.assertRaises(coto.exceptions.SessionExpiredException):
+            session.client('iam').get_account_info()
@@ -0,0 +1,146 @@
+from tests import mock, BaseTestCase
+from urllib.parse import parse_qs
+import pyotp
+import coto
+from coto.clients.signin_aws.exceptions import AccountTypeMismatchException
+from coto.clients.signin_amazon import flow
+from coto.metadata1.static_generator import StaticGenerator
+
+
+def response(url, text=''):
+    r = mock.Mock()
+    r.url = url
+    r.text = text
+    r.content = text.encode()
+    r.request.body = None
+    r.status_code = 200
+    r.headers = {'Content-Type': 'text/html'}
+    return r
+
+
+def form(*fields, form_id='ap_signin_form'):
+    inputs = ''.join(
+        '<input type="hidden" name="{0}" value="value">'.format(f)
+        if f != 'password' else '<input type="password" name="password">'
+        for f in fields)
+    return (
+        '<html><body><div id="ap_captcha_img"><img src="https://images/c.jpg">'
+        '</div><form id="{0}" action="https://www.amazon.com/ap/signin">'
+        '{1}<input type="submit"></form>'
+        '<div id="message_error">not read</div></body></html>'
+    ).format(form_id, inputs)
+
+
+SIGNIN = 'https://www.amazon.com/ap/signin'
+HOME = 'https://console.aws.amazon.com/console/home?region=us-east-1'
+
+
+class Solver:
+
+    def solve(self, url):
+        return 'job'
+
+    def result(self, job_id):
+        return 'coto'
+
+
+class TestFlow(BaseTestCase):
+
+    def test_classify(self):
+        self.assertEqual(
+            flow.PASSWORD,
+            flow.classify(SIGNIN, form('appActionToken', 'password')).kind)
+        self.assertEqual(
+            flow.TOTP, flow.classify(SIGNIN, form('tokenCode')).kind)
+        self.assertEqual(flow.DONE, flow.classify(HOME, '').kind)
+
+        page = flow.classify(SIGNIN, form('password', 'guess'))
+        self.assertEqual(flow.CAPTCHA, page.kind)
+        self.assertEqual('https://images/c.jpg', page.captcha_url)
+        self.assertEqual({'guess': 'value', 'password': None}, page.fields)
+
+    def test_errors(self):
+        page = flow.classify(SIGNIN, (
+            '<div id="message_error"><h4>There was a problem</h4><br>'
+            '<ul><li>Your password is incorrect</li></ul></div>'
+            + form('password')))
+        self.assertEqual(flow.ERROR, page.kind)
+        self.assertEqual(
+            'There was a problem Your password is incorrect', page.error)
+
+        page = flow.classify(SIGNIN, form('otpCode', form_id='auth-mfa-form'))
+        self.assertEqual(flow.ERROR, page.kind)
+        self.assertEqual(flow.ERROR, flow.classify(SIGNIN, '<html>').kind)
+
+        page = flow.classify(SIGNIN, (
+            '<div id="message_error"><h4>There was a problem</h4>'
+            '<p>We cannot find an account with that email address</p></div>'
+            + form('email')))
+        self.assertEqual(flow.UNKNOWN_ACCOUNT, page.kind)
+
+
+class TestSigninAmazon(BaseTestCase):
+
+    def session(self, pages):
+        session = coto.Session(
+            metadata1_generator=StaticGenerator('metadata1'),
+            captcha_solver=Solver())
+        session.session.request = mock.Mock(side_effect=[
+            response(url, text) for url, text in pages])
+        return session
+
+    def test_signin(self):
+        secret = pyotp.random_base32()
+        session = self.session([
+            (SIGNIN, form('email', 'password')),
+            (SIGNIN, form('password', 'guess')),
+            (SIGNIN, form('tokenCode')),
+            (HOME, ''),
+        ])
+        client = session.client('signin_amazon')
+
+        self.assertTrue(client.signin('root@example.com', 'pw', secret))
+        self.assertTrue(session.authenticated)
+        self.assertEqual(
+            ['signin', 'password', 'captcha', 'totp'],
+            [step['page'] for step in client.steps])
+
+        posts = [
+            c.kwargs['data'] for c in session.session.request.call_args_list
+            if c.args[0] == 'POST']
+        self.assertEqual(
+            {'metadata1': 'metadata1', 'email': 'value', 'password': 'pw'},
+            posts[0])
+        self.assertEqual('coto', posts[1]['guess'])
+        self.assertTrue(pyotp.TOTP(secret).verify(posts[2]['tokenCode']))
+
+    def test_step_budget(self):
+        session = self.session([(SIGNIN, form('password'))] * 4)
+        client = session.client('signin_amazon')
+
+        self.assertFalse(client.signin('root@example.com', 'pw', max_steps=3))
+        self.assertEqual(4, len(client.steps))
+        self.assertFalse(session.authenticated)
+
+    def test_error(self):
+        session = self.session([
+            (SIGNIN, form('password')),
+            (SIGNIN, '<div id="message_error">Wrong password</div>'),
+        ])
+        with self.assertRaisesRegex(Exception, 'Wrong password'):
+            session.client('signin_amazon').signin('root@example.com', 'pw')
+
+    def test_unknown_account(self):
+        session = self.session([(SIGNIN, (
+            '<div id="message_error">We cannot find an account with that '
+            'email address</div>'))])
+        with self.assertRaises(AccountTypeMismatchException):
+            session.client('signin_amazon').signin('root@example.com', 'pw')
+
+    def test_first_page_error(self):
+        # other errors are not blamed on the account type
+        session = self.session([(SIGNIN, (
+            '<div id="message_error">Too many requests</div>'))])
+        with self.assertRaisesRegex(Exception, 'Too many requests') as cm:
+            session.client('signin_amazon').signin('root@example.com', 'pw')
+        self.assertNotIsInstance(cm.exception, AccountTypeMismatchException)
@@ -0,0 +1,22 @@
+import os
+from tests import mock, BaseTestCase
+import coto
+
+
+class TestSso(BaseTestCase):
+
+    def session(self):
+        session = coto.Session()
+        session.authenticated = True
+        return session
+
+    def test_region_from_environment(self):
+        with mock.patch.dict(os.environ, {'AWS_DEFAULT_REGION': 'eu-west-1'}):
+            self.assertEqual(
+                'eu-west-1', self.session().client('sso').region)
+
+    def test_region_required(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop('AWS_DEFAULT_REGION', None)
+            with self.assertRaisesRegex(Exception, 'AWS_DEFAULT_REGION'):
+                self.session().client('sso')
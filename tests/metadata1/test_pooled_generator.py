@@ -0,0 +1,61 @@
+from tests import mock, BaseTestCase
+import itertools
+import threading
+import time
+from coto.metadata1.pooled_generator import PooledGenerator
+
+
+class SlowGenerator:
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def generate(self):
+        time.sleep(self.delay)
+        with self.lock:
+            return 'metadata1-{0}'.format(next(self.counter))
+
+
+class TestPooledGenerator(BaseTestCase):
+
+    def wait_ready(self, generator, count):
+        deadline = time.monotonic() + 2
+        while generator.ready() < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def test_precomputed(self):
+        generator = PooledGenerator(
+            SlowGenerator(0.02), size=4, low_water=2, workers=4)
+        self.addCleanup(generator.close)
+        self.wait_ready(generator, 4)
+
+        start = time.monotonic()
+        values = [generator.generate() for _ in range(3)]
+        self.assertLess(time.monotonic() - start, 0.02)
+        self.assertEqual(3, len(set(values)))
+
+        # refilled once below the low water mark
+        self.wait_ready(generator, 4)
+        self.assertEqual(4, generator.ready())
+
+    def test_empty_pool(self):
+        slow = SlowGenerator(0)
+        executor = mock.Mock()
+        generator = PooledGenerator(slow, size=2, low_water=1, executor=executor)
+
+        self.assertEqual('metadata1-0', generator.generate())
+        self.assertEqual(2, executor.submit.call_count)
+        generator.close()
+        executor.shutdown.assert_not_called()
+
+    def test_max_age(self):
+        generator = PooledGenerator(
+            SlowGenerator(0), size=2, low_water=1, max_age=0.05)
+        self.addCleanup(generator.close)
+        self.wait_ready(generator, 2)
+
+        time.sleep(0.1)
+        self.assertNotIn(
+            generator.generate(), ('metadata1-0', 'metadata1-1'))
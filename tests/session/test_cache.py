@@ -0,0 +1,31 @@
+from tests import BaseTestCase
+import os
+import tempfile
+from coto.session.cache import AccountCache
+
+
+class TestAccountCache(BaseTestCase):
+
+    def test_set_and_get(self):
+        cache = AccountCache()
+        self.assertIsNone(cache.get('root@example.com'))
+
+        cache.set('root@example.com', account_type='Decoupled')
+        cache.set('ROOT@example.com', mfa_required=True)
+        self.assertEqual(
+            {'account_type': 'Decoupled', 'mfa_required': True},
+            cache.get('root@example.com'))
+
+        cache.invalidate('root@example.com')
+        self.assertIsNone(cache.get('root@example.com'))
+
+    def test_emails_stored_hashed(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'coto', 'accounts.json')
+            AccountCache(path).set('root@example.com', account_type='Coupled')
+
+            with open(path) as f:
+                self.assertNotIn('root@example.com', f.read())
+            self.assertEqual(
+                {'account_type': 'Coupled'},
+                AccountCache(path).get('root@example.com'))
@@ -0,0 +1,80 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from tests import BaseTestCase
+import coto
+
+
+PAGE = b'<html><head><meta name="csrf_token" content="abc123"></head></html>'
+
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path == '/redirect':
+            self.send_response(302)
+            self.send_header('Location', '/page?session_id=abc123')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Set-Cookie', 'aws-userInfo=abc123; Path=/')
+        self.send_header('Content-Length', str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = b'{"state": "SUCCESS", "properties": {"sessionId": "abc123"}}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCassette(BaseTestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{0}'.format(self.server.server_port)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_record_and_replay(self):
+        cassette = coto.Cassette()
+        session = coto.Session(
+            transport=coto.RecordingTransport(cassette, secrets=['s3cr3t']))
+        session._get(self.url + '/redirect')
+        session._post(
+            self.url + '/signin',
+            data={'email': 'email@example.com', 'password': 's3cr3t',
+                  'mfaType': 'SW', 'mfa1': '123456'})
+
+        self.assertEqual(3, len(cassette))
+        recorded = str(cassette.interactions)
+        self.assertNotIn('abc123', recorded)
+        self.assertNotIn('s3cr3t', recorded)
+        self.assertNotIn('123456', recorded)
+        self.assertIn('mfaType=SW', recorded)
+
+        self.server.shutdown()
+
+        session = coto.Session(transport=coto.ReplayTransport(cassette))
+        r = session._get(self.url + '/redirect')
+        self.assertEqual(200, r.status_code)
+        self.assertIn(b'content="REDACTED"', r.content)
+        self.assertEqual('REDACTED', session.session.cookies['aws-userInfo'])
+
+        r = session._post(self.url + '/signin', data={'password': 'other'})
+        self.assertEqual('SUCCESS', r.json()['state'])
+
+        with self.assertRaises(Exception):
+            session._get(self.url + '/page')
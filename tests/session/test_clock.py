@@ -0,0 +1,46 @@
+from tests import mock, BaseTestCase
+from email.utils import formatdate
+from pyotp import TOTP
+from coto.session.clock import ServerClock
+
+
+SECRET = 'JBSWY3DPEHPK3PXP'
+
+
+class TestServerClock(BaseTestCase):
+
+    def observe(self, clock, now, skew, rtt=0.1):
+        clock.observe(
+            formatdate(now + skew + rtt / 2, usegmt=True), now, now + rtt)
+
+    def test_offset(self):
+        clock = ServerClock()
+        self.assertEqual(0, clock.offset)
+
+        for i in range(20):
+            self.observe(clock, 1000000 + i * 1.37, 90)
+        self.assertAlmostEqual(90, clock.offset, delta=0.5)
+        self.assertAlmostEqual(0.1, clock.rtt)
+
+        # stale responses of a cache do not move the estimate back
+        clock.observe(formatdate(1000000 - 600, usegmt=True), 1000030, 1000030.1)
+        self.assertAlmostEqual(90, clock.offset, delta=0.5)
+
+    def test_codes(self):
+        clock = ServerClock()
+        for i in range(20):
+            self.observe(clock, 1000000 + i * 1.37, 90)
+
+        with mock.patch('time.time', return_value=1000000):
+            codes = clock.codes(SECRET, 2)
+        totp = TOTP(SECRET)
+        self.assertEqual(
+            [totp.at(1000090 - 30), totp.at(1000090)], codes)
+
+    def test_wait(self):
+        clock = ServerClock(margin=1)
+        # the server period starts at 1000020
+        with mock.patch('time.time', return_value=1000020 - 0.5):
+            self.assertAlmostEqual(0.5, clock.wait())
+        with mock.patch('time.time', return_value=1000020 - 5):
+            self.assertEqual(0, clock.wait())
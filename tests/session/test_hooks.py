@@ -0,0 +1,40 @@
+from tests import mock, BaseTestCase
+import coto
+
+
+@mock.patch('time.sleep')
+class TestHooks(BaseTestCase):
+
+    def test_events(self, sleep):
+        session = coto.Session()
+        events = []
+        for name in ['on_request', 'on_response', 'on_retry']:
+            session.hooks.register(name, events.append)
+
+        responses = []
+        for status in [503, 200]:
+            r = mock.Mock(status_code=status, content=b'{}', headers={})
+            r.request.body = 'action=resolveAccountType'
+            responses.append(r)
+        session.session.request = mock.Mock(side_effect=responses)
+
+        session._post(
+            'https://signin.aws.amazon.com/signin',
+            operation='signin_aws.resolveAccountType', idempotent=True)
+
+        self.assertEqual(
+            ['on_request', 'on_response', 'on_retry',
+             'on_request', 'on_response'],
+            [e.name for e in events])
+        response = events[-1]
+        self.assertEqual('signin.aws.amazon.com', response.host)
+        self.assertEqual('signin_aws.resolveAccountType', response.operation)
+        self.assertEqual(200, response.status)
+        self.assertEqual(2, response.attempt)
+        self.assertEqual(25, response.request_bytes)
+        self.assertEqual(2, response.response_bytes)
+        self.assertIsNotNone(response.elapsed)
+
+    def test_unknown_event(self, sleep):
+        with self.assertRaises(Exception):
+            coto.Session().hooks.register('on_signin', print)
@@ -0,0 +1,65 @@
+from tests import mock, BaseTestCase
+import coto
+
+
+class TestMetrics(BaseTestCase):
+
+    def test_collect(self):
+        metrics = coto.Metrics(buckets=(0.1, 1.0))
+        session = coto.Session(metrics=metrics)
+
+        r = mock.Mock(status_code=200, content=b'{"a": 1}', headers={})
+        r.request.body = 'action=getAuthState'
+        session.session.request = mock.Mock(return_value=r)
+        for _ in range(2):
+            session._post(
+                'https://signin.aws.amazon.com/updateaccount',
+                operation='account.getAuthState')
+
+        r = mock.Mock(status_code=404, content=b'', headers={})
+        r.request.body = None
+        session.session.request = mock.Mock(return_value=r)
+        session._get('https://console.aws.amazon.com/missing')
+
+        snapshot = metrics.snapshot()
+        stats = snapshot['account.getAuthState']
+        self.assertEqual('account', stats['client'])
+        self.assertEqual(2, stats['requests'])
+        self.assertEqual(0, stats['errors'])
+        self.assertEqual(38, stats['request_bytes'])
+        self.assertEqual(16, stats['response_bytes'])
+        self.assertEqual(2, stats['latency']['count'])
+        self.assertEqual(2, stats['latency']['buckets'][float('inf')])
+        self.assertEqual(1, snapshot['console.aws.amazon.com']['errors'])
+
+        text = metrics.prometheus()
+        self.assertIn(
+            'coto_requests_total{client="account",operation="account.getAuthState"} 2',
+            text)
+        self.assertIn(
+            'coto_request_duration_seconds_bucket{client="account",operation="account.getAuthState",le="+Inf"} 2',
+            text)
+        self.assertIn(
+            'coto_errors_total{client="",operation="console.aws.amazon.com"} 1',
+            text)
+
+    def test_operation_names(self):
+        metrics = coto.Metrics()
+        session = coto.Session(metrics=metrics)
+        session.authenticated = True
+        iam = session.client('iam')
+        iam._load_tokens({'xsrf_token': 'token'})
+
+        r = mock.Mock(
+            status_code=200, text='{"accessKeyMetadata": []}', headers={})
+        r.url = 'https://console.aws.amazon.com/iam/api/accesskeys'
+        r.content = r.text.encode()
+        r.request.body = None
+        session.session.request = mock.Mock(return_value=r)
+        iam.list_root_access_keys()
+
+        # named after the client method, not the requested path
+        self.assertEqual(['iam.list_root_access_keys'], list(metrics.snapshot()))
+        self.assertIn(
+            'coto_requests_total{client="iam",operation="iam.list_root_access_keys"} 1',
+            metrics.prometheus())
@@ -0,0 +1,47 @@
+from tests import mock, BaseTestCase
+import os
+import stat
+import tempfile
+from coto.session.persisted import PersistedMap, digest
+
+
+class TestPersistedMap(BaseTestCase):
+
+    def test_set_update_discard(self):
+        entries = PersistedMap()
+        self.assertIsNone(entries.get('a'))
+
+        entries.set('a', {'x': 1})
+        entries.update('a', lambda value: dict(value, y=2))
+        entries.update('b', lambda value: value or 'new')
+        self.assertEqual({'x': 1, 'y': 2}, entries.get('a'))
+        self.assertEqual(['a', 'b'], sorted(entries.keys()))
+
+        entries.discard('a', 'c')
+        self.assertIsNone(entries.get('a'))
+        self.assertEqual(['b'], entries.keys())
+
+    def test_ttl(self):
+        entries = PersistedMap(ttl=60)
+        with mock.patch('time.time', return_value=1000):
+            entries.set('a', 1)
+        with mock.patch('time.time', return_value=1061):
+            self.assertIsNone(entries.get('a'))
+            # expired values are replaced, not updated
+            entries.update('a', lambda value: (value or 0) + 1)
+            self.assertEqual(1, entries.get('a'))
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'coto', 'entries.json')
+            PersistedMap(path).set('a', {'x': 1})
+
+            self.assertEqual(0o600, stat.S_IMODE(os.stat(path).st_mode))
+            self.assertEqual([], [
+                name for name in os.listdir(os.path.dirname(path))
+                if name.endswith('.tmp')])
+            self.assertEqual({'x': 1}, PersistedMap(path).get('a'))
+
+    def test_digest(self):
+        self.assertEqual(64, len(digest('root@example.com')))
+        self.assertNotIn('root', digest('root@example.com'))
@@ -0,0 +1,43 @@
+from tests import mock, BaseTestCase
+import coto
+from coto.session.ratelimit import TokenBucket
+
+
+class TestRateLimiter(BaseTestCase):
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(rate=10, burst=2)
+
+        self.assertEqual(0, bucket.reserve())
+        self.assertEqual(0, bucket.reserve())
+        self.assertAlmostEqual(0.1, bucket.reserve(), places=2)
+        self.assertAlmostEqual(0.2, bucket.reserve(), places=2)
+
+    def test_operation_limit(self):
+        limiter = coto.RateLimiter()
+        self.assertFalse(limiter)
+
+        limiter.set_limit(
+            'signin.aws.amazon.com', rate=1,
+            operation='signin_aws.resolveAccountType')
+
+        self.assertEqual(0, limiter.reserve('signin.aws.amazon.com'))
+        self.assertEqual(0, limiter.reserve(
+            'signin.aws.amazon.com', 'signin_aws.resolveAccountType'))
+        self.assertGreater(limiter.reserve(
+            'signin.aws.amazon.com', 'signin_aws.resolveAccountType'), 0)
+        self.assertEqual(0, limiter.reserve(
+            'signin.aws.amazon.com', 'signin_aws.authenticateRoot'))
+
+    @mock.patch('time.sleep')
+    def test_session(self, sleep):
+        limiter = coto.RateLimiter()
+        limiter.set_limit('console.aws.amazon.com', rate=1)
+        session = coto.Session(rate_limiter=limiter)
+        response = mock.Mock(status_code=200, headers={})
+        session.session.request = mock.Mock(return_value=response)
+
+        session._get('https://console.aws.amazon.com/iam/home')
+        session._get('https://console.aws.amazon.com/iam/home')
+
+        self.assertEqual(1, sleep.call_count)
@@ -0,0 +1,61 @@
+import requests
+from tests import mock, BaseTestCase
+import coto
+
+
+def response(status_code, headers=None):
+    r = mock.Mock()
+    r.url = 'https://console.aws.amazon.com/iam/service/account'
+    r.status_code = status_code
+    r.text = ''
+    r.headers = headers or {}
+    return r
+
+
+@mock.patch('time.sleep')
+class TestRetry(BaseTestCase):
+
+    def test_retry_idempotent(self, sleep):
+        session = coto.Session()
+        session.session.request = mock.Mock(side_effect=[
+            response(503), requests.ConnectionError(), response(200)])
+
+        r = session._get('https://console.aws.amazon.com/iam/service/account')
+
+        self.assertEqual(200, r.status_code)
+        self.assertEqual(2, sleep.call_count)
+
+    def test_no_retry_unsafe(self, sleep):
+        session = coto.Session()
+        session.session.request = mock.Mock(return_value=response(503))
+
+        with self.assertRaises(coto.exceptions.ServerErrorException):
+            session._post('https://console.aws.amazon.com/iam/service/root/keys')
+        self.assertEqual(1, session.session.request.call_count)
+
+        session.session.request.reset_mock()
+        with self.assertRaises(coto.exceptions.ServerErrorException):
+            session._post(
+                'https://signin.aws.amazon.com/signin', idempotent=True)
+        self.assertEqual(3, session.session.request.call_count)
+
+    def test_override(self, sleep):
+        session = coto.Session(retry_policy=coto.RetryPolicy(overrides={
+            'iam.get_account_info': coto.RetryPolicy(max_attempts=5),
+        }))
+        session.session.request = mock.Mock(
+            return_value=response(429, {'Retry-After': '2'}))
+
+        with self.assertRaises(coto.exceptions.ThrottlingException):
+            session._get(
+                'https://console.aws.amazon.com/iam/service/account',
+                operation='iam.get_account_info')
+
+        self.assertEqual(5, session.session.request.call_count)
+        sleep.assert_called_with(2.0)
+
+    def test_delay(self, sleep):
+        policy = coto.RetryPolicy(backoff=1, max_backoff=3, jitter=False)
+
+        self.assertEqual([1, 2, 3], [policy.delay(i) for i in [1, 2, 3]])
+        self.assertLessEqual(coto.RetryPolicy(backoff=1).delay(1), 1)
@@ -1,3 +1,7 @@
+import os
+import subprocess
+import sys
+import tempfile
 from tests import mock, BaseTestCase
 import coto
 
@@ -7,3 +11,54 @@ class TestSession(BaseTestCase):
         session = coto.Session()
 
         self.assertEqual(False, session.debug)
+
+    def test_save_load(self):
+        session = coto.Session()
+        session.authenticated = True
+        session.root = True
+        session.session.cookies.set(
+            'aws-creds', 'secret', domain='.console.aws.amazon.com')
+        session.client('iam')._load_tokens({'xsrf_token': 'token'})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'session.json')
+            session.save(path)
+            self.assertEqual(0o600, os.stat(path).st_mode & 0o777)
+
+            loaded = coto.Session.load(path)
+            self.assertTrue(loaded.authenticated)
+            self.assertTrue(loaded.root)
+            self.assertEqual('secret', loaded.session.cookies['aws-creds'])
+            self.assertEqual(
+                'token', loaded._run(loaded.client('iam')._xsrf_token()))
+            self.assertEqual(session.identity, loaded.identity)
+
+            with self.assertRaises(coto.exceptions.SessionExpiredException):
+                coto.Session.load(path, max_age=-1)
+
+    def test_pooled_transport(self):
+        transport = coto.PooledTransport()
+        a = coto.Session(transport=transport)
+        b = coto.Session(transport=transport)
+        a.session.cookies.set('aws-creds', 'a')
+
+        self.assertIs(
+            a.session.get_adapter('https://console.aws.amazon.com/'),
+            b.session.get_adapter('https://signin.aws.amazon.com/'))
+        self.assertNotIn('aws-creds', b.session.cookies)
+
+    def test_lazy_clients(self):
+        code = (
+            "import sys, coto; "
+            "print(sorted(m for m in sys.modules if m.startswith(('bs4', 'aiohttp', 'asyncio', 'pyotp', 'coto.clients.')))); "
+            "coto.Session().client('signin_aws'); "
+            "print('coto.clients.signin_aws' in sys.modules, 'coto.clients.sso' in sys.modules)"
+        )
+        out = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True,
+            check=True).stdout
+
+        self.assertEqual("['coto.clients.steps']\nTrue False\n", out)
+
+        with self.assertRaises(Exception):
+            coto.Session().client('ec2')
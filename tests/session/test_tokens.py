@@ -0,0 +1,30 @@
+from tests import BaseTestCase
+from coto.session.tokens import TokenStore, identity
+
+
+class TestTokenStore(BaseTestCase):
+
+    def test_set_and_get(self):
+        store = TokenStore()
+        self.assertIsNone(store.get('id', 'iam'))
+
+        store.set('id', 'iam', {'xsrf_token': 'a'})
+        store.set('id', 'billing', {'xsrf_token': 'b'})
+        self.assertEqual({'xsrf_token': 'a'}, store.get('id', 'iam'))
+        self.assertIsNone(store.get('other', 'iam'))
+
+        store.invalidate('id', 'iam')
+        self.assertEqual(
+            {'billing': {'xsrf_token': 'b'}}, store.tokens('id'))
+        store.invalidate('id')
+        self.assertEqual({}, store.tokens('id'))
+
+    def test_identity(self):
+        self.assertEqual(
+            identity({'email': 'Root@example.com', 'password': 'a'}),
+            identity({'email': 'root@example.com', 'password': 'b'}))
+        self.assertNotIn('root', identity({'email': 'root@example.com'}))
+        self.assertIsNone(identity({}))
+        self.assertNotEqual(
+            identity({'email': 'root@example.com'}, 'console-session-1'),
+            identity({'email': 'root@example.com'}, 'console-session-2'))
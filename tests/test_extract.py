@@ -0,0 +1,72 @@
+import unittest
+from tests import BaseTestCase
+from coto import extract
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
+
+
+PAGE = """<!DOCTYPE html>
+<html><head>
+<meta charset="utf-8">
+<meta name="csrf_token" content="a&amp;b">
+<meta name="session_id" content="session">
+<meta id="xsrf-token" data-token="xsrf">
+</head><body>
+<meta name="in_body" content="body">
+<form id="other"><input name="x"></form>
+<form id="ap_signin_form" class="auth-validate-form a-spacing-none"
+      action="/ap/signin" method="post">
+<input type="hidden" name="appActionToken" value="token">
+<input type="email" name="email">
+</form>
+</body></html>
+"""
+
+
+class TestExtract(BaseTestCase):
+
+    def test_backends(self):
+        backends = ['stream', 'bs4'] + (['lxml'] if lxml is not None else [])
+        for backend in backends:
+            # the whole page, like find_meta
+            self.assertEqual(
+                {'csrf_token': 'a&b', 'session_id': 'session',
+                 'in_body': 'body'},
+                extract.meta_content(PAGE, backend))
+            self.assertEqual(
+                {'csrf_token': 'a&b', 'session_id': 'session'},
+                extract.meta_content(
+                    PAGE, backend, names=('csrf_token', 'session_id', 'x')))
+            self.assertEqual(
+                'xsrf',
+                extract.find_meta(PAGE, backend, id='xsrf-token')['data-token'])
+            self.assertEqual(
+                'body',
+                extract.find_meta(PAGE, backend, name='in_body')['content'])
+            self.assertIsNone(extract.find_meta(PAGE, backend, name='missing'))
+
+            form = extract.form(PAGE, backend, id='ap_signin_form')
+            self.assertEqual('/ap/signin', form['attrs']['action'])
+            self.assertEqual(
+                'auth-validate-form a-spacing-none', form['attrs']['class'])
+            self.assertEqual(
+                ['appActionToken', 'email'],
+                [i['name'] for i in form['inputs']])
+
+    def test_meta_content_stops_at_names(self):
+        parser = extract._Extractor(
+            'meta', {}, False, ['csrf_token', 'session_id']).run(PAGE)
+        # the line of the session_id tag, before the body
+        self.assertEqual(5, parser.getpos()[0])
+
+    def test_unknown_backend(self):
+        with self.assertRaises(Exception):
+            extract.meta(PAGE, 'regex')
+
+    @unittest.skipIf(lxml is not None, 'lxml is installed')
+    def test_lxml_missing(self):
+        with self.assertRaisesRegex(Exception, 'coto\\[lxml\\]'):
+            extract.meta(PAGE, 'lxml')
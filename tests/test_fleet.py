@@ -0,0 +1,38 @@
+import time
+from tests import mock, BaseTestCase
+import coto
+
+
+class TestFleet(BaseTestCase):
+
+    @mock.patch('coto.session.Session.signin')
+    def test_completion_order(self, signin):
+        accounts = [
+            {'email': 'slow@example.com', 'password': 'p'},
+            {'email': 'fast@example.com', 'password': 'p'},
+        ]
+
+        delays = {'slow@example.com': 0.3, 'fast@example.com': 0.0}
+        signin.side_effect = lambda **kwargs: time.sleep(delays[kwargs['email']])
+
+        results = list(coto.fleet.run(
+            accounts, lambda s: 'done', workers=2))
+
+        self.assertEqual(
+            ['fast@example.com', 'slow@example.com'],
+            [r.account['email'] for r in results])
+        self.assertTrue(all(r.ok for r in results))
+
+    @mock.patch('coto.session.Session.signin')
+    def test_timeout_and_errors(self, signin):
+        def operation(session):
+            raise Exception("failed")
+
+        results = list(coto.fleet.run(
+            [{'email': 'a@example.com', 'password': 'p'}], operation))
+        self.assertIsInstance(results[0].exception, Exception)
+
+        results = list(coto.fleet.run(
+            [{'email': 'a@example.com', 'password': 'p'}],
+            lambda s: time.sleep(1), timeout=0.1))
+        self.assertIsInstance(results[0].exception, TimeoutError)
@@ -0,0 +1,256 @@
+import os
+from tests import mock, BaseTestCase
+import pyotp
+import coto
+from coto.captcha import Solver as BaseSolver
+from coto.testing import Account, FakeConsole
+from coto.testing.server import CAPTCHA_IMAGE
+
+
+class Solver:
+
+    def solve(self, url):
+        return 'guess'
+
+    def result(self, uuid):
+        return 'coto'
+
+    def incorrect(self, uuid):
+        pass
+
+
+class ImageSolver(BaseSolver):
+
+    def solve(self, image=None, url=None, base64=None):
+        self.image = image
+        return 'job'
+
+    def result(self, job_id):
+        return 'coto'
+
+
+class TestFakeConsole(BaseTestCase):
+
+    def setUp(self):
+        self.secret = pyotp.random_base32()
+        self.console = FakeConsole([
+            Account('root@example.com', 'password', access_key_id='AKIA1'),
+            Account('mfa@example.com', 'password', mfa_secret=self.secret,
+                    captcha=True),
+        ]).start()
+
+    def tearDown(self):
+        self.console.stop()
+
+    def session(self, **kwargs):
+        return coto.Session(transport=self.console.transport(), **kwargs)
+
+    def recording(self):
+        # hooks for sessions, and the operations of their requests
+        operations = []
+        hooks = coto.Hooks()
+        hooks.register('on_request', lambda e: operations.append(e.operation))
+        return hooks, operations
+
+    def test_signin_and_iam(self):
+        session = self.session()
+        session.signin(email='root@example.com', password='password')
+        self.assertTrue(session.authenticated)
+
+        iam = session.client('iam')
+        key = iam.create_root_access_key()
+        self.assertEqual([key['id']], [k['id'] for k in iam.list_root_access_keys()])
+        self.assertTrue(iam.update_root_access_key(key['id'], 'Inactive'))
+        self.assertTrue(iam.delete_root_access_key(key['id']))
+        self.assertEqual('Deleted', iam.list_root_access_keys(Deleted=True)[0]['status'])
+
+        self.assertEqual('basic', session.client('support').get_support_level()['supportLevel'])
+        self.assertEqual('ACTIVE', session.client('billing').account_status())
+        self.assertEqual('root@example.com', session.client('account').get_account_info()['accountEmail'])
+
+    def test_federation(self):
+        boto3_session = mock.Mock()
+        boto3_session.get_credentials.return_value = mock.Mock(
+            access_key='AKIA1', secret_key='secret', token=None)
+        session = self.session(boto3_session=boto3_session)
+        self.assertTrue(session.authenticated)
+        self.assertEqual({'serialNumber': [], 'truncated': False},
+                         session.client('iam').list_root_mfa_devices())
+
+    def test_mfa_and_captcha(self):
+        session = self.session(captcha_solver=Solver())
+        session.signin(
+            email='mfa@example.com', password='password',
+            mfa_secret=self.secret)
+        self.assertTrue(session.authenticated)
+
+        with self.assertRaises(Exception):
+            self.session().signin(email='root@example.com', password='wrong')
+
+    def test_captcha_image(self):
+        solver = ImageSolver()
+        hooks, operations = self.recording()
+
+        session = self.session(captcha_solver=solver, hooks=hooks)
+        session.signin(
+            email='mfa@example.com', password='password',
+            mfa_secret=self.secret)
+        self.assertTrue(session.authenticated)
+        # downloaded through the session, not by the solver
+        self.assertEqual(CAPTCHA_IMAGE, solver.image)
+        self.assertIn('captcha.image', operations)
+
+    def test_session_expiry(self):
+        session = self.session()
+        session.signin(email='root@example.com', password='password')
+        iam = session.client('iam')
+        iam.list_root_access_keys()
+
+        self.console.expire_sessions()
+        self.assertEqual([], iam.list_root_access_keys())
+
+    def test_signin_timings(self):
+        self.console.latency = 0.1
+        session = self.session()
+        session.signin(email='root@example.com', password='password')
+
+        timings = session.signin_timings
+        self.assertEqual(
+            {'tokens', 'account_type', 'mfa_status', 'authenticate', 'total'},
+            set(timings))
+        # account type and mfa status are looked up concurrently
+        self.assertLess(
+            timings['total'],
+            timings['tokens'] + timings['account_type']
+            + timings['mfa_status'] + timings['authenticate'])
+
+    def test_account_cache(self):
+        cache = coto.AccountCache()
+        hooks, operations = self.recording()
+
+        self.session(account_cache=cache).signin(
+            email='root@example.com', password='password')
+        self.assertEqual(
+            {'account_type': 'Decoupled', 'mfa_required': False},
+            cache.get('Root@Example.com'))
+
+        session = self.session(account_cache=cache, hooks=hooks)
+        session.signin(email='root@example.com', password='password')
+        self.assertTrue(session.authenticated)
+        self.assertNotIn('signin_aws.resolveAccountType', operations)
+        self.assertNotIn('mfa.get_mfa_status', operations)
+
+        # a stale entry is dropped and the signin repeated with lookups
+        account = self.console.accounts['root@example.com']
+        account.mfa_secret = pyotp.random_base32()
+        operations.clear()
+        session = self.session(account_cache=cache, hooks=hooks)
+        session.signin(
+            email='root@example.com', password='password',
+            mfa_secret=account.mfa_secret)
+        self.assertTrue(session.authenticated)
+        self.assertIn('signin_aws.resolveAccountType', operations)
+        self.assertTrue(cache.get('root@example.com')['mfa_required'])
+
+        # other failures are not blamed on the cache
+        operations.clear()
+        session = self.session(account_cache=cache, hooks=hooks)
+        with self.assertRaisesRegex(Exception, 'incorrect'):
+            session.signin(
+                email='root@example.com', password='wrong',
+                mfa_secret=account.mfa_secret)
+        self.assertEqual(1, operations.count('signin_aws.authenticateRoot'))
+        self.assertNotIn('signin_aws.resolveAccountType', operations)
+        self.assertTrue(cache.get('root@example.com')['mfa_required'])
+
+    def test_signin_aws_account_cache(self):
+        cache = coto.AccountCache()
+        hooks, operations = self.recording()
+
+        self.session(account_cache=cache).client('signin_aws').signin(
+            'root@example.com', 'password')
+        self.assertFalse(cache.get('root@example.com')['mfa_required'])
+
+        session = self.session(account_cache=cache, hooks=hooks)
+        self.assertTrue(session.client('signin_aws').signin(
+            'root@example.com', 'password'))
+        self.assertNotIn('mfa.get_mfa_status', operations)
+
+        # a stale entry is dropped and the MFA status looked up
+        account = self.console.accounts['root@example.com']
+        account.mfa_secret = pyotp.random_base32()
+        operations.clear()
+        session = self.session(account_cache=cache, hooks=hooks)
+        self.assertTrue(session.client('signin_aws').signin(
+            'root@example.com', 'password', mfa_secret=account.mfa_secret))
+        self.assertIn('mfa.get_mfa_status', operations)
+        self.assertTrue(cache.get('root@example.com')['mfa_required'])
+
+    def test_token_store(self):
+        store = coto.TokenStore()
+        hooks, operations = self.recording()
+
+        session = self.session(token_store=store, hooks=hooks)
+        session.signin(email='root@example.com', password='password')
+        session.client('iam').list_root_access_keys()
+        self.assertEqual(2, operations.count('iam.xsrf_token'))
+
+        # a new client of the session takes the stored token
+        del session._clients['iam']
+        session.client('iam').list_root_access_keys()
+        self.assertEqual(2, operations.count('iam.xsrf_token'))
+
+        # another console session does not try the tokens of this one
+        operations.clear()
+        statuses = []
+        hooks.register('on_response', lambda e: statuses.append(e.status))
+        other = self.session(token_store=store, hooks=hooks)
+        other.signin(email='root@example.com', password='password')
+        self.assertNotEqual(session.identity, other.identity)
+        self.assertEqual([], other.client('iam').list_root_access_keys())
+        self.assertEqual(2, operations.count('iam.xsrf_token'))
+        self.assertNotIn(403, statuses)
+        self.assertEqual(
+            other.client('iam')._dump_tokens(),
+            store.get(other.identity, 'iam'))
+
+        # signing in again drops the tokens
+        self.console.expire_sessions()
+        other.client('iam').list_root_access_keys()
+        self.assertEqual(4, operations.count('iam.xsrf_token'))
+
+    def test_warm(self):
+        hooks, operations = self.recording()
+
+        session = self.session(hooks=hooks)
+        session.signin(email='root@example.com', password='password')
+        # the default services do not need AWS_DEFAULT_REGION
+        with mock.patch.dict(os.environ):
+            os.environ.pop('AWS_DEFAULT_REGION', None)
+            warming = session.warm()
+        self.assertEqual({'iam', 'billing', 'support'}, set(warming))
+
+        # calls wait for the tokens instead of loading them again
+        self.assertEqual([], session.client('iam').list_root_access_keys())
+        self.assertEqual('ACTIVE', session.client('billing').account_status())
+        for future in warming.values():
+            self.assertIsNone(future.result())
+        self.assertEqual(2, operations.count('iam.xsrf_token'))
+        self.assertEqual(1, operations.count('billing.xsrf_token'))
+        self.assertEqual(1, operations.count('support.xsrf_token'))
+        self.assertEqual(
+            session.client('support')._dump_tokens(),
+            session.token_store.get(session.identity, 'support'))
+
+    def test_clock_skew(self):
+        self.console.clock_skew = 95
+        self.console.accounts['mfa@example.com'].captcha = False
+
+        # the code is computed for the server clock, estimated from the
+        # responses before authenticating
+        session = self.session()
+        session.signin(
+            email='mfa@example.com', password='password',
+            mfa_secret=self.secret)
+        self.assertTrue(session.authenticated)
+        self.assertAlmostEqual(95, session.clock.offset, delta=1.5)